@@ -1,16 +1,18 @@
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session # Needed for DB session in get_current_active_user
+from sqlalchemy.ext.asyncio import AsyncSession # Needed for DB session in get_current_active_user
 from backend.app.core.database import get_db # Needed for DB session
-from backend.app.models.account import Account as AccountModel
-from backend.app.models import user as user_schema # For TokenData
+from backend.app.core.db_routing import use_primary
+from backend.app.models import user as user_schema # For TokenData and Principal
 from backend.app.services import auth as auth_service # For verify_token
+from backend.app.services import principal_cache
+from backend.app.services import token_revocation
 from backend.app.crud import user as user_crud # For get_user_by_username
 from backend.app.api.endpoints.auth import oauth2_scheme # oauth2_scheme also needed, or move it too
 
 # Consider moving oauth2_scheme here if it's broadly used, or pass as arg if preferred.
 # For now, keeping it simple by direct import, assuming auth.py is loaded.
 
-async def get_current_active_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> AccountModel:
+async def get_current_active_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> user_schema.Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -23,15 +25,31 @@ async def get_current_active_user(token: str = Depends(oauth2_scheme), db: Sessi
     except Exception: # Includes JWTError from verify_token
         raise credentials_exception
 
-    user = user_crud.get_user_by_username(db, username=token_data.username)
-    if user is None:
+    # Revocation check: an in-process lookup with Redis, one aux-DB lookup without it. Tokens
+    # without a 'uid' claim predate token generations and can't be checked, so they're rejected.
+    if token_data.user_id is None:
+        raise credentials_exception
+    generation = await token_revocation.get_generation(token_data.user_id)
+    if token_data.generation < generation:
         raise credentials_exception
+
+    # Steady state: the principal comes from the cache and no MySQL round trip is needed.
+    # The session is only checked out from the pool if we actually query. The generation is
+    # read before the account, so a ban committed in between makes this entry stale right away.
+    user = await principal_cache.get_principal(token_data.username, generation)
+    if user is None:
+        if principal_cache.needs_primary_read(token_data.username):
+            use_primary(db) # e.g. just banned: a replica may not have the change yet
+        db_user = await user_crud.get_user_by_username(db, username=token_data.username)
+        if db_user is None:
+            raise credentials_exception
+        user = await principal_cache.cache_principal(db_user, generation)
     if user.locked:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Account locked.")
     # Could add check for user.is_active here if such a field existed
     return user
 
-async def get_current_admin_user(current_user: AccountModel = Depends(get_current_active_user)) -> AccountModel:
+async def get_current_admin_user(current_user: user_schema.Principal = Depends(get_current_active_user)) -> user_schema.Principal:
     # Standard AzerothCore: GM level 3 is typically Administrator.
     # Access is granted if gmlevel is 3 or higher.
     if current_user.gmlevel < 3:
@@ -1,12 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import datetime
 
-from backend.app.core.database import get_db
+from backend.app.core.database import get_db, engine, aux_engine, replica_engines, SessionLocal
+from backend.app.core.db_pool import get_pool_stats
 from backend.app.models import user as user_schema
-from backend.app.models.account import Account as AccountModel
 from backend.app.crud import user as user_crud
+from backend.app.crud import captcha as captcha_crud
+from backend.app.services import principal_cache
+from backend.app.services import totp_cache
+from backend.app.services import auth as auth_service
+from backend.app.services import token_revocation
+from backend.app.services import refresh_tokens
+from backend.app.services import account_export
+from backend.app.services import account_search
+from backend.app.services import account_stats
+from backend.app.services import captcha_service
+from backend.app.services import email_outbox
+from backend.app.services import email_service
 from backend.app.api.dependencies import get_current_admin_user # Import the actual dependency
+from backend.app.core import rate_limiter
 from backend.app.core.rate_limiter import limiter
 from backend.app.core.config import settings
 
@@ -16,25 +31,92 @@ router = APIRouter(
     dependencies=[Depends(get_current_admin_user)] # Apply admin check to all routes in this router
 )
 
-@router.get("/users", response_model=List[user_schema.User])
+@router.get("/users", response_model=user_schema.UserPage)
 @limiter.limit(settings.RATE_LIMIT_DEFAULT) # Apply a general admin rate limit
 async def list_users(
     request: Request,
-    db: Session = Depends(get_db),
-    # admin_user: AccountModel = Depends(get_current_admin_user) # Already applied at router level
+    limit: int = Query(100, ge=1, le=settings.ADMIN_USER_PAGE_MAX_SIZE),
+    after_id: Optional[int] = Query(None, description="Return accounts with a greater id (next_after_id of the previous page)"),
+    locked: Optional[bool] = None,
+    gmlevel: Optional[int] = None,
+    email_verified: Optional[bool] = None,
+    username_prefix: Optional[str] = Query(None, max_length=16),
+    email_prefix: Optional[str] = Query(None, max_length=255),
+    include_total: bool = Query(False, description="Also count all matching accounts (cached briefly)"),
+    db: AsyncSession = Depends(get_db),
+    # admin_user: user_schema.Principal = Depends(get_current_admin_user) # Already applied at router level
 ):
-    users = user_crud.get_all_users(db)
-    return users
+    filters = {
+        "locked": locked,
+        "gmlevel": gmlevel,
+        "email_verified": email_verified,
+        "username_prefix": username_prefix,
+        "email_prefix": email_prefix,
+    }
+    items, next_after_id = await user_crud.list_users_page(db, limit=limit, after_id=after_id, **filters)
+    total = await user_crud.count_users(db, **filters) if include_total else None
+    return {"items": items, "next_after_id": next_after_id, "total": total}
+
+@router.get("/users/search", response_model=user_schema.UserSearchPage)
+@limiter.limit(settings.RATE_LIMIT_DEFAULT)
+async def search_users(
+    request: Request,
+    q: str = Query(..., min_length=3, max_length=255, description="Part of a username or email"),
+    limit: int = Query(25, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """Substring search over usernames and emails, served from the in-memory trigram index."""
+    matches = await account_search.search(q) if settings.ACCOUNT_SEARCH_ENABLED else None
+    if matches is None:
+        # Index not built yet (startup) or disabled: fall back to a database scan. Every page rescans
+        # from the start, so the depth is capped like the listing's page size.
+        depth = min(offset + limit, settings.ADMIN_USER_PAGE_MAX_SIZE)
+        items = await user_crud.search_users_by_substring(db, q, limit=depth) if offset < depth else []
+        return {"items": items[offset:], "total": None, "indexed": False}
+    # Only ids come from the index; current flags (locked, email_verified, gmlevel) come from the database
+    items = await user_crud.get_users_by_ids(db, matches[offset:offset + limit])
+    return {"items": items, "total": len(matches), "indexed": True}
+
+@router.get("/users/export")
+@limiter.limit(settings.RATE_LIMIT_ADMIN_EXPORT)
+async def export_users(
+    request: Request,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Compress the download with gzip"),
+    locked: Optional[bool] = None,
+    gmlevel: Optional[int] = None,
+    email_verified: Optional[bool] = None,
+    username_prefix: Optional[str] = Query(None, max_length=16),
+    email_prefix: Optional[str] = Query(None, max_length=255),
+):
+    """Streams all matching accounts as NDJSON or CSV, in constant memory."""
+    chunks = account_export.export_accounts(
+        SessionLocal,
+        format,
+        compress=gzip,
+        locked=locked,
+        gmlevel=gmlevel,
+        email_verified=email_verified,
+        username_prefix=username_prefix,
+        email_prefix=email_prefix,
+    )
+    filename = f"accounts-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else account_export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @router.post("/users/{user_id}/ban", response_model=user_schema.User)
 @limiter.limit(settings.RATE_LIMIT_DEFAULT)
 async def ban_user_endpoint( # Renamed to avoid conflict with crud function if imported directly
     request: Request,
     user_id: int,
-    db: Session = Depends(get_db),
-    admin_user: AccountModel = Depends(get_current_admin_user) # Explicitly get admin for self-action checks
+    db: AsyncSession = Depends(get_db),
+    admin_user: user_schema.Principal = Depends(get_current_admin_user) # Explicitly get admin for self-action checks
 ):
-    target_user = user_crud.get_user_by_id(db, user_id=user_id)
+    target_user = await user_crud.get_user_by_id(db, user_id=user_id)
     if not target_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
@@ -44,7 +126,7 @@ async def ban_user_endpoint( # Renamed to avoid conflict with crud function if i
     if target_user.gmlevel >= 3: # Prevent banning other admins (gmlevel 3+)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot ban other admin users.")
 
-    banned_user = user_crud.ban_account(db, target_user)
+    banned_user = await user_crud.ban_account(db, target_user)
     return banned_user
 
 @router.post("/users/{user_id}/unban", response_model=user_schema.User)
@@ -52,17 +134,108 @@ async def ban_user_endpoint( # Renamed to avoid conflict with crud function if i
 async def unban_user_endpoint( # Renamed
     request: Request,
     user_id: int,
-    db: Session = Depends(get_db),
-    # admin_user: AccountModel = Depends(get_current_admin_user) # Not strictly needed if not checking self-action
+    db: AsyncSession = Depends(get_db),
+    # admin_user: user_schema.Principal = Depends(get_current_admin_user) # Not strictly needed if not checking self-action
 ):
-    target_user = user_crud.get_user_by_id(db, user_id=user_id)
+    target_user = await user_crud.get_user_by_id(db, user_id=user_id)
     if not target_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     # No special checks for unbanning (e.g. unbanning another admin is fine)
-    unbanned_user = user_crud.unban_account(db, target_user)
+    unbanned_user = await user_crud.unban_account(db, target_user)
     return unbanned_user
 
+async def _bulk_set_locked(selection: user_schema.BulkAccountAction, locked: bool, db: AsyncSession, admin_user: user_schema.Principal) -> dict:
+    account_filter = selection.filter.dict() if selection.filter else {}
+    limit = settings.ADMIN_BULK_MAX_ACCOUNTS
+    if selection.user_ids is not None and len(selection.user_ids) > limit:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {limit} accounts per request.")
+    accounts = await user_crud.find_accounts_for_bulk_action(db, limit=limit, user_ids=selection.user_ids, **account_filter)
+    if len(accounts) > limit:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The filter matches more than {limit} accounts; narrow it down.",
+        )
+
+    outcomes = await user_crud.bulk_set_locked(db, accounts, locked=locked, acting_admin_id=admin_user.id)
+    usernames = {account.id: account.username for account in accounts}
+    # Results follow the requested ids (including unknown ones), or id order for a filter.
+    ids = list(dict.fromkeys(selection.user_ids)) if selection.user_ids is not None else [account.id for account in accounts]
+    results = [
+        {"id": user_id, "username": usernames.get(user_id), "outcome": outcomes.get(user_id, "not_found")}
+        for user_id in ids
+    ]
+    summary = {}
+    for result in results:
+        summary[result["outcome"]] = summary.get(result["outcome"], 0) + 1
+    return {"results": results, "summary": summary}
+
+@router.post("/users/bulk-ban", response_model=user_schema.BulkAccountActionResult)
+@limiter.limit(settings.RATE_LIMIT_DEFAULT)
+async def bulk_ban_users(
+    request: Request,
+    selection: user_schema.BulkAccountAction,
+    db: AsyncSession = Depends(get_db),
+    admin_user: user_schema.Principal = Depends(get_current_admin_user) # Explicitly get admin for self-action checks
+):
+    """Bans many accounts at once, selected by ids or by filter (last_ip_network, joindate window)."""
+    return await _bulk_set_locked(selection, True, db, admin_user)
+
+@router.post("/users/bulk-unban", response_model=user_schema.BulkAccountActionResult)
+@limiter.limit(settings.RATE_LIMIT_DEFAULT)
+async def bulk_unban_users(
+    request: Request,
+    selection: user_schema.BulkAccountAction,
+    db: AsyncSession = Depends(get_db),
+    admin_user: user_schema.Principal = Depends(get_current_admin_user)
+):
+    """Unbans many accounts at once, selected by ids or by filter."""
+    return await _bulk_set_locked(selection, False, db, admin_user)
+
+@router.post("/announcements", response_model=user_schema.AnnouncementQueued, status_code=status.HTTP_202_ACCEPTED)
+@limiter.limit(settings.RATE_LIMIT_DEFAULT)
+async def send_announcement(request: Request, announcement: user_schema.AnnouncementCreate):
+    """
+    Emails an announcement to every account with a verified address. The messages are queued in
+    the email outbox and sent in the background over pooled SMTP sessions, paced to the relay limits.
+    """
+    if not settings.SMTP_HOST or not settings.SMTP_SENDER_EMAIL:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="SMTP is not configured.")
+    recipients = await email_outbox.enqueue_announcement(announcement.subject, announcement.body)
+    return {"recipients": recipients}
+
+@router.get("/stats", response_model=user_schema.AccountStats)
+@limiter.limit(settings.RATE_LIMIT_DEFAULT)
+async def get_account_stats(request: Request):
+    """Account totals, 2FA adoption and registrations per day for the admin dashboard."""
+    if not account_stats.is_ready():
+        await account_stats.reconcile() # First request before the startup reconcile finished
+    return account_stats.get_account_stats()
+
+@router.get("/metrics")
+@limiter.limit(settings.RATE_LIMIT_DEFAULT)
+async def get_metrics(request: Request):
+    """In-process runtime metrics for this worker (connection pools, caches, ...)."""
+    return {
+        "db_pool": {
+            "main": get_pool_stats(engine),
+            "replicas": [get_pool_stats(replica_engine) for replica_engine in replica_engines],
+            "aux": get_pool_stats(aux_engine),
+        },
+        "principal_cache": principal_cache.get_stats(),
+        "totp_state_cache": totp_cache.get_stats(),
+        "token_cache": auth_service.get_token_cache_stats(),
+        "token_revocation": token_revocation.get_stats(),
+        "refresh_tokens": refresh_tokens.get_stats(),
+        "login_stages_ms": auth_service.get_login_timing_stats(),
+        "account_search": account_search.get_stats(),
+        "account_stats": account_stats.get_stats(),
+        "captcha": {"store": captcha_crud.get_stats(), **captcha_service.get_stats()},
+        "email_outbox": await email_outbox.get_stats(),
+        "smtp_pool": email_service.get_stats(),
+        "rate_limiter": rate_limiter.get_stats(),
+    }
+
 # Promote and Demote endpoints are removed as per requirements.
 # @router.post("/users/{user_id}/promote", response_model=user_schema.User)
 # @limiter.limit(settings.RATE_LIMIT_DEFAULT)
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordBearer # OAuth2PasswordRequestForm removed as login uses custom model
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-import random
+import asyncio
 
 from backend.app.core.database import get_db, get_aux_db
+from backend.app.core.db_routing import use_primary
 from backend.app.models import user as user_schema
 from backend.app.models import account as account_model # SQLAlchemy model
 from backend.app.crud import user as user_crud
@@ -12,11 +13,16 @@ from backend.app.crud import email_verification as email_verification_crud
 from backend.app.crud import user_totp as user_totp_crud
 from backend.app.crud import captcha as captcha_crud # Added
 from backend.app.services import auth as auth_service
-from backend.app.services import email_service
+from backend.app.services import token_revocation
+from backend.app.services import refresh_tokens
+from backend.app.services import principal_cache
+from backend.app.services import email_outbox
 from backend.app.services import totp_service
 from backend.app.services import captcha_service
 from backend.app.core.config import settings
 from backend.app.core.rate_limiter import limiter # Import the limiter
+from backend.app.core.metrics import StageTimer
+from backend.app.core.process_pool import run_cpu_bound
 import logging
 
 router = APIRouter()
@@ -29,36 +35,47 @@ logger = logging.getLogger(__name__)
 # tokenUrl should point to the actual login endpoint that provides the token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login/token")
 
+async def _verify_captcha(captcha_id: str, solution: str, context: str) -> None:
+    """
+    Consumes a CAPTCHA challenge (per CAPTCHA_TYPE and CAPTCHA_MODE), so a wrong answer can't be
+    retried against it. Raises a 400 if the challenge is invalid, expired, already used or wrongly solved.
+    """
+    if settings.CAPTCHA_TYPE == "pow" or settings.CAPTCHA_MODE == "stateless":
+        redeem = captcha_service.redeem_pow_challenge if settings.CAPTCHA_TYPE == "pow" else captcha_service.redeem_signed_challenge
+        try:
+            solved = await redeem(captcha_id, solution)
+        except captcha_service.CaptchaError as e:
+            logger.warning(f"{context} CAPTCHA failed: {e}")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired CAPTCHA. Please try again.")
+    else:
+        challenge = await captcha_crud.take_challenge(captcha_id)
+        if not challenge:
+            logger.warning(f"{context} CAPTCHA failed: Invalid or expired CAPTCHA ID {captcha_id}")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired CAPTCHA. Please try again.")
+        solved = challenge.answer.lower() == solution.lower()
+    if not solved:
+        logger.warning(f"{context} CAPTCHA failed: Incorrect solution")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Incorrect CAPTCHA solution.")
+
 
 @router.post("/register", response_model=user_schema.User)
 @limiter.limit(settings.RATE_LIMIT_REGISTER)
 async def register_user( # Changed to async
     request: Request, # Added for limiter
     user_data: user_schema.UserCreate,
-    db: Session = Depends(get_db),
-    aux_db: Session = Depends(get_aux_db)
+    db: AsyncSession = Depends(get_db),
 ):
     logger.info(f"Registration attempt for username: {user_data.username} with CAPTCHA ID {user_data.captcha_id}")
 
-    # CAPTCHA Validation
-    challenge = captcha_crud.get_challenge(aux_db, user_data.captcha_id)
-    if not challenge:
-        logger.warning(f"Registration CAPTCHA failed for {user_data.username}: Invalid or expired CAPTCHA ID {user_data.captcha_id}")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired CAPTCHA. Please try again.")
-
-    if challenge.answer.lower() != user_data.captcha_solution.lower():
-        logger.warning(f"Registration CAPTCHA failed for {user_data.username}: Incorrect solution for CAPTCHA ID {user_data.captcha_id}")
-        # Delete the used (incorrect) challenge to prevent brute-forcing the same challenge
-        captcha_crud.delete_challenge(aux_db, user_data.captcha_id)
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Incorrect CAPTCHA solution.")
-
-    # Valid CAPTCHA, delete it
-    captcha_crud.delete_challenge(aux_db, user_data.captcha_id)
-    logger.info(f"CAPTCHA validation successful for {user_data.username}, ID {user_data.captcha_id}")
+    await _verify_captcha(user_data.captcha_id, user_data.captcha_solution, f"Registration for {user_data.username}")
+    captcha_service.record_registration_attempt() # Raises the proof-of-work difficulty during floods
+    logger.info(f"CAPTCHA validation successful for {user_data.username}")
 
     # Usernames in AC are typically case-insensitive but stored as entered or uppercase.
     # The CRUD operations should handle querying consistently (e.g. by converting input to uppercase for lookup)
-    db_user_by_username = user_crud.get_user_by_username(db, username=user_data.username.upper()) # Ensure consistent case for check
+    # Checked on the primary: a lagging replica could miss an account registered moments ago.
+    use_primary(db)
+    db_user_by_username = await user_crud.get_user_by_username(db, username=user_data.username.upper()) # Ensure consistent case for check
     if db_user_by_username:
         logger.warning(f"Registration failed: Username {user_data.username.upper()} already exists.")
         raise HTTPException(
@@ -66,7 +83,7 @@ async def register_user( # Changed to async
             detail="Username already registered"
         )
 
-    db_user_by_email = user_crud.get_user_by_email(db, email=user_data.email)
+    db_user_by_email = await user_crud.get_user_by_email(db, email=user_data.email)
     if db_user_by_email:
         logger.warning(f"Registration failed: Email {user_data.email} already registered.")
         raise HTTPException(
@@ -76,21 +93,22 @@ async def register_user( # Changed to async
 
     try:
         # CRUD create_user now stores username in uppercase
-        created_user = user_crud.create_user(db=db, user=user_data)
+        created_user = await user_crud.create_user(db=db, user=user_data)
         logger.info(f"User {created_user.username} successfully registered with ID {created_user.id}")
 
         if settings.SMTP_HOST and settings.SMTP_SENDER_EMAIL:
-            verification_token = email_verification_crud.create_verification_token(db=db, user_id=created_user.id)
+            verification_token = await email_verification_crud.create_verification_token(db=db, user_id=created_user.id)
             if verification_token:
-                email_sent = email_service.send_verification_email(
-                    user_email=created_user.email,
-                    username=created_user.username,
-                    verification_token=verification_token.token
-                )
-                if email_sent:
-                    logger.info(f"Verification email initiated for {created_user.username} to {created_user.email}.")
-                else:
-                    logger.warning(f"Failed to send verification email for {created_user.username} to {created_user.email} (SMTP issue or offline).")
+                # Queued for the outbox workers: the response doesn't wait on the SMTP relay
+                try:
+                    await email_outbox.enqueue_verification_email(
+                        user_email=created_user.email,
+                        username=created_user.username,
+                        verification_token=verification_token.token
+                    )
+                    logger.info(f"Verification email queued for {created_user.username} to {created_user.email}.")
+                except Exception as e:
+                    logger.error(f"Failed to queue verification email for {created_user.username} to {created_user.email}: {e}")
             else:
                 logger.error(f"Failed to create verification token for user {created_user.username}")
         else:
@@ -107,18 +125,52 @@ async def register_user( # Changed to async
             detail="An unexpected error occurred during registration."
         )
 
+# Pydantic model for Login
+class LoginForm(user_schema.BaseModel):
+    username: str
+    password: str
+    totp_code: Optional[str] = None
+
 @router.post("/login/token", response_model=user_schema.Token)
 @limiter.limit(settings.RATE_LIMIT_LOGIN)
 async def login_for_access_token( # Changed to async
     request: Request, # Added for limiter
+    response: Response,
     form_data: LoginForm, # Use custom Pydantic model (already was)
-    db: Session = Depends(get_db),
-    aux_db: Session = Depends(get_aux_db)
+    db: AsyncSession = Depends(get_db),
+    aux_db: AsyncSession = Depends(get_aux_db)
 ):
     logger.info(f"Login attempt for username: {form_data.username}")
-    user = user_crud.authenticate_user(db, username=form_data.username, password_plain=form_data.password)
+    timer = StageTimer()
+    try:
+        with timer.stage("total"):
+            token_response = await _login(form_data, db, aux_db, timer)
+    finally:
+        auth_service.record_login_timings(timer)
+    response.headers["Server-Timing"] = timer.server_timing()
+    return token_response
+
+async def _login(form_data: LoginForm, db: AsyncSession, aux_db: AsyncSession, timer: StageTimer) -> dict:
+    username = form_data.username.upper() # Stored uppercase
+    with timer.stage("lookup"):
+        # The account (MySQL) and its 2FA state (SQLite) live in different databases. If the account id
+        # is already known from the principal cache, both lookups run concurrently on their own sessions.
+        # 2FA state is usually cached as well (including "no 2FA"), and then needs no aux-DB query.
+        cached_principal = await principal_cache.get_principal(username)
+        if cached_principal is not None:
+            user, user_totp_settings = await asyncio.gather(
+                user_crud.get_user_by_username(db, username=username),
+                user_totp_crud.get_totp_state(aux_db, cached_principal.id),
+            )
+            if user and user.id != cached_principal.id: # Stale cache entry
+                user_totp_settings = await user_totp_crud.get_totp_state(aux_db, user.id)
+        else:
+            user = await user_crud.get_user_by_username(db, username=username)
+            user_totp_settings = await user_totp_crud.get_totp_state(aux_db, user.id) if user else None
 
-    if not user:
+    with timer.stage("hash_verify"):
+        password_ok = user is not None and await auth_service.verify_account_password(user, form_data.password)
+    if not password_ok:
         logger.warning(f"Login failed for {form_data.username}: Invalid username or password.")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -127,7 +179,6 @@ async def login_for_access_token( # Changed to async
         )
 
     # 2FA Check (already implemented)
-    user_totp_settings = user_totp_crud.get_user_totp_secret(aux_db, user.id)
     if user_totp_settings and user_totp_settings.is_active:
         logger.info(f"2FA is active for user {user.username}. Verifying TOTP code.")
         if not form_data.totp_code:
@@ -137,7 +188,9 @@ async def login_for_access_token( # Changed to async
                 detail="TOTP code required."
             )
 
-        if not totp_service.verify_totp_code(user_totp_settings.secret_key, form_data.totp_code):
+        with timer.stage("totp_verify"):
+            totp_ok = user_totp_settings.verify(form_data.totp_code)
+        if not totp_ok:
             logger.warning(f"Login failed for {user.username}: Invalid TOTP code provided.")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -149,16 +202,50 @@ async def login_for_access_token( # Changed to async
     else:
         logger.info(f"2FA is not configured for user {user.username}. Proceeding without TOTP check.")
 
-    access_token = auth_service.create_access_token(data={"sub": user.username})
+    with timer.stage("token_mint"):
+        generation = await token_revocation.get_generation(user.id) # Bumped on ban/password change to revoke this login's tokens
+        token_response = {
+            **_access_token_response(user.username, user.id, generation),
+            "refresh_token": await refresh_tokens.issue_refresh_token(user.id, user.username, generation),
+        }
+    if cached_principal is None and not principal_cache.needs_primary_read(user.username):
+        # Warms the cache for this session's first authenticated request and for the next login
+        await principal_cache.cache_principal(user, generation)
     logger.info(f"User {user.username} logged in successfully.")
-    return {"access_token": access_token, "token_type": "bearer"}
+    return token_response
 
+def _access_token_response(username: str, user_id: int, generation: int) -> dict:
+    access_token = auth_service.create_access_token(data={"sub": username, "uid": user_id, "gen": generation})
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+@router.post("/token/refresh", response_model=user_schema.Token)
+@limiter.limit(settings.RATE_LIMIT_TOKEN_REFRESH)
+async def refresh_access_token(
+    request: Request, # Added for limiter
+    refresh_request: user_schema.TokenRefreshRequest,
+):
+    """
+    Exchanges a refresh token for a new access token and a new refresh token.
+    The presented refresh token is consumed (rotation); no database access is needed.
+    """
+    try:
+        record, new_refresh_token = await refresh_tokens.rotate_refresh_token(refresh_request.refresh_token)
+    except refresh_tokens.RefreshTokenError as e:
+        logger.warning(f"Token refresh failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {
+        **_access_token_response(record.username, record.user_id, record.generation),
+        "refresh_token": new_refresh_token,
+    }
 
-# Pydantic model for Login
-class LoginForm(user_schema.BaseModel):
-    username: str
-    password: str
-    totp_code: Optional[str] = None
 
 # Pydantic models for 2FA endpoints
 class TOTPSetupResponse(user_schema.BaseModel):
@@ -182,7 +269,7 @@ from backend.app.api.dependencies import get_current_active_user # Import the de
 @limiter.limit(settings.RATE_LIMIT_DEFAULT) # Example: Apply default limit
 async def read_users_me(
     request: Request, # Added
-    current_user: account_model.Account = Depends(get_current_active_user) # Now uses imported version
+    current_user: user_schema.Principal = Depends(get_current_active_user) # Now uses imported version
 ): # Changed to async
     logger.info(f"User {current_user.username} accessed /users/me endpoint.")
     return current_user
@@ -192,21 +279,21 @@ async def read_users_me(
 async def change_current_user_password( # Changed to async
     request: Request, # Added
     password_data: user_schema.PasswordChange,
-    current_user: account_model.Account = Depends(get_current_active_user), # Now uses imported version
-    db: Session = Depends(get_db)
+    current_user: user_schema.Principal = Depends(get_current_active_user), # Now uses imported version
+    db: AsyncSession = Depends(get_db)
 ):
     logger.info(f"Password change attempt for user: {current_user.username}")
-    if not auth_service.verify_ac_password(
-        plain_password=password_data.current_password,
-        username=current_user.username, # verify_ac_password will handle casing
-        hashed_password_from_db=current_user.sha_pass_hash
-    ):
+    # The cached principal carries no password hash; load the account row (from the primary, as we're about to write it).
+    db_user = await user_crud.get_user_by_id(use_primary(db), user_id=current_user.id)
+    if db_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    if not await auth_service.verify_account_password(db_user, password_data.current_password):
         logger.warning(f"Password change failed for {current_user.username}: Incorrect current password.")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Incorrect current password.")
 
-    user_crud.update_user_password(db=db, user=current_user, new_password_plain=password_data.new_password)
+    updated_user = await user_crud.update_user_password(db=db, user=db_user, new_password_plain=password_data.new_password)
     logger.info(f"Password successfully changed for user: {current_user.username}")
-    return current_user
+    return updated_user
 
 class PasswordResetConfirm(user_schema.BaseModel): # Defined here as it's specific to this endpoint's payload
     token: str
@@ -223,26 +310,14 @@ class PasswordResetRequestPayload(user_schema.BaseModel):
 async def request_password_reset( # Already async
     request: Request, # Added
     payload: PasswordResetRequestPayload,
-    db: Session = Depends(get_db),
-    aux_db: Session = Depends(get_aux_db)
+    db: AsyncSession = Depends(get_db),
 ):
     logger.info(f"Password reset request for username: {payload.username} with CAPTCHA ID {payload.captcha_id}")
 
-    # CAPTCHA Validation
-    challenge = captcha_crud.get_challenge(aux_db, payload.captcha_id)
-    if not challenge:
-        logger.warning(f"Password reset CAPTCHA failed for {payload.username}: Invalid or expired CAPTCHA ID {payload.captcha_id}")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired CAPTCHA. Please try again.")
-
-    if challenge.answer.lower() != payload.captcha_solution.lower():
-        logger.warning(f"Password reset CAPTCHA failed for {payload.username}: Incorrect solution for CAPTCHA ID {payload.captcha_id}")
-        captcha_crud.delete_challenge(aux_db, payload.captcha_id) # Delete used challenge
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Incorrect CAPTCHA solution.")
-
-    captcha_crud.delete_challenge(aux_db, payload.captcha_id) # Delete valid challenge
-    logger.info(f"CAPTCHA validation successful for password reset for {payload.username}, ID {payload.captcha_id}")
+    await _verify_captcha(payload.captcha_id, payload.captcha_solution, f"Password reset for {payload.username}")
+    logger.info(f"CAPTCHA validation successful for password reset for {payload.username}")
 
-    user = user_crud.get_user_by_username(db, username=payload.username.upper())
+    user = await user_crud.get_user_by_username(db, username=payload.username.upper())
     if not user:
         # Even if user not found, don't reveal that. Standard practice.
         logger.info(f"Password reset requested for non-existent or provided username: {payload.username.upper()}")
@@ -263,11 +338,12 @@ class EmailVerifyRequest(user_schema.BaseModel):
 async def verify_email( # Changed to async
     request: Request, # Added
     verification_data: EmailVerifyRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     logger.info(f"Email verification attempt with token: {verification_data.token[:10]}...")
 
-    db_token = email_verification_crud.get_verification_token(db, token=verification_data.token)
+    # Read from the primary: the token is usually created moments before, and a replica may not have it yet.
+    db_token = await email_verification_crud.get_verification_token(use_primary(db), token=verification_data.token)
 
     if not db_token:
         logger.warning(f"Email verification failed: Invalid or expired token provided.")
@@ -276,7 +352,7 @@ async def verify_email( # Changed to async
             detail="Invalid or expired verification token."
         )
 
-    user = user_crud.mark_user_email_as_verified(db, user_id=db_token.user_id)
+    user = await user_crud.mark_user_email_as_verified(db, user_id=db_token.user_id)
     if not user:
         # This case should ideally not happen if token is valid and user_id exists
         logger.error(f"Email verification failed: User with ID {db_token.user_id} not found after token validation.")
@@ -285,7 +361,7 @@ async def verify_email( # Changed to async
             detail="User not found for this token."
         )
 
-    email_verification_crud.delete_verification_token(db, token_id=db_token.id)
+    await email_verification_crud.delete_verification_token(db, token_id=db_token.id)
     logger.info(f"Email successfully verified for user ID {db_token.user_id} (Username: {user.username}). Token deleted.")
 
     return {"message": "Email verified successfully."}
@@ -296,12 +372,12 @@ async def verify_email( # Changed to async
 async def confirm_password_reset( # Already async
     request: Request, # Added
     reset_data: PasswordResetConfirm,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     logger.info(f"Password reset confirmation attempt for user {reset_data.username.upper()} with token {reset_data.token}")
 
     # Username from payload should be uppercased for lookup, consistent with storage
-    user = user_crud.get_user_by_username(db, username=reset_data.username.upper())
+    user = await user_crud.get_user_by_username(db, username=reset_data.username.upper())
     if not user:
         # This check might be slightly different if token itself contains user identifier securely
         logger.warning(f"Password reset failed: User {reset_data.username.upper()} not found for token confirmation.")
@@ -311,7 +387,7 @@ async def confirm_password_reset( # Already async
     # In a real system, thẻ token itself should be the primary key for lookup, not username + token.
     # The token would be associated with a user_id and have an expiry.
     if reset_data.token == "mock_valid_token_for_" + user.username: # user.username is already uppercase
-        user_crud.update_user_password(db, user, reset_data.new_password)
+        await user_crud.update_user_password(db, user, reset_data.new_password)
         logger.info(f"Password reset for {user.username} successful via mock token.")
         return {"message": "Password has been reset successfully."}
     else:
@@ -324,26 +400,29 @@ async def confirm_password_reset( # Already async
 @limiter.limit(settings.RATE_LIMIT_2FA_SETUP)
 async def setup_2fa( # Changed to async
     request: Request, # Added
-    current_user: account_model.Account = Depends(get_current_active_user), # Now uses imported version
-    aux_db: Session = Depends(get_aux_db)
+    current_user: user_schema.Principal = Depends(get_current_active_user), # Now uses imported version
+    aux_db: AsyncSession = Depends(get_aux_db)
 ):
     logger.info(f"2FA setup initiated for user {current_user.username}")
 
     # Check if 2FA is already active
-    existing_totp = user_totp_crud.get_user_totp_secret(aux_db, current_user.id)
+    existing_totp = await user_totp_crud.get_totp_state(aux_db, current_user.id)
     if existing_totp and existing_totp.is_active:
         logger.warning(f"2FA setup attempt for {current_user.username} but 2FA is already active.")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="2FA is already active for this account.")
 
     secret = totp_service.generate_totp_secret()
-    # Store the secret (inactive) in the auxiliary database
-    user_totp_crud.create_user_totp_secret(db=aux_db, user_id=current_user.id, secret_key=secret)
 
     # Use user's email for the OTP URI if available and verified, otherwise username.
     # AC username is uppercase.
     otp_account_name = current_user.email if current_user.email_verified else current_user.username
     otp_uri = totp_service.get_totp_uri(secret, otp_account_name, issuer_name=settings.APP_NAME if hasattr(settings, 'APP_NAME') else "AzerothCoreMgr")
-    qr_code_uri = totp_service.generate_qr_code_data_uri(otp_uri)
+
+    # Store the secret (inactive) in the auxiliary database while the QR code renders in the CPU pool
+    _, qr_code_uri = await asyncio.gather(
+        user_totp_crud.create_user_totp_secret(db=aux_db, user_id=current_user.id, secret_key=secret),
+        run_cpu_bound(totp_service.render_qr_code_data_uri, otp_uri, settings.TOTP_QR_FORMAT),
+    )
 
     logger.info(f"2FA secret generated for {current_user.username}. QR code and URI provided.")
     return {
@@ -357,13 +436,13 @@ async def setup_2fa( # Changed to async
 async def enable_2fa( # Changed to async
     request: Request, # Added
     totp_data: TOTPEnableRequest,
-    current_user: account_model.Account = Depends(get_current_active_user), # Now uses imported version
-    aux_db: Session = Depends(get_aux_db)
+    current_user: user_schema.Principal = Depends(get_current_active_user), # Now uses imported version
+    aux_db: AsyncSession = Depends(get_aux_db)
 ):
     logger.info(f"2FA enable attempt for user {current_user.username}")
-    user_totp = user_totp_crud.get_user_totp_secret(aux_db, current_user.id)
+    user_totp = await user_totp_crud.get_totp_state(aux_db, current_user.id)
 
-    if not user_totp or not user_totp.secret_key:
+    if not user_totp:
         logger.warning(f"2FA enable failed for {current_user.username}: No secret found. Setup required first.")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="2FA setup not initiated or secret key missing.")
 
@@ -371,8 +450,8 @@ async def enable_2fa( # Changed to async
         logger.info(f"2FA enable attempt for {current_user.username}, but 2FA is already active.")
         return {"message": "2FA is already active."}
 
-    if totp_service.verify_totp_code(user_totp.secret_key, totp_data.totp_code):
-        user_totp_crud.activate_user_totp(aux_db, current_user.id)
+    if user_totp.verify(totp_data.totp_code):
+        await user_totp_crud.activate_user_totp(aux_db, current_user.id)
         logger.info(f"2FA successfully enabled for user {current_user.username}.")
         return {"message": "2FA has been successfully enabled."}
     else:
@@ -384,24 +463,25 @@ async def enable_2fa( # Changed to async
 class CaptchaChallengeResponse(user_schema.BaseModel):
     id: str
     question: str
+    type: str = "math" # "pow": solve by finding a solution where SHA-256("<id>:<solution>") starts with difficulty zero bits
+    difficulty: Optional[int] = None
 
 @router.get("/captcha/generate", response_model=CaptchaChallengeResponse)
 @limiter.limit(settings.RATE_LIMIT_CAPTCHA_GENERATE)
 async def generate_captcha_challenge( # Changed to async
     request: Request, # Added
-    aux_db: Session = Depends(get_aux_db)
 ):
-    # Periodically clean up expired challenges (simple strategy)
-    if random.random() < 0.1: # 10% chance to run cleanup
-        # Note: DB operations in async context. FastAPI handles sync calls in threadpool.
-        # If this were a pure async ORM, await would be needed for DB calls.
-        deleted_count = captcha_crud.delete_expired_challenges(aux_db)
-        if deleted_count > 0:
-            logger.info(f"Cleaned up {deleted_count} expired CAPTCHA challenges.")
-
+    if settings.CAPTCHA_TYPE == "pow":
+        challenge_id, difficulty = captcha_service.issue_pow_challenge(captcha_service.CAPTCHA_EXPIRY_SECONDS)
+        question = f"Find a solution such that SHA-256(id + ':' + solution) starts with {difficulty} zero bits."
+        return CaptchaChallengeResponse(id=challenge_id, question=question, type="pow", difficulty=difficulty)
     question, answer = captcha_service.generate_math_challenge()
-    challenge = captcha_crud.create_challenge(
-        db=aux_db,
+    if settings.CAPTCHA_MODE == "stateless":
+        # The id is a signed token carrying the expiry and a keyed answer digest: nothing is stored.
+        token = captcha_service.issue_signed_challenge(answer, captcha_service.CAPTCHA_EXPIRY_SECONDS)
+        return CaptchaChallengeResponse(id=token, question=question)
+    # Expired challenges are dropped by the store's TTL; no cleanup needed.
+    challenge = await captcha_crud.create_challenge(
         question=question,
         answer=answer,
         expires_in_seconds=captcha_service.CAPTCHA_EXPIRY_SECONDS
@@ -413,18 +493,18 @@ async def generate_captcha_challenge( # Changed to async
 async def disable_2fa( # Changed to async
     request: Request, # Added
     totp_data: TOTPDisableRequest,
-    current_user: account_model.Account = Depends(get_current_active_user), # Now uses imported version
-    aux_db: Session = Depends(get_aux_db)
+    current_user: user_schema.Principal = Depends(get_current_active_user), # Now uses imported version
+    aux_db: AsyncSession = Depends(get_aux_db)
 ):
     logger.info(f"2FA disable attempt for user {current_user.username}")
-    user_totp = user_totp_crud.get_user_totp_secret(aux_db, current_user.id)
+    user_totp = await user_totp_crud.get_totp_state(aux_db, current_user.id)
 
     if not user_totp or not user_totp.is_active:
         logger.warning(f"2FA disable failed for {current_user.username}: 2FA is not active.")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="2FA is not currently active.")
 
-    if totp_service.verify_totp_code(user_totp.secret_key, totp_data.totp_code):
-        user_totp_crud.deactivate_user_totp(aux_db, current_user.id) # Or delete, depending on CRUD implementation
+    if user_totp.verify(totp_data.totp_code):
+        await user_totp_crud.deactivate_user_totp(aux_db, current_user.id) # Or delete, depending on CRUD implementation
         logger.info(f"2FA successfully disabled for user {current_user.username}.")
         return {"message": "2FA has been successfully disabled."}
     else:
@@ -3,7 +3,7 @@ from pydantic import BaseModel
 from typing import Optional
 
 from backend.app.core.config import settings # Direct import of settings
-from backend.app.models.account import Account as AccountModel
+from backend.app.models.user import Principal
 from backend.app.api.dependencies import get_current_active_user # Assuming this is the correct path
 from backend.app.core.rate_limiter import limiter
 
@@ -45,7 +45,7 @@ def is_lan_ip(ip_address: str) -> bool:
 @limiter.limit(settings.RATE_LIMIT_DEFAULT) # Apply rate limiting
 async def get_client_download_info(
     request: Request,
-    current_user: AccountModel = Depends(get_current_active_user) # Require authentication
+    current_user: Principal = Depends(get_current_active_user) # Require authentication
 ):
     client_ip = request.client.host if request.client else None
     lan_available_flag = False
@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from backend.app.core.redis_client import get_async_redis, create_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Returned by cache lookups on a miss, so that None can be cached as a real value.
+MISSING = object()
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache with a per-entry expiry.
+    When full, the least recently used entry is evicted.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None) -> None:
+        """Stores a value; expires_at is a time.monotonic() deadline (defaults to now + ttl)."""
+        if self.maxsize <= 0:
+            return
+        if expires_at is None:
+            expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        """Removes and returns a live entry (MISSING if absent or expired), atomically."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None or entry[0] <= now:
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+            return entry[1]
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+# --- Two-tier (in-process + Redis) cache ---
+
+INVALIDATION_CHANNEL = "acweb:cache-invalidate"
+
+# Two-tier caches by namespace, so the invalidation listener can find them.
+_two_tier_caches: dict[str, "TwoTierCache"] = {}
+# Other in-process state that follows the same channel: namespace -> handler(key).
+_invalidation_handlers: dict[str, Callable[[str], None]] = {}
+
+def register_invalidation_handler(namespace: str, handler: Callable[[str], None]) -> None:
+    """Registers a callback for invalidations published under namespace by other workers."""
+    _invalidation_handlers[namespace] = handler
+
+async def publish_invalidation(namespace: str, key: Hashable) -> bool:
+    """Publishes an invalidation to all workers; returns False if Redis is unavailable."""
+    redis_client = get_async_redis()
+    if redis_client is None:
+        return False
+    try:
+        await redis_client.publish(INVALIDATION_CHANNEL, f"{namespace}:{key}")
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to publish invalidation for {namespace}:{key}: {e}")
+        return False
+
+async def publish_invalidations(namespace: str, keys: list) -> bool:
+    """Publishes many invalidations in one Redis round trip; returns False if Redis is unavailable."""
+    redis_client = get_async_redis()
+    if redis_client is None or not keys:
+        return False
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.publish(INVALIDATION_CHANNEL, f"{namespace}:{key}")
+            await pipe.execute()
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to publish {len(keys)} invalidation(s) for {namespace}: {e}")
+        return False
+
+class TwoTierCache:
+    """
+    In-process TTLCache in front of an optional shared Redis tier.
+
+    invalidate() removes the key from both tiers and publishes it on a Redis
+    channel, so every worker running run_invalidation_listener() drops its
+    local copy immediately. Without Redis only the local tier is used.
+    Invalidated keys are remembered for invalidation_grace_seconds, so callers
+    can refill them from an authoritative source (e.g. the primary DB rather
+    than a lagging replica).
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int,
+        ttl_seconds: int,
+        serialize: Callable[[Any], str],
+        deserialize: Callable[[str], Any],
+        use_redis: bool = True,
+        invalidation_grace_seconds: int = 30,
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.local = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._recently_invalidated = TTLCache(maxsize=max(maxsize, 1), ttl_seconds=invalidation_grace_seconds)
+        self._serialize = serialize
+        self._deserialize = deserialize
+        self._use_redis = use_redis
+        self.redis_hits = 0
+        self.redis_errors = 0
+        _two_tier_caches[namespace] = self
+
+    def _redis(self):
+        return get_async_redis() if self._use_redis else None
+
+    def _redis_key(self, key: Hashable) -> str:
+        return f"acweb:{self.namespace}:{key}"
+
+    async def get(self, key: Hashable) -> Any:
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+        redis_client = self._redis()
+        if redis_client is None:
+            return MISSING
+        try:
+            raw = await redis_client.get(self._redis_key(key))
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Cache '{self.namespace}': Redis get failed, using local tier only: {e}")
+            return MISSING
+        if raw is None:
+            return MISSING
+        value = self._deserialize(raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+        self.redis_hits += 1
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: Hashable, value: Any) -> None:
+        self.local.set(key, value)
+        redis_client = self._redis()
+        if redis_client is None:
+            return
+        try:
+            await redis_client.set(self._redis_key(key), self._serialize(value), ex=self.ttl_seconds)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Cache '{self.namespace}': Redis set failed: {e}")
+
+    def drop_local(self, key: Hashable) -> None:
+        self.local.delete(key)
+        self._recently_invalidated.set(key, True)
+
+    def was_recently_invalidated(self, key: Hashable) -> bool:
+        return self._recently_invalidated.get(key) is not MISSING
+
+    async def invalidate(self, key: Hashable) -> None:
+        self.drop_local(key)
+        redis_client = self._redis()
+        if redis_client is None:
+            return
+        try:
+            await redis_client.delete(self._redis_key(key))
+            await redis_client.publish(INVALIDATION_CHANNEL, f"{self.namespace}:{key}")
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Cache '{self.namespace}': Redis invalidation failed for key {key}: {e}")
+
+    async def invalidate_many(self, keys: list) -> None:
+        """invalidate() for many keys, with one Redis round trip."""
+        for key in keys:
+            self.drop_local(key)
+        redis_client = self._redis()
+        if redis_client is None or not keys:
+            return
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(*(self._redis_key(key) for key in keys))
+                for key in keys:
+                    pipe.publish(INVALIDATION_CHANNEL, f"{self.namespace}:{key}")
+                await pipe.execute()
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Cache '{self.namespace}': Redis invalidation failed for {len(keys)} key(s): {e}")
+
+    def stats(self) -> dict:
+        stats = self.local.stats()
+        stats.update({"redis_hits": self.redis_hits, "redis_errors": self.redis_errors})
+        return stats
+
+def _apply_invalidation(message: str) -> None:
+    namespace, _, key = message.partition(":")
+    handler = _invalidation_handlers.get(namespace)
+    if handler is not None:
+        handler(key)
+        return
+    cache = _two_tier_caches.get(namespace)
+    if cache is None:
+        return
+    # Keys arrive as strings; integer keys (e.g. user ids) are stored as ints locally.
+    cache.drop_local(key)
+    if key.isdigit():
+        cache.drop_local(int(key))
+
+async def run_invalidation_listener(retry_seconds: float = 5.0) -> None:
+    """
+    Background task: applies invalidations published by other workers to the
+    local tiers. After a (re)connect all local tiers are cleared, since
+    messages may have been missed while disconnected.
+    """
+    # Dedicated connection without a read timeout: the subscription blocks until a message arrives.
+    redis_client = create_async_redis(socket_timeout=None)
+    if redis_client is None:
+        return
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                for cache in _two_tier_caches.values():
+                    cache.local.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    _apply_invalidation(data.decode("utf-8") if isinstance(data, bytes) else data)
+        except asyncio.CancelledError:
+            await redis_client.aclose()
+            raise
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener disconnected from Redis: {e}. Retrying in {retry_seconds}s.")
+            await asyncio.sleep(retry_seconds)
@@ -1,77 +1,115 @@
-from sqlalchemy import create_engine
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .db_pool import InstrumentedAsyncQueuePool
+from .db_routing import make_routing_sessionmaker
 import logging
 
 logger = logging.getLogger(__name__)
 
-SQLALCHEMY_DATABASE_URL = f"mysql+mysqlclient://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+# Both databases are accessed through async drivers (aiomysql / aiosqlite) so that
+# DB I/O in the async endpoints never blocks the event loop.
+SQLALCHEMY_DATABASE_URL = f"mysql+aiomysql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+
+def _create_mysql_engine(url: str):
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
 
 try:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
-    # Test connection
-    with engine.connect() as connection:
-        logger.info(f"Successfully created SQLAlchemy engine for MySQL database: {settings.DB_NAME}")
+    # Engine creation is lazy; the connection itself is tested in init_db() on startup.
+    engine = _create_mysql_engine(SQLALCHEMY_DATABASE_URL)
+    logger.info(f"Successfully created async SQLAlchemy engine for MySQL database: {settings.DB_NAME}")
 except Exception as e:
-    logger.error(f"Error creating SQLAlchemy engine for MySQL: {e}")
+    logger.error(f"Error creating async SQLAlchemy engine for MySQL: {e}")
     # Fallback or exit strategy if engine creation fails
     # For now, we'll let it raise or be None if not handled elsewhere
     engine = None
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Optional read replicas of the main database
+replica_engines = []
+if engine is not None and settings.DB_REPLICA_URLS:
+    for replica_url in (url.strip() for url in settings.DB_REPLICA_URLS.split(",")):
+        if not replica_url:
+            continue
+        try:
+            replica_engines.append(_create_mysql_engine(replica_url))
+        except Exception as e:
+            logger.error(f"Error creating async SQLAlchemy engine for read replica: {e}")
+    logger.info(f"Routing read-only queries across {len(replica_engines)} read replica(s).")
+
+# Reads go to a replica (when configured), writes and everything after a write go to the primary.
+SessionLocal = make_routing_sessionmaker(engine, replica_engines)
 
 Base = declarative_base()
 
 # Auxiliary SQLite database
-AUX_SQLALCHEMY_DATABASE_URL = f"sqlite:///./{settings.AUX_DB_NAME}"
-aux_engine = create_engine(AUX_SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-AuxSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=aux_engine)
+AUX_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///./{settings.AUX_DB_NAME}"
+aux_engine = create_async_engine(AUX_SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+AuxSessionLocal = async_sessionmaker(bind=aux_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 AuxBase = declarative_base()
 
 # Dependency to get DB session in FastAPI routes
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # Dependency to get auxiliary DB session in FastAPI routes
-def get_aux_db():
-    db = AuxSessionLocal()
-    try:
+async def get_aux_db():
+    async with AuxSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-def init_db():
+async def init_db():
     # Import all modules here that might define models so that
     # they will be registered properly on the metadata. Otherwise
     # you will have to import them first before calling init_db()
     # from ..models import Account # Example, ensure your models are imported
     from ..models.email_verification_token import EmailVerificationToken # Ensure this is created
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     logger.info("Main database tables created (if they didn't exist).")
 
-def init_aux_db():
+async def init_aux_db():
     # Import all models that use AuxBase so they are registered
     from ..models.user_totp import UserTOTP
-    from ..models.captcha_challenge import CaptchaChallenge
-    AuxBase.metadata.create_all(bind=aux_engine)
+    from ..models.account_token_generation import AccountTokenGeneration
+    from ..models.email_outbox import EmailOutboxMessage
+    from ..models.refresh_token import RefreshToken, RevokedRefreshTokenFamily
+    from ..models.captcha_challenge import StoredCaptchaChallenge
+    async with aux_engine.begin() as conn:
+        await conn.run_sync(AuxBase.metadata.create_all)
     logger.info("Auxiliary database tables created (if they didn't exist).")
 
+async def dispose_engines():
+    """Closes all pooled connections of both engines (called on application shutdown)."""
+    if engine is not None:
+        await engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
+    await aux_engine.dispose()
+
 if __name__ == "__main__":
-    # This is for testing purposes if the file is run directly
-    logger.info(f"Attempting to connect with SQLAlchemy to {SQLALCHEMY_DATABASE_URL}")
-    if engine:
-        try:
-            # Test connection by creating a session
-            db = SessionLocal()
-            db.execute("SELECT 1") # Simple query to test connection
-            logger.info("SQLAlchemy test connection successful and query executed.")
-            db.close()
-        except Exception as e:
-            logger.error(f"SQLAlchemy test connection or query failed: {e}")
-    else:
-        logger.error("SQLAlchemy engine is not initialized.")
+    import asyncio
+
+    async def _test_connection():
+        # This is for testing purposes if the file is run directly
+        logger.info(f"Attempting to connect with SQLAlchemy to {SQLALCHEMY_DATABASE_URL}")
+        if engine:
+            try:
+                # Test connection by creating a session
+                async with SessionLocal() as db:
+                    await db.execute(text("SELECT 1")) # Simple query to test connection
+                logger.info("SQLAlchemy test connection successful and query executed.")
+            except Exception as e:
+                logger.error(f"SQLAlchemy test connection or query failed: {e}")
+        else:
+            logger.error("SQLAlchemy engine is not initialized.")
+
+    asyncio.run(_test_connection())
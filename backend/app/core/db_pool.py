@@ -0,0 +1,78 @@
+import time
+import threading
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from backend.app.core.metrics import Histogram
+
+class PoolMetrics:
+    """Counters and checkout-wait histogram collected by InstrumentedAsyncQueuePool."""
+
+    def __init__(self):
+        self.checkout_wait_ms = Histogram()
+        self.checkouts = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait_ms: float) -> None:
+        self.checkout_wait_ms.observe(wait_ms)
+        with self._lock:
+            self.checkouts += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records how long each checkout takes.
+    The measured time covers waiting for a free connection, opening an overflow
+    connection and the pre-ping, i.e. everything a request waits for before it
+    can run its first query.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout((time.perf_counter() - start) * 1000)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() recreates the pool; keep accumulating into the same metrics.
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
+
+def get_pool_stats(engine) -> dict | None:
+    """Returns current usage and checkout metrics for an (async) engine's pool."""
+    if engine is None:
+        return None
+    pool = engine.pool
+    stats = {
+        "pool_class": type(pool).__name__,
+        "status": pool.status(),
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update({
+            "checkouts": metrics.checkouts,
+            "timeouts": metrics.timeouts,
+            "checkout_wait_ms": metrics.checkout_wait_ms.snapshot(),
+        })
+    return stats
@@ -0,0 +1,52 @@
+import random
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+# Session.info flag: once set, every statement of the session goes to the primary.
+USE_PRIMARY = "use_primary"
+
+class RoutingSession(Session):
+    """
+    Session that routes reads to a random replica and writes to the primary.
+
+    The first write (a flush, or an INSERT/UPDATE/DELETE statement) makes the
+    session sticky to the primary, so a request always reads its own writes,
+    e.g. the refresh() that follows a commit. Subclasses created by
+    make_routing_sessionmaker() set primary_engine and replica_engines.
+    """
+
+    primary_engine: AsyncEngine | None = None
+    replica_engines: tuple[AsyncEngine, ...] = ()
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.primary_engine is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        if self.info.get(USE_PRIMARY) or not self.replica_engines:
+            return self.primary_engine.sync_engine
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info[USE_PRIMARY] = True
+            return self.primary_engine.sync_engine
+        return random.choice(self.replica_engines).sync_engine
+
+def make_routing_sessionmaker(primary: AsyncEngine | None, replicas: list[AsyncEngine]) -> async_sessionmaker:
+    """Builds an async session factory that spreads reads over the given replicas."""
+    session_class = type(
+        "RoutingSession",
+        (RoutingSession,),
+        {"primary_engine": primary, "replica_engines": tuple(replicas)},
+    )
+    # expire_on_commit=False: objects returned by CRUD functions stay readable after commit
+    # without an implicit (and in async mode, illegal) lazy refresh.
+    return async_sessionmaker(
+        bind=primary,
+        class_=AsyncSession,
+        sync_session_class=session_class,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+def use_primary(db: AsyncSession) -> AsyncSession:
+    """Pins the session to the primary, for reads that must see the latest committed data."""
+    db.sync_session.info[USE_PRIMARY] = True
+    return db
@@ -0,0 +1,66 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Sequence
+
+# Default latency buckets in milliseconds (upper bounds, Prometheus-style "le").
+DEFAULT_LATENCY_BUCKETS_MS: tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class Histogram:
+    """
+    Small fixed-bucket histogram for in-process latency metrics.
+    Observations are in milliseconds; the last implicit bucket is +Inf.
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        self._bounds = tuple(sorted(buckets_ms))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms: float) -> None:
+        index = bisect.bisect_left(self._bounds, value_ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum_ms += value_ms
+            if value_ms > self._max_ms:
+                self._max_ms = value_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            count, sum_ms, max_ms = self._count, self._sum_ms, self._max_ms
+        buckets = {f"le_{bound:g}": counts[i] for i, bound in enumerate(self._bounds)}
+        buckets["le_inf"] = counts[-1]
+        return {
+            "count": count,
+            "sum_ms": round(sum_ms, 3),
+            "avg_ms": round(sum_ms / count, 3) if count else 0.0,
+            "max_ms": round(max_ms, 3),
+            "buckets": buckets,
+        }
+
+class StageTimer:
+    """
+    Wall-clock durations of the named stages of one request.
+    Rendered as a Server-Timing header, so per-request timings show up in browser dev tools.
+    """
+
+    def __init__(self):
+        self.durations_ms: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.durations_ms[name] = self.durations_ms.get(name, 0.0) + elapsed_ms
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={duration:.2f}" for name, duration in self.durations_ms.items())
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: ProcessPoolExecutor | None = None
+_slots: asyncio.Semaphore | None = None
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor, _slots
+    if _executor is None:
+        # 'spawn': forking a process that runs an event loop and driver threads is unsafe.
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.CPU_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        _slots = asyncio.Semaphore(settings.CPU_POOL_WORKERS + settings.CPU_POOL_MAX_QUEUED)
+        logger.info(f"Started CPU worker pool with {settings.CPU_POOL_WORKERS} process(es).")
+    return _executor
+
+async def run_cpu_bound(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Runs a CPU-bound, picklable top-level function in the worker process pool so it doesn't
+    block the event loop. At most CPU_POOL_WORKERS + CPU_POOL_MAX_QUEUED jobs are in flight;
+    further callers wait here instead of growing the executor's queue without bound.
+    With CPU_POOL_WORKERS=0 the function runs inline.
+    """
+    if settings.CPU_POOL_WORKERS <= 0:
+        return func(*args)
+    executor = _get_executor()
+    async with _slots:
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+def shutdown_process_pool() -> None:
+    """Stops the worker processes (called on application shutdown)."""
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        _slots = None
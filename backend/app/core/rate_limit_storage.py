@@ -0,0 +1,382 @@
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from math import floor
+
+import redis
+from limits.storage import Storage, SlidingWindowCounterSupport
+from limits.storage.base import TimestampedSlidingWindow
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "acweb:ratelimit:"
+
+# After a failed sync, hits stop triggering inline syncs for this long (the periodic sync keeps
+# retrying), so a Redis outage doesn't stall the event loop on a connect timeout for every request.
+SYNC_RETRY_SECONDS = 5
+
+@dataclass
+class _Counter:
+    synced: int = 0 # Hits from all processes, as of this process's last sync of the key
+    pending: int = 0 # Hits admitted here that aren't in Redis yet
+    expires_at: float = 0.0
+    touched: bool = False # Read since the last sync, so worth refreshing from Redis
+    fetched: bool = False # Synced at least once
+
+class TwoTierRedisStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    Sliding window counter storage that decides every hit from in-process counters, which are
+    reconciled with Redis in batches: sync() sends one pipeline of INCRBY/GET for all keys used since
+    the previous sync. A key with max_pending unsynced hits is synced right away, so each process
+    admits at most max_pending hits per key that other processes haven't seen yet: a limit can be
+    exceeded by at most max_pending times the number of processes.
+
+    While Redis is unreachable, hits keep being counted locally (each process enforces the limit
+    on its own) and are added to Redis once it is back.
+    """
+
+    STORAGE_SCHEME = ["twotier+redis"]
+
+    def __init__(
+        self,
+        uri: str,
+        wrap_exceptions: bool = False,
+        max_pending: int = 10,
+        connection_pool: redis.ConnectionPool | None = None,
+        **options,
+    ):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+        if connection_pool is not None:
+            self._redis = redis.Redis(connection_pool=connection_pool)
+        else:
+            self._redis = redis.Redis.from_url(
+                uri.replace("twotier+", "", 1), socket_connect_timeout=1, socket_timeout=1, **options
+            )
+        self.max_pending = max(1, int(max_pending))
+        self._counters: dict[str, _Counter] = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock() # One sync at a time, so a hit is never sent twice
+        self._retry_inline_at = 0.0
+        self.syncs = 0
+        self.inline_syncs = 0
+        self.sync_errors = 0
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return redis.RedisError
+
+    def _counter(self, key: str, expires_at: float) -> _Counter:
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = _Counter(expires_at=expires_at)
+        return counter
+
+    def _count(self, key: str) -> int:
+        counter = self._counters.get(key)
+        return counter.synced + counter.pending if counter is not None else 0
+
+    def _window(self, key: str, expiry: int, now: float) -> tuple[_Counter, _Counter]:
+        """The previous and current window counters of a limit, marked for refreshing at the next sync."""
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        window_start = int(now / expiry) * expiry
+        previous = self._counter(previous_key, window_start + expiry)
+        current = self._counter(current_key, window_start + 2 * expiry)
+        current.touched = True
+        # A previous window only changes by other processes' last pending hits: one refresh will do
+        previous.touched = previous.touched or not previous.fetched
+        return previous, current
+
+    @staticmethod
+    def _weighted_count(previous: _Counter, current: _Counter, expiry: int, now: float) -> float:
+        previous_count = previous.synced + previous.pending
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        return previous_count * previous_ttl / expiry + current.synced + current.pending
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._lock:
+            previous, current = self._window(key, expiry, now)
+            if floor(self._weighted_count(previous, current, expiry, now)) + amount > limit:
+                return False
+            current.pending += amount
+            sync_now = current.pending >= self.max_pending and now >= self._retry_inline_at
+        if sync_now:
+            self.inline_syncs += 1
+            self.sync()
+        return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        now = time.time()
+        with self._lock:
+            previous, current = self._window(key, expiry, now)
+            previous_count = previous.synced + previous.pending
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+            current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+            return previous_count, previous_ttl, current.synced + current.pending, current_ttl
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        for window_key in self.sliding_window_keys(key, expiry, time.time()):
+            self.clear(window_key)
+
+    def sync(self) -> None:
+        """
+        Adds this process's pending hits to the Redis counters and refreshes the local copies of all
+        keys read since the last sync, in one pipeline. Redis errors are logged, not raised: the
+        hits stay pending and are sent by the next sync.
+        """
+        with self._sync_lock:
+            now = time.time()
+            with self._lock:
+                for key in [key for key, counter in self._counters.items() if counter.expires_at <= now]:
+                    del self._counters[key]
+                batch = [(key, counter.pending, counter.expires_at) for key, counter in self._counters.items() if counter.touched]
+                for key, _, _ in batch:
+                    self._counters[key].touched = False
+            if not batch:
+                return
+            try:
+                with self._redis.pipeline(transaction=False) as pipe:
+                    for key, pending, expires_at in batch:
+                        if pending:
+                            pipe.incrby(KEY_PREFIX + key, pending)
+                            pipe.expireat(KEY_PREFIX + key, int(expires_at) + 1)
+                        else:
+                            pipe.get(KEY_PREFIX + key)
+                    results = iter(pipe.execute())
+            except redis.RedisError as e:
+                self.sync_errors += 1
+                if not self._retry_inline_at: # Logged once per outage
+                    logger.warning(f"Rate limit sync with Redis failed, limiting per process until it succeeds: {e}")
+                self._retry_inline_at = time.time() + SYNC_RETRY_SECONDS
+                with self._lock:
+                    for key, _, _ in batch:
+                        if key in self._counters:
+                            self._counters[key].touched = True
+                return
+            with self._lock:
+                for key, pending, _ in batch:
+                    count = int(next(results) or 0)
+                    if pending:
+                        next(results) # EXPIREAT
+                    counter = self._counters.get(key)
+                    if counter is not None:
+                        # Hits admitted during the round trip stay pending
+                        counter.pending = max(0, counter.pending - pending)
+                        counter.synced = count
+                        counter.fetched = True
+            self.syncs += 1
+            if self._retry_inline_at:
+                logger.info("Rate limit sync with Redis recovered.")
+                self._retry_inline_at = 0.0
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        with self._lock:
+            counter = self._counter(key, time.time() + expiry)
+            counter.pending += amount
+            counter.touched = True
+            return counter.synced + counter.pending
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            return self._count(key)
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            counter = self._counters.get(key)
+            return counter.expires_at if counter is not None else time.time()
+
+    def check(self) -> bool:
+        try:
+            return bool(self._redis.ping())
+        except redis.RedisError:
+            return False
+
+    def reset(self) -> int | None:
+        with self._lock:
+            self._counters.clear()
+        keys = list(self._redis.scan_iter(match=KEY_PREFIX + "*"))
+        if keys:
+            self._redis.delete(*keys)
+        return len(keys)
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+        self._redis.delete(KEY_PREFIX + key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending_hits = sum(counter.pending for counter in self._counters.values())
+            keys = len(self._counters)
+        return {
+            "keys": keys,
+            "pending_hits": pending_hits,
+            "max_pending": self.max_pending,
+            "syncs": self.syncs,
+            "inline_syncs": self.inline_syncs,
+            "sync_errors": self.sync_errors,
+        }
+
+class _Window:
+    """Sliding window counter of one limit: hits in the current and the previous fixed window."""
+    __slots__ = ("index", "expiry", "previous", "current")
+
+    def __init__(self, index: int, expiry: int):
+        self.index = index # Current window: [index * expiry, (index + 1) * expiry)
+        self.expiry = expiry
+        self.previous = 0
+        self.current = 0
+
+    def advance(self, index: int) -> None:
+        if index == self.index + 1:
+            self.previous, self.current = self.current, 0
+        elif index != self.index:
+            self.previous = self.current = 0
+        self.index = index
+
+    def expires_at(self) -> float:
+        """After this, neither window counts any more and the entry can be dropped."""
+        return (self.index + 2) * self.expiry
+
+# Memory per key besides the key string: the _Window, its window index int and the OrderedDict
+# entry (measured with tracemalloc on CPython 3.11)
+ENTRY_OVERHEAD_BYTES = 190
+
+class BoundedMemoryStorage(Storage, SlidingWindowCounterSupport):
+    """
+    In-process sliding window counter storage with a hard memory cap. Each limit key is one small
+    _Window (two counts) instead of a timestamp per hit, entries are dropped once both windows have
+    passed, and when a new key would exceed max_bytes the least recently used keys are evicted.
+    An evicted client starts over with a fresh allowance, so size max_bytes for the clients you
+    expect; under a scan from many addresses it's the scanner's one-off keys that go first.
+    """
+
+    STORAGE_SCHEME = ["bounded-memory"]
+
+    def __init__(self, uri: str | None = None, wrap_exceptions: bool = False, max_bytes: int = 16_000_000, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+        self.max_bytes = int(max_bytes)
+        self._entries: OrderedDict[str, _Window] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return ValueError # Never raised: nothing here can fail like a remote store
+
+    @staticmethod
+    def _entry_bytes(key: str) -> int:
+        return sys.getsizeof(key) + ENTRY_OVERHEAD_BYTES
+
+    def _drop(self, key: str) -> None:
+        del self._entries[key]
+        self.bytes_used -= self._entry_bytes(key)
+
+    def _window(self, key: str, expiry: int, now: float) -> _Window:
+        """The key's counter, advanced to now; created (making room for it) if needed."""
+        index = int(now / expiry)
+        window = self._entries.get(key)
+        if window is not None:
+            self._entries.move_to_end(key)
+            window.advance(index)
+            return window
+        size = self._entry_bytes(key)
+        # Idle keys sit at the LRU end: drop the expired ones, then evict live ones if still over the cap
+        while self._entries:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            if oldest.expires_at() <= now:
+                self.expired += 1
+            elif self.bytes_used + size > self.max_bytes:
+                self.evictions += 1
+            else:
+                break
+            self._drop(oldest_key)
+        window = self._entries[key] = _Window(index, expiry)
+        self.bytes_used += size
+        return window
+
+    @staticmethod
+    def _previous_ttl(window: _Window, now: float) -> float:
+        """How much of the previous window still overlaps the sliding window, in seconds."""
+        if not window.previous:
+            return 0.0
+        return (1 - (((now - window.expiry) / window.expiry) % 1)) * window.expiry
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._lock:
+            window = self._window(key, expiry, now)
+            weighted_count = window.previous * self._previous_ttl(window, now) / expiry + window.current
+            if floor(weighted_count) + amount > limit:
+                return False
+            window.current += amount
+            return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        now = time.time()
+        with self._lock:
+            window = self._entries.get(key)
+            if window is None:
+                return 0, 0.0, 0, float(expiry)
+            window.advance(int(now / expiry))
+            current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+            return window.previous, self._previous_ttl(window, now), window.current, current_ttl
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        self.clear(key)
+
+    # Fixed window support (limits' "fixed-window" strategy), on the same entries: windows are
+    # aligned to multiples of expiry
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        with self._lock:
+            window = self._window(key, expiry, time.time())
+            window.current += amount
+            return window.current
+
+    def get(self, key: str) -> int:
+        now = time.time()
+        with self._lock:
+            window = self._entries.get(key)
+            if window is None:
+                return 0
+            window.advance(int(now / window.expiry))
+            return window.current
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            window = self._entries.get(key)
+            return (window.index + 1) * window.expiry if window is not None else time.time()
+
+    def check(self) -> bool:
+        return True
+
+    def reset(self) -> int | None:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self.bytes_used = 0
+            return count
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._entries),
+            "bytes_used": self.bytes_used,
+            "max_bytes": self.max_bytes,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
@@ -1,6 +1,8 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from backend.app.core.config import settings
+from backend.app.core.rate_limit_storage import BoundedMemoryStorage, TwoTierRedisStorage # Register their URI schemes
+import asyncio
 import logging
 import redis # Import for explicit check
 
@@ -30,6 +32,19 @@ def get_storage_uri():
     return "memory://"
 
 limiter_storage_uri = get_storage_uri()
+limiter_strategy = "moving-window" # Recommended for fairness
+limiter_storage_options = {}
+if limiter_storage_uri.startswith("redis://") and settings.RATE_LIMIT_REDIS_MODE == "two-tier":
+    # Hits are counted in-process and added to Redis in batches instead of one round trip each
+    limiter_storage_uri = f"twotier+{limiter_storage_uri}"
+    limiter_strategy = "sliding-window-counter"
+    limiter_storage_options = {"max_pending": settings.RATE_LIMIT_SYNC_MAX_PENDING}
+    logger.info(f"Rate limiter syncs with Redis in batches (up to {settings.RATE_LIMIT_SYNC_MAX_PENDING} unsynced hits per key and process).")
+elif limiter_storage_uri == "memory://":
+    # limits' memory:// keeps a timestamp per hit for every client forever; this one is capped
+    limiter_storage_uri = "bounded-memory://"
+    limiter_strategy = "sliding-window-counter"
+    limiter_storage_options = {"max_bytes": settings.RATE_LIMIT_MEMORY_MAX_BYTES}
 
 # Determine default limits based on whether rate limiting is enabled
 if settings.RATE_LIMIT_ENABLED:
@@ -49,6 +64,24 @@ limiter = Limiter(
     key_func=get_remote_address,
     default_limits=default_limits_list,
     storage_uri=limiter_storage_uri,
-    strategy="moving-window",  # Recommended for fairness
+    storage_options=limiter_storage_options,
+    strategy=limiter_strategy,
     # auto_check=True # auto_check is True by default
 )
+
+def get_two_tier_storage() -> TwoTierRedisStorage | None:
+    storage = limiter.limiter.storage
+    return storage if isinstance(storage, TwoTierRedisStorage) else None
+
+async def sync_with_redis() -> None:
+    """Background task body: sends this process's pending hits to Redis (two-tier mode only)."""
+    storage = get_two_tier_storage()
+    if storage is not None:
+        await asyncio.to_thread(storage.sync)
+
+def get_stats() -> dict:
+    storage = limiter.limiter.storage
+    stats = {"storage": limiter_storage_uri.split("://")[0], "strategy": limiter_strategy}
+    if isinstance(storage, (TwoTierRedisStorage, BoundedMemoryStorage)):
+        stats.update(storage.stats())
+    return stats
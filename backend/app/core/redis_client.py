@@ -0,0 +1,43 @@
+import logging
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+
+def get_async_redis():
+    """
+    Returns a shared redis.asyncio client, or None if Redis is not configured.
+    The client connects lazily; callers must handle redis.exceptions.RedisError
+    and fall back to their in-process behaviour when Redis is unreachable.
+    """
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = create_async_redis()
+    return _redis_client
+
+def create_async_redis(socket_timeout: float | None = 1):
+    """
+    Creates a new redis.asyncio client (None if Redis is not configured).
+    Use socket_timeout=None for long-blocking connections such as pub/sub listeners.
+    """
+    if not settings.REDIS_HOST:
+        return None
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError as e:
+        logger.warning(f"Redis configured but redis.asyncio is unavailable: {e}")
+        return None
+    return redis_asyncio.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        socket_connect_timeout=1,
+        socket_timeout=socket_timeout,
+    )
+
+async def close_async_redis():
+    """Closes the shared client (called on application shutdown)."""
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+async def run_periodically(func: Callable[[], Awaitable], interval_seconds: float, name: str, run_first: bool = False) -> None:
+    """
+    Background task: awaits func() every interval_seconds, logging (not propagating) failures.
+    With run_first, func() also runs right away instead of after the first interval.
+    """
+    first = True
+    while True:
+        if not (first and run_first):
+            await asyncio.sleep(interval_seconds)
+        first = False
+        try:
+            await func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Periodic task '{name}' failed: {e}")
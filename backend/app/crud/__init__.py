@@ -9,6 +9,7 @@
 from . import email_verification
 from . import user_totp
 from . import captcha
+from . import token_generation
 
 # Or directly expose functions:
 from .user import get_user_by_username, create_user, authenticate_user, update_user_password, get_user_by_email, get_user_by_id
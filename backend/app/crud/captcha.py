@@ -1,40 +1,125 @@
-import datetime
-from sqlalchemy.orm import Session
-from backend.app.models.captcha_challenge import CaptchaChallenge
-
-def create_challenge(db: Session, question: str, answer: str, expires_in_seconds: int) -> CaptchaChallenge:
-    expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=expires_in_seconds)
-    db_challenge = CaptchaChallenge(
-        question=question,
-        answer=answer,
-        expires_at=expires_at
-    )
-    db.add(db_challenge)
-    db.commit()
-    db.refresh(db_challenge)
-    return db_challenge
-
-def get_challenge(db: Session, challenge_id: str) -> CaptchaChallenge | None:
-    challenge = db.query(CaptchaChallenge).filter(CaptchaChallenge.id == challenge_id).first()
-    if challenge:
-        # Optional: Check for expiry here and delete if expired, then return None
-        if challenge.expires_at < datetime.datetime.utcnow():
-            delete_challenge(db, challenge_id=challenge.id)
-            return None
-        return challenge
-    return None
-
-def delete_challenge(db: Session, challenge_id: str) -> bool:
-    challenge = db.query(CaptchaChallenge).filter(CaptchaChallenge.id == challenge_id).first()
-    if challenge:
-        db.delete(challenge)
-        db.commit()
-        return True
-    return False
-
-def delete_expired_challenges(db: Session) -> int:
-    """Deletes all expired CAPTCHA challenges and returns the count of deleted items."""
-    now = datetime.datetime.utcnow()
-    expired_count = db.query(CaptchaChallenge).filter(CaptchaChallenge.expires_at < now).delete()
-    db.commit()
-    return expired_count
+import json
+import time
+import uuid
+from dataclasses import dataclass, asdict
+
+from sqlalchemy import delete
+
+from backend.app.core.cache import TTLCache, MISSING
+from backend.app.core.config import settings
+from backend.app.core.database import AuxSessionLocal
+from backend.app.core.redis_client import get_async_redis
+from backend.app.models.captcha_challenge import StoredCaptchaChallenge
+from backend.app.services.captcha_service import CAPTCHA_EXPIRY_SECONDS
+
+# Issuing a challenge is a single write and verifying one a single atomic take (get + delete),
+# so challenges are single-use. Redis is preferred: it expires challenges natively and keeps
+# the aux SQLite database (a single writer) out of registration traffic.
+
+@dataclass
+class CaptchaChallenge:
+    id: str
+    question: str
+    answer: str
+
+class _DatabaseCaptchaStore:
+    """
+    Store for deployments without Redis, in the aux DB: shared by all workers, so a challenge can
+    be answered on any of them. Expired rows are removed by purge_expired().
+    """
+
+    async def put(self, challenge: CaptchaChallenge, expires_in_seconds: int) -> None:
+        async with AuxSessionLocal() as aux_db:
+            aux_db.add(StoredCaptchaChallenge(**asdict(challenge), expires_at=time.time() + expires_in_seconds))
+            await aux_db.commit()
+
+    async def take(self, challenge_id: str) -> CaptchaChallenge | None:
+        async with AuxSessionLocal() as aux_db:
+            # DELETE ... RETURNING: atomic, a challenge can't be used twice
+            result = await aux_db.execute(
+                delete(StoredCaptchaChallenge)
+                .where(StoredCaptchaChallenge.id == challenge_id, StoredCaptchaChallenge.expires_at > time.time())
+                .returning(StoredCaptchaChallenge.question, StoredCaptchaChallenge.answer)
+            )
+            row = result.first()
+            await aux_db.commit()
+        return CaptchaChallenge(id=challenge_id, question=row.question, answer=row.answer) if row else None
+
+    async def purge_expired(self) -> int:
+        async with AuxSessionLocal() as aux_db:
+            result = await aux_db.execute(delete(StoredCaptchaChallenge).where(StoredCaptchaChallenge.expires_at <= time.time()))
+            await aux_db.commit()
+        return result.rowcount
+
+    def stats(self) -> dict:
+        return {"backend": "aux_db"}
+
+class _MemoryCaptchaStore:
+    """
+    Per-worker store, only for single-worker deployments (CAPTCHA_STORE="memory"): a challenge must
+    be answered on the worker that issued it. When full, the oldest challenges are evicted.
+    """
+
+    def __init__(self, maxsize: int):
+        self._challenges = TTLCache(maxsize=maxsize, ttl_seconds=CAPTCHA_EXPIRY_SECONDS)
+
+    async def put(self, challenge: CaptchaChallenge, expires_in_seconds: int) -> None:
+        self._challenges.set(challenge.id, challenge, expires_at=time.monotonic() + expires_in_seconds)
+
+    async def take(self, challenge_id: str) -> CaptchaChallenge | None:
+        challenge = self._challenges.pop(challenge_id)
+        return None if challenge is MISSING else challenge
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._challenges.stats()}
+
+class _RedisCaptchaStore:
+    """Shared store; each challenge is one key whose Redis TTL is the challenge expiry."""
+
+    def __init__(self, redis_client):
+        self._redis = redis_client
+
+    async def put(self, challenge: CaptchaChallenge, expires_in_seconds: int) -> None:
+        await self._redis.set(f"acweb:captcha:{challenge.id}", json.dumps(asdict(challenge)), ex=expires_in_seconds)
+
+    async def take(self, challenge_id: str) -> CaptchaChallenge | None:
+        raw = await self._redis.getdel(f"acweb:captcha:{challenge_id}") # Atomic: a challenge can't be used twice
+        return CaptchaChallenge(**json.loads(raw)) if raw else None
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+_database_store = _DatabaseCaptchaStore()
+_memory_store = _MemoryCaptchaStore(maxsize=settings.CAPTCHA_STORE_MAX_ENTRIES)
+
+def _get_store():
+    if settings.CAPTCHA_STORE == "memory":
+        return _memory_store
+    if settings.CAPTCHA_STORE == "database":
+        return _database_store
+    redis_client = get_async_redis()
+    if redis_client is None:
+        if settings.CAPTCHA_STORE == "redis":
+            raise RuntimeError("CAPTCHA_STORE is 'redis' but REDIS_HOST is not configured.")
+        return _database_store
+    return _RedisCaptchaStore(redis_client)
+
+async def create_challenge(question: str, answer: str, expires_in_seconds: int) -> CaptchaChallenge:
+    challenge = CaptchaChallenge(id=str(uuid.uuid4()), question=question, answer=answer)
+    await _get_store().put(challenge, expires_in_seconds)
+    return challenge
+
+async def take_challenge(challenge_id: str) -> CaptchaChallenge | None:
+    """
+    Removes and returns a challenge, or None if it's unknown, expired or was already taken.
+    Every verification attempt consumes the challenge, right or wrong, so answers can't be brute-forced.
+    """
+    return await _get_store().take(challenge_id)
+
+async def purge_expired() -> int:
+    """Removes expired challenges from the aux DB; the other stores expire them on their own."""
+    store = _get_store()
+    return await store.purge_expired() if isinstance(store, _DatabaseCaptchaStore) else 0
+
+def get_stats() -> dict:
+    return _get_store().stats()
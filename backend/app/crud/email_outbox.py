@@ -0,0 +1,107 @@
+import datetime
+from sqlalchemy import and_, case, delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.models.email_outbox import EmailOutboxMessage
+
+async def enqueue_email(db: AsyncSession, recipient: str, subject: str, body: str) -> EmailOutboxMessage:
+    db_message = EmailOutboxMessage(recipient=recipient, subject=subject, body=body)
+    db.add(db_message)
+    await db.commit()
+    await db.refresh(db_message)
+    return db_message
+
+async def enqueue_emails(db: AsyncSession, recipients: list[str], subject: str, body: str) -> None:
+    """Queues the same email for many recipients in one transaction."""
+    now = datetime.datetime.utcnow()
+    await db.execute(
+        insert(EmailOutboxMessage),
+        [{"recipient": recipient, "subject": subject, "body": body, "next_attempt_at": now, "created_at": now} for recipient in recipients],
+    )
+    await db.commit()
+
+LAPSED_CLAIM_ERROR = "Claim lapsed: the worker sending it stopped or hung"
+
+def _lapsed_claim():
+    return and_(EmailOutboxMessage.status == "sending", EmailOutboxMessage.next_attempt_at <= datetime.datetime.utcnow())
+
+async def dead_letter_lapsed_claims(db: AsyncSession, max_attempts: int) -> int:
+    """
+    Dead-letters messages whose claim lapsed on their last allowed attempt, i.e. every worker that
+    tried to send them stopped or hung before recording an outcome. Returns how many there were.
+    """
+    result = await db.execute(
+        update(EmailOutboxMessage)
+        .where(_lapsed_claim(), EmailOutboxMessage.attempts + 1 >= max_attempts)
+        .values(status="dead", attempts=EmailOutboxMessage.attempts + 1, last_error=LAPSED_CLAIM_ERROR)
+    )
+    await db.commit()
+    return result.rowcount
+
+async def claim_due_messages(db: AsyncSession, limit: int, lease_seconds: int, max_attempts: int) -> list[EmailOutboxMessage]:
+    """
+    Claims up to limit due messages for delivery: pending ones whose retry time has come,
+    and ones whose previous claim lapsed. A lapsed claim counts as a failed attempt, so a message
+    that crashes or hangs its worker still reaches max_attempts; messages at their last attempt
+    are left to dead_letter_lapsed_claims(). Each claim is a conditional update, so concurrent
+    workers (in this or other processes) never claim the same message.
+    """
+    now = datetime.datetime.utcnow()
+    due = (
+        or_(
+            and_(EmailOutboxMessage.status == "pending", EmailOutboxMessage.next_attempt_at <= now),
+            and_(_lapsed_claim(), EmailOutboxMessage.attempts + 1 < max_attempts),
+        ),
+    )
+    result = await db.execute(
+        select(EmailOutboxMessage.id).where(*due).order_by(EmailOutboxMessage.next_attempt_at).limit(limit)
+    )
+    claimed_ids = []
+    lease_expires_at = now + datetime.timedelta(seconds=lease_seconds)
+    lapsed = EmailOutboxMessage.status == "sending"
+    for message_id in result.scalars().all():
+        claim = await db.execute(
+            update(EmailOutboxMessage)
+            .where(EmailOutboxMessage.id == message_id, *due)
+            .values(
+                status="sending",
+                next_attempt_at=lease_expires_at,
+                attempts=case((lapsed, EmailOutboxMessage.attempts + 1), else_=EmailOutboxMessage.attempts),
+                last_error=case((lapsed, LAPSED_CLAIM_ERROR), else_=EmailOutboxMessage.last_error),
+            )
+        )
+        if claim.rowcount:
+            claimed_ids.append(message_id)
+    await db.commit()
+    if not claimed_ids:
+        return []
+    result = await db.execute(
+        select(EmailOutboxMessage).where(EmailOutboxMessage.id.in_(claimed_ids)).order_by(EmailOutboxMessage.id)
+    )
+    return list(result.scalars().all())
+
+async def delete_messages(db: AsyncSession, message_ids: list[int]) -> None:
+    """Removes delivered messages."""
+    await db.execute(delete(EmailOutboxMessage).where(EmailOutboxMessage.id.in_(message_ids)))
+    await db.commit()
+
+async def record_failure(db: AsyncSession, message_id: int, error: str, retry_at: datetime.datetime | None) -> None:
+    """Counts a failed delivery attempt; the message is retried at retry_at, or dead-lettered if it's None."""
+    values = {"attempts": EmailOutboxMessage.attempts + 1, "last_error": error[:1000]}
+    if retry_at is None:
+        values["status"] = "dead"
+    else:
+        values.update(status="pending", next_attempt_at=retry_at)
+    await db.execute(update(EmailOutboxMessage).where(EmailOutboxMessage.id == message_id).values(**values))
+    await db.commit()
+
+async def count_by_status(db: AsyncSession) -> dict[str, int]:
+    result = await db.execute(
+        select(EmailOutboxMessage.status, func.count()).group_by(EmailOutboxMessage.status)
+    )
+    return dict(result.all())
+
+async def get_oldest_pending_created_at(db: AsyncSession) -> datetime.datetime | None:
+    result = await db.execute(
+        select(func.min(EmailOutboxMessage.created_at)).where(EmailOutboxMessage.status.in_(("pending", "sending")))
+    )
+    return result.scalar_one()
@@ -0,0 +1,50 @@
+import time
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.models.refresh_token import RefreshToken, RevokedRefreshTokenFamily
+
+async def create_refresh_token(db: AsyncSession, digest: str, user_id: int, username: str, generation: int, family_id: str, expires_at: float) -> None:
+    db.add(RefreshToken(
+        digest=digest, user_id=user_id, username=username, generation=generation, family_id=family_id, expires_at=expires_at
+    ))
+    await db.commit()
+
+async def consume_refresh_token(db: AsyncSession, digest: str) -> RefreshToken | None:
+    """Marks an unused token used and returns it; None if it's unknown or already used. Atomic across workers."""
+    claim = await db.execute(
+        update(RefreshToken).where(RefreshToken.digest == digest, RefreshToken.used.is_(False)).values(used=True)
+    )
+    await db.commit()
+    if not claim.rowcount:
+        return None
+    result = await db.execute(select(RefreshToken).where(RefreshToken.digest == digest))
+    return result.scalars().first()
+
+async def get_used_family(db: AsyncSession, digest: str) -> str | None:
+    result = await db.execute(
+        select(RefreshToken.family_id).where(RefreshToken.digest == digest, RefreshToken.used.is_(True))
+    )
+    return result.scalar_one_or_none()
+
+async def revoke_family(db: AsyncSession, family_id: str, expires_at: float) -> None:
+    await db.execute(
+        sqlite_insert(RevokedRefreshTokenFamily)
+        .values(family_id=family_id, expires_at=expires_at)
+        .on_conflict_do_update(index_elements=["family_id"], set_={"expires_at": expires_at})
+    )
+    await db.commit()
+
+async def is_family_revoked(db: AsyncSession, family_id: str) -> bool:
+    result = await db.execute(
+        select(RevokedRefreshTokenFamily.family_id).where(RevokedRefreshTokenFamily.family_id == family_id)
+    )
+    return result.scalar_one_or_none() is not None
+
+async def purge_expired(db: AsyncSession) -> int:
+    """Deletes expired tokens and family revocations; returns how many tokens were removed."""
+    now = time.time()
+    result = await db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= now))
+    await db.execute(delete(RevokedRefreshTokenFamily).where(RevokedRefreshTokenFamily.expires_at <= now))
+    await db.commit()
+    return result.rowcount
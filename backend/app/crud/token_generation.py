@@ -0,0 +1,46 @@
+import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.models.account_token_generation import AccountTokenGeneration
+
+async def get_all_generations(db: AsyncSession) -> dict[int, int]:
+    """Returns {user_id: generation} for every account whose tokens were ever revoked."""
+    result = await db.execute(select(AccountTokenGeneration.user_id, AccountTokenGeneration.generation))
+    return {user_id: generation for user_id, generation in result.all()}
+
+async def get_generation(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(select(AccountTokenGeneration.generation).filter(AccountTokenGeneration.user_id == user_id))
+    return result.scalar_one_or_none() or 0
+
+async def increment_generation(db: AsyncSession, user_id: int) -> int:
+    """Bumps an account's token generation and returns the new value."""
+    result = await db.execute(select(AccountTokenGeneration).filter(AccountTokenGeneration.user_id == user_id))
+    db_generation = result.scalars().first()
+    if db_generation:
+        db_generation.generation += 1
+        db_generation.updated_at = datetime.datetime.utcnow()
+    else:
+        db_generation = AccountTokenGeneration(user_id=user_id, generation=1)
+        db.add(db_generation)
+    await db.commit()
+    return db_generation.generation
+
+async def increment_generations(db: AsyncSession, user_ids: list[int], batch_size: int = 500) -> dict[int, int]:
+    """Bumps the token generation of many accounts in one transaction; returns {user_id: new generation}."""
+    now = datetime.datetime.utcnow()
+    generations = {}
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        result = await db.execute(select(AccountTokenGeneration).filter(AccountTokenGeneration.user_id.in_(batch)))
+        existing = {row.user_id: row for row in result.scalars()}
+        for user_id in batch:
+            db_generation = existing.get(user_id)
+            if db_generation:
+                db_generation.generation += 1
+                db_generation.updated_at = now
+            else:
+                db_generation = AccountTokenGeneration(user_id=user_id, generation=1)
+                db.add(db_generation)
+            generations[user_id] = db_generation.generation
+    await db.commit()
+    return generations
@@ -1,77 +1,102 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator
+from datetime import date, datetime
+from ipaddress import IPv4Network, ip_address
+from backend.app.core.cache import TTLCache, MISSING
+from backend.app.core.config import settings
+from backend.app.core.db_routing import use_primary
 from backend.app.models import account as account_model # SQLAlchemy model
 from backend.app.models import user as user_schema # Pydantic schemas
-from backend.app.services.auth import get_ac_password_hash, verify_ac_password
+from backend.app.services.auth import hash_new_password, verify_account_password
+from backend.app.services import principal_cache
+from backend.app.services import token_revocation
+from backend.app.services import account_search
+from backend.app.services import account_stats
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_user_by_id(db: Session, user_id: int) -> account_model.Account | None:
-    return db.query(account_model.Account).filter(account_model.Account.id == user_id).first()
+async def get_user_by_id(db: AsyncSession, user_id: int) -> account_model.Account | None:
+    result = await db.execute(select(account_model.Account).filter(account_model.Account.id == user_id))
+    return result.scalars().first()
 
-def get_user_by_username(db: Session, username: str) -> account_model.Account | None:
+async def get_user_by_username(db: AsyncSession, username: str) -> account_model.Account | None:
     # AC account usernames are case-insensitive in practice, but stored typically uppercase.
     # For lookup, it's safer to compare with the same case as stored or use case-insensitive query if DB supports.
     # Here, assuming username is passed as is, and DB collation handles case-insensitivity or it's stored as passed.
-    return db.query(account_model.Account).filter(account_model.Account.username == username).first()
+    result = await db.execute(select(account_model.Account).filter(account_model.Account.username == username))
+    return result.scalars().first()
 
-def get_user_by_email(db: Session, email: str) -> account_model.Account | None:
-    return db.query(account_model.Account).filter(account_model.Account.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str) -> account_model.Account | None:
+    result = await db.execute(select(account_model.Account).filter(account_model.Account.email == email))
+    return result.scalars().first()
 
-def create_user(db: Session, user: user_schema.UserCreate) -> account_model.Account:
-    hashed_password = get_ac_password_hash(password=user.password, username=user.username)
+async def create_user(db: AsyncSession, user: user_schema.UserCreate) -> account_model.Account:
+    password_columns = await hash_new_password(username=user.username, password=user.password)
     # Default expansion is set in the model itself (2 for WotLK)
     # Username should ideally be stored in uppercase as per AC standards.
     db_user = account_model.Account(
         username=user.username.upper(), # Store username in uppercase
         email=user.email,
-        sha_pass_hash=hashed_password,
+        **password_columns, # sha_pass_hash and/or SRP6 salt/verifier
         reg_mail=user.email # Assuming reg_mail is the same as email initially
         # joindate will be handled by DB default (func.now())
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await account_search.add_account(db_user)
+    await account_stats.record_registration(db_user.joindate)
     logger.info(f"User {db_user.username} created successfully with ID {db_user.id}")
     return db_user
 
-def update_user_password(db: Session, user: account_model.Account, new_password_plain: str) -> account_model.Account:
-    new_hashed_password = get_ac_password_hash(password=new_password_plain, username=user.username)
-    user.sha_pass_hash = new_hashed_password
-    db.commit()
-    db.refresh(user)
+async def update_user_password(db: AsyncSession, user: account_model.Account, new_password_plain: str) -> account_model.Account:
+    password_columns = await hash_new_password(username=user.username, password=new_password_plain)
+    for column, value in password_columns.items():
+        setattr(user, column, value)
+    await db.commit()
+    await db.refresh(user)
+    await principal_cache.invalidate_principal(user.username)
+    await token_revocation.revoke_all_tokens(user.id) # Sessions using the old password are logged out
     logger.info(f"Password updated for user {user.username}")
     return user
 
 # Add other update functions as needed, e.g., for email, expansion, lock status
-# def update_user_email(db: Session, user: account_model.Account, new_email: str) -> account_model.Account:
+# async def update_user_email(db: AsyncSession, user: account_model.Account, new_email: str) -> account_model.Account:
 #     user.email = new_email
 #     # Potentially update reg_mail as well if that's the policy
 #     # user.reg_mail = new_email
-#     db.commit()
-#     db.refresh(user)
+#     await db.commit()
+#     await db.refresh(user)
 #     logger.info(f"Email updated for user {user.username}")
 #     return user
 
 # Placeholder for authenticating user (might be slightly different from pure CRUD)
-def authenticate_user(db: Session, username: str, password_plain: str) -> account_model.Account | None:
+async def authenticate_user(db: AsyncSession, username: str, password_plain: str) -> account_model.Account | None:
     # Assuming username for login attempt can be mixed case, but it's stored uppercase.
-    db_user = get_user_by_username(db, username=username.upper())
+    db_user = await get_user_by_username(db, username=username.upper())
     if not db_user:
         logger.warning(f"Authentication failed: User {username.upper()} not found.")
         return None
-    if not verify_ac_password(plain_password=password_plain, username=db_user.username, hashed_password_from_db=db_user.sha_pass_hash):
+    if not await verify_account_password(db_user, password_plain):
         logger.warning(f"Authentication failed: Incorrect password for user {db_user.username}.")
         return None
     logger.info(f"User {db_user.username} authenticated successfully.")
     return db_user
 
-def mark_user_email_as_verified(db: Session, user_id: int) -> account_model.Account | None:
-    db_user = get_user_by_id(db, user_id)
+async def mark_user_email_as_verified(db: AsyncSession, user_id: int) -> account_model.Account | None:
+    # Read from the primary: the account may have been created moments ago and not replicated yet.
+    use_primary(db)
+    db_user = await get_user_by_id(db, user_id)
     if db_user:
+        was_verified = bool(db_user.email_verified)
         db_user.email_verified = True
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        await principal_cache.invalidate_principal(db_user.username)
+        if not was_verified:
+            await account_stats.record_email_verified()
         logger.info(f"Email marked as verified for user ID {user_id}")
         return db_user
     logger.warning(f"Attempted to mark email as verified for non-existent user ID {user_id}")
@@ -79,34 +104,308 @@ def mark_user_email_as_verified(db: Session, user_id: int) -> account_model.Acco
 
 # --- Admin CRUD Functions ---
 
-def get_all_users(db: Session) -> list[account_model.Account]:
-    return db.query(account_model.Account).all()
+async def get_all_users(db: AsyncSession) -> list[account_model.Account]:
+    result = await db.execute(select(account_model.Account))
+    return list(result.scalars().all())
 
-def ban_account(db: Session, user: account_model.Account) -> account_model.Account:
+# Columns returned by the admin listing; selected directly so rows are never hydrated as ORM objects.
+_USER_LIST_COLUMNS = (
+    account_model.Account.id,
+    account_model.Account.username,
+    account_model.Account.email,
+    account_model.Account.email_verified,
+    account_model.Account.locked,
+    account_model.Account.gmlevel,
+)
+
+# Exact counts scan the (filtered) table, so they are reused for a short while.
+_user_count_cache = TTLCache(maxsize=256, ttl_seconds=settings.ADMIN_USER_COUNT_CACHE_SECONDS)
+
+def _user_filters(
+    locked: bool | None = None,
+    gmlevel: int | None = None,
+    email_verified: bool | None = None,
+    username_prefix: str | None = None,
+    email_prefix: str | None = None,
+) -> list:
+    Account = account_model.Account
+    conditions = []
+    if locked is not None:
+        conditions.append(Account.locked == locked)
+    if gmlevel is not None:
+        conditions.append(Account.gmlevel == gmlevel)
+    if email_verified is not None:
+        conditions.append(Account.email_verified == email_verified)
+    if username_prefix:
+        # Usernames are stored uppercase; autoescape keeps '_' and '%' literal. Uses the username index.
+        conditions.append(Account.username.startswith(username_prefix.upper(), autoescape=True))
+    if email_prefix:
+        conditions.append(Account.email.startswith(email_prefix, autoescape=True))
+    return conditions
+
+async def list_users_page(db: AsyncSession, limit: int, after_id: int | None = None, **filters) -> tuple[list[dict], int | None]:
+    """
+    Returns up to `limit` accounts with id > after_id, ordered by id, as plain dicts,
+    plus the after_id for the next page (None if this is the last page).
+    Keyset pagination: every page is an index range scan on the primary key, however deep.
+    """
+    stmt = select(*_USER_LIST_COLUMNS).where(*_user_filters(**filters))
+    if after_id is not None:
+        stmt = stmt.where(account_model.Account.id > after_id)
+    result = await db.execute(stmt.order_by(account_model.Account.id).limit(limit + 1))
+    rows = [dict(row) for row in result.mappings()]
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]["id"]
+    return rows, None
+
+# Columns of the admin export (no credentials)
+_USER_EXPORT_COLUMNS = _USER_LIST_COLUMNS + (
+    account_model.Account.expansion,
+    account_model.Account.joindate,
+    account_model.Account.last_login,
+    account_model.Account.last_ip,
+)
+USER_EXPORT_FIELDS = tuple(column.key for column in _USER_EXPORT_COLUMNS)
+
+async def stream_users(db: AsyncSession, batch_size: int, **filters) -> AsyncIterator[list[dict]]:
+    """
+    Yields all matching accounts in id order, batch_size rows at a time, read through a
+    server-side cursor: memory use depends on batch_size, not on the size of the table.
+    """
+    stmt = (
+        select(*_USER_EXPORT_COLUMNS)
+        .where(*_user_filters(**filters))
+        .order_by(account_model.Account.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(stmt)
+    async for partition in result.mappings().partitions():
+        yield [dict(row) for row in partition]
+
+async def get_users_by_ids(db: AsyncSession, user_ids: list[int]) -> list[dict]:
+    """Listing columns of the given accounts as plain dicts, in the order of user_ids."""
+    if not user_ids:
+        return []
+    result = await db.execute(select(*_USER_LIST_COLUMNS).where(account_model.Account.id.in_(user_ids)))
+    rows = {row["id"]: dict(row) for row in result.mappings()}
+    return [rows[user_id] for user_id in user_ids if user_id in rows]
+
+async def stream_user_identities(db: AsyncSession, batch_size: int) -> AsyncIterator[list[tuple[int, str, str]]]:
+    """Yields (id, username, email) of all accounts in batches, read through a server-side cursor."""
+    Account = account_model.Account
+    stmt = select(Account.id, Account.username, Account.email).order_by(Account.id).execution_options(yield_per=batch_size)
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        yield [tuple(row) for row in partition]
+
+async def stream_verified_emails(db: AsyncSession, batch_size: int) -> AsyncIterator[list[str]]:
+    """Yields the email addresses of accounts with a verified email, in batches, read through a server-side cursor."""
+    Account = account_model.Account
+    stmt = (
+        select(Account.email)
+        .where(Account.email_verified == True, Account.email != "")
+        .order_by(Account.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        yield [email for (email,) in partition]
+
+async def search_users_by_substring(db: AsyncSession, query: str, limit: int) -> list[dict]:
+    """Unindexed '%query%' search (full scan); only used while the in-memory search index is being built."""
+    Account = account_model.Account
+    stmt = (
+        select(*_USER_LIST_COLUMNS)
+        .where(Account.username.contains(query.upper(), autoescape=True) | Account.email.contains(query, autoescape=True))
+        .order_by(Account.id)
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings()]
+
+async def count_users(db: AsyncSession, **filters) -> int:
+    """Number of accounts matching the filters; cached for ADMIN_USER_COUNT_CACHE_SECONDS."""
+    cache_key = tuple(sorted(filters.items()))
+    cached = _user_count_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+    result = await db.execute(select(func.count()).select_from(account_model.Account).where(*_user_filters(**filters)))
+    count = result.scalar_one()
+    _user_count_cache.set(cache_key, count)
+    return count
+
+async def get_account_counts(db: AsyncSession) -> dict[str, int]:
+    """Total, locked and email-verified accounts, in one table scan."""
+    Account = account_model.Account
+    result = await db.execute(select(
+        func.count().label("total_accounts"),
+        func.coalesce(func.sum(case((Account.locked == True, 1), else_=0)), 0).label("locked_accounts"),
+        func.coalesce(func.sum(case((Account.email_verified == True, 1), else_=0)), 0).label("verified_emails"),
+    ))
+    return {key: int(value) for key, value in result.mappings().one().items()}
+
+async def count_registrations_per_day(db: AsyncSession, since: date) -> dict[date, int]:
+    """Accounts created per day (by joindate) from since until today."""
+    day = func.date(account_model.Account.joindate)
+    result = await db.execute(
+        select(day, func.count()).where(account_model.Account.joindate >= since).group_by(day)
+    )
+    # MySQL returns dates, SQLite ISO strings
+    return {row[0] if isinstance(row[0], date) else date.fromisoformat(row[0]): row[1] for row in result.all()}
+
+async def ban_account(db: AsyncSession, user: account_model.Account) -> account_model.Account:
+    was_locked = bool(user.locked)
     user.locked = True # In AC, 1 typically means locked/banned
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    await principal_cache.invalidate_principal(user.username) # The ban must apply to the very next request
+    await token_revocation.revoke_all_tokens(user.id)
+    if not was_locked:
+        await account_stats.record_locked_change(1)
     logger.info(f"Account {user.username} (ID: {user.id}) has been banned.")
     return user
 
-def unban_account(db: Session, user: account_model.Account) -> account_model.Account:
+async def unban_account(db: AsyncSession, user: account_model.Account) -> account_model.Account:
+    was_locked = bool(user.locked)
     user.locked = False # In AC, 0 typically means not locked/banned
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    await principal_cache.invalidate_principal(user.username)
+    if was_locked:
+        await account_stats.record_locked_change(-1)
     logger.info(f"Account {user.username} (ID: {user.id}) has been unbanned.")
     return user
 
+# --- Bulk ban/unban ---
+
+_BULK_BATCH_SIZE = 500 # Ids per IN (...) list
+_BULK_COLUMNS = (
+    account_model.Account.id,
+    account_model.Account.username,
+    account_model.Account.locked,
+    account_model.Account.gmlevel,
+    account_model.Account.last_ip,
+)
+
+def _ip_prefix(network: IPv4Network) -> str:
+    """The whole leading octets of a network as a LIKE prefix, e.g. 10.1.0.0/20 -> '10.1.'."""
+    octets = str(network.network_address).split(".")[:network.prefixlen // 8]
+    return ".".join(octets) + "." if octets else ""
+
+async def find_accounts_for_bulk_action(
+    db: AsyncSession,
+    limit: int,
+    user_ids: list[int] | None = None,
+    last_ip_network: IPv4Network | None = None,
+    joined_after: datetime | None = None,
+    joined_before: datetime | None = None,
+) -> list:
+    """
+    Returns (id, username, locked, gmlevel, last_ip) rows selected by ids or by filter, read from
+    the primary since they are about to be updated. At most limit + 1 rows are returned, so callers
+    can tell when a filter matches too many accounts.
+    """
+    use_primary(db)
+    Account = account_model.Account
+    if user_ids is not None:
+        rows = []
+        unique_ids = list(dict.fromkeys(user_ids))
+        for start in range(0, len(unique_ids), _BULK_BATCH_SIZE):
+            batch = unique_ids[start:start + _BULK_BATCH_SIZE]
+            result = await db.execute(select(*_BULK_COLUMNS).where(Account.id.in_(batch)))
+            rows.extend(result.all())
+        return rows[:limit + 1]
+
+    conditions = []
+    if joined_after is not None:
+        conditions.append(Account.joindate >= joined_after)
+    if joined_before is not None:
+        conditions.append(Account.joindate < joined_before)
+    if last_ip_network is not None and _ip_prefix(last_ip_network):
+        # Narrows the scan in SQL; the exact subnet check happens below.
+        conditions.append(Account.last_ip.startswith(_ip_prefix(last_ip_network), autoescape=True))
+    result = await db.stream(select(*_BULK_COLUMNS).where(*conditions).order_by(Account.id).execution_options(yield_per=_BULK_BATCH_SIZE))
+    rows = []
+    async for row in result:
+        if last_ip_network is not None and not _ip_in_network(row.last_ip, last_ip_network):
+            continue
+        rows.append(row)
+        if len(rows) > limit:
+            break
+    await result.close()
+    return rows
+
+def _ip_in_network(ip: str, network: IPv4Network) -> bool:
+    try:
+        return ip_address(ip) in network
+    except ValueError:
+        return False
+
+async def bulk_set_locked(db: AsyncSession, accounts: list, locked: bool, acting_admin_id: int) -> dict[int, str]:
+    """
+    Bans (locked=True) or unbans the given account rows with set-based UPDATE ... WHERE id IN (...)
+    batches in a single transaction, applying the same rules as the single-account endpoints:
+    admins can't ban themselves or other admins (gmlevel >= 3). Returns {account id: outcome}.
+    """
+    Account = account_model.Account
+    outcomes = {}
+    to_change = []
+    for account in accounts:
+        if locked and account.id == acting_admin_id:
+            outcomes[account.id] = "forbidden_self"
+        elif locked and account.gmlevel >= 3:
+            outcomes[account.id] = "forbidden_admin"
+        elif bool(account.locked) == locked:
+            outcomes[account.id] = "unchanged"
+        else:
+            to_change.append(account)
+
+    changed = []
+    for start in range(0, len(to_change), _BULK_BATCH_SIZE):
+        batch = {account.id: account for account in to_change[start:start + _BULK_BATCH_SIZE]}
+        # Re-read under row locks: the rows may have changed since they were selected (a concurrent
+        # ban, a promotion), and outcomes and side effects must only cover rows this UPDATE changes.
+        result = await db.execute(
+            select(Account.id, Account.locked, Account.gmlevel).where(Account.id.in_(list(batch))).with_for_update()
+        )
+        batch_ids = []
+        for account_id, current_locked, gmlevel in result.all():
+            if locked and gmlevel >= 3:
+                outcomes[account_id] = "forbidden_admin"
+            elif bool(current_locked) == locked:
+                outcomes[account_id] = "unchanged"
+            else:
+                batch_ids.append(account_id)
+        if not batch_ids:
+            continue
+        stmt = update(Account).where(Account.id.in_(batch_ids), Account.locked != locked).values(locked=locked)
+        if locked:
+            stmt = stmt.where(Account.gmlevel < 3)
+        await db.execute(stmt.execution_options(synchronize_session=False))
+        changed.extend(batch[account_id] for account_id in batch_ids)
+    await db.commit()
+    await account_stats.record_locked_change(len(changed) if locked else -len(changed))
+
+    for account in changed:
+        outcomes[account.id] = "banned" if locked else "unbanned"
+    if changed:
+        await principal_cache.invalidate_principals([account.username for account in changed])
+        if locked:
+            await token_revocation.revoke_all_tokens_bulk([account.id for account in changed])
+    logger.info(f"Bulk {'ban' if locked else 'unban'} by admin ID {acting_admin_id}: {len(changed)} account(s) changed.")
+    return outcomes
+
 # Promote and Demote CRUD functions are removed as per requirements.
-# def promote_to_admin(db: Session, user: account_model.Account) -> account_model.Account:
+# async def promote_to_admin(db: AsyncSession, user: account_model.Account) -> account_model.Account:
 #     user.gmlevel = 3 # Example: Set to GM level 3 for admin
-#     db.commit()
-#     db.refresh(user)
+#     await db.commit()
+#     await db.refresh(user)
 #     logger.info(f"Account {user.username} (ID: {user.id}) has been promoted to admin (gmlevel {user.gmlevel}).")
 #     return user
 
-# def demote_from_admin(db: Session, user: account_model.Account) -> account_model.Account:
+# async def demote_from_admin(db: AsyncSession, user: account_model.Account) -> account_model.Account:
 #     user.gmlevel = 0 # Example: Set to GM level 0 for regular player
-#     db.commit()
-#     db.refresh(user)
+#     await db.commit()
+#     await db.refresh(user)
 #     logger.info(f"Account {user.username} (ID: {user.id}) has been demoted from admin (gmlevel {user.gmlevel}).")
 #     return user
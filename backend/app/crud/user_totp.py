@@ -1,17 +1,23 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.app.models.user_totp import UserTOTP # SQLAlchemy model for UserTOTP
+from backend.app.core.cache import MISSING
+from backend.app.services import account_stats
+from backend.app.services import totp_cache
 import datetime
 
 # Note: This CRUD module will use get_aux_db for sessions,
 # which needs to be passed in when these functions are called from endpoints.
 
-def create_user_totp_secret(db: Session, user_id: int, secret_key: str) -> UserTOTP:
+async def create_user_totp_secret(db: AsyncSession, user_id: int, secret_key: str) -> UserTOTP:
     """
     Creates or updates a user's TOTP secret. If a secret already exists,
     it updates the secret_key and resets is_active to False,
     forcing re-verification.
     """
-    existing_totp = db.query(UserTOTP).filter(UserTOTP.user_id == user_id).first()
+    result = await db.execute(select(UserTOTP).filter(UserTOTP.user_id == user_id))
+    existing_totp = result.scalars().first()
+    was_active = bool(existing_totp and existing_totp.is_active)
     if existing_totp:
         existing_totp.secret_key = secret_key
         existing_totp.is_active = False
@@ -24,49 +30,81 @@ def create_user_totp_secret(db: Session, user_id: int, secret_key: str) -> UserT
             is_active=False
         )
         db.add(db_totp)
-    db.commit()
-    db.refresh(db_totp)
+    await db.commit()
+    await db.refresh(db_totp)
+    await totp_cache.invalidate_totp_state(user_id)
+    if was_active:
+        await account_stats.record_totp_change(-1)
     return db_totp
 
-def get_user_totp_secret(db: Session, user_id: int) -> UserTOTP | None:
+async def get_user_totp_secret(db: AsyncSession, user_id: int) -> UserTOTP | None:
     """
     Retrieves a user's TOTP secret, regardless of its active status.
     """
-    return db.query(UserTOTP).filter(UserTOTP.user_id == user_id).first()
+    result = await db.execute(select(UserTOTP).filter(UserTOTP.user_id == user_id))
+    return result.scalars().first()
 
-def activate_user_totp(db: Session, user_id: int) -> UserTOTP | None:
+async def get_totp_state(db: AsyncSession, user_id: int) -> totp_cache.TOTPState | None:
+    """
+    Returns a user's 2FA state (None if they never set up 2FA), from the cache when possible.
+    The session is only used on a cache miss.
+    """
+    state = totp_cache.get_totp_state(user_id)
+    if state is not MISSING:
+        return state
+    db_totp = await get_user_totp_secret(db, user_id)
+    state = totp_cache.TOTPState(db_totp.secret_key, bool(db_totp.is_active)) if db_totp and db_totp.secret_key else None
+    totp_cache.cache_totp_state(user_id, state)
+    return state
+
+async def count_active_totp(db: AsyncSession) -> int:
+    """Number of accounts with 2FA enabled."""
+    result = await db.execute(select(func.count()).select_from(UserTOTP).where(UserTOTP.is_active == True))
+    return result.scalar_one()
+
+async def activate_user_totp(db: AsyncSession, user_id: int) -> UserTOTP | None:
     """
     Marks a user's TOTP secret as active.
     Returns the updated UserTOTP object or None if not found.
     """
-    db_totp = db.query(UserTOTP).filter(UserTOTP.user_id == user_id).first()
+    result = await db.execute(select(UserTOTP).filter(UserTOTP.user_id == user_id))
+    db_totp = result.scalars().first()
     if db_totp:
+        was_active = bool(db_totp.is_active)
         db_totp.is_active = True
         db_totp.updated_at = datetime.datetime.utcnow()
-        db.commit()
-        db.refresh(db_totp)
+        await db.commit()
+        await db.refresh(db_totp)
+        await totp_cache.invalidate_totp_state(user_id)
+        if not was_active:
+            await account_stats.record_totp_change(1)
         return db_totp
     return None
 
-def deactivate_user_totp(db: Session, user_id: int) -> UserTOTP | None:
+async def deactivate_user_totp(db: AsyncSession, user_id: int) -> UserTOTP | None:
     """
     Marks a user's TOTP secret as inactive.
     Alternatively, this could delete the record. For now, just deactivating.
     Returns the updated UserTOTP object or None if not found.
     """
-    db_totp = db.query(UserTOTP).filter(UserTOTP.user_id == user_id).first()
+    result = await db.execute(select(UserTOTP).filter(UserTOTP.user_id == user_id))
+    db_totp = result.scalars().first()
     if db_totp:
+        was_active = bool(db_totp.is_active)
         db_totp.is_active = False
         # Optionally, clear the secret_key or delete the record for enhanced security upon deactivation.
         # For now, keeping the secret but marking inactive.
         # db_totp.secret_key = "" # Example if clearing
         db_totp.updated_at = datetime.datetime.utcnow()
-        db.commit()
-        db.refresh(db_totp)
+        await db.commit()
+        await db.refresh(db_totp)
+        await totp_cache.invalidate_totp_state(user_id)
+        if was_active:
+            await account_stats.record_totp_change(-1)
         return db_totp
     # If you prefer to delete:
     # if db_totp:
-    #     db.delete(db_totp)
-    #     db.commit()
+    #     await db.delete(db_totp)
+    #     await db.commit()
     #     return db_totp # Or return True/None indicating deletion status
     return None
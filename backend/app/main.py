@@ -8,8 +8,23 @@ from backend.app.models import account # This ensures Account model is registere
 from backend.app.models import user # This ensures User Pydantic models are available if needed by FastAPI for other things, though not strictly for table creation.
 
 
+import asyncio
 import logging
-from backend.app.core.database import init_db, init_aux_db
+from backend.app.core.database import init_db, init_aux_db, dispose_engines
+from backend.app.core.cache import run_invalidation_listener
+from backend.app.core.redis_client import close_async_redis
+from backend.app.core.tasks import run_periodically
+from backend.app.core.process_pool import shutdown_process_pool
+from backend.app.services import auth as auth_service
+from backend.app.services import token_revocation
+from backend.app.services import refresh_tokens
+from backend.app.services.captcha_service import CAPTCHA_EXPIRY_SECONDS
+from backend.app.crud import captcha as captcha_crud
+from backend.app.services import account_search
+from backend.app.services import account_stats
+from backend.app.services import email_outbox
+from backend.app.services import email_service
+from backend.app.core import rate_limiter
 from backend.app.core.rate_limiter import limiter # Import the limiter instance
 from slowapi.errors import RateLimitExceeded # Import the exception
 from slowapi import _rate_limit_exceeded_handler # Import the default handler
@@ -31,13 +46,60 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 async def startup_event():
     logger.info("Starting up application and initializing databases...")
     try:
-        init_db() # Initialize main database tables
-        init_aux_db() # Initialize auxiliary database tables
+        await init_db() # Initialize main database tables
+        await init_aux_db() # Initialize auxiliary database tables
+        await token_revocation.load_generations() # Token revocations live in the aux DB
         logger.info("Databases initialized successfully.")
     except Exception as e:
         logger.error(f"Error initializing databases: {e}")
         # Optionally, re-raise the exception or exit if DB initialization is critical
         # raise e
+    await auth_service.check_srp6_columns() # Refuses to start on an account table without the SRP6 columns
+    if settings.CAPTCHA_STORE == "memory":
+        logger.warning("CAPTCHA_STORE is 'memory': challenges are kept per worker, so run a single worker or CAPTCHAs fail at random.")
+
+    app.state.background_tasks = [
+        # Applies cache invalidations and token revocations published by other workers (no-op without Redis)
+        asyncio.create_task(run_invalidation_listener()),
+        asyncio.create_task(run_periodically(
+            token_revocation.load_generations, settings.TOKEN_GENERATION_SYNC_SECONDS, "token-generation-sync"
+        )),
+        asyncio.create_task(run_periodically(
+            refresh_tokens.purge_expired, settings.REFRESH_TOKEN_PURGE_SECONDS, "refresh-token-purge"
+        )),
+        asyncio.create_task(run_periodically(
+            captcha_crud.purge_expired, CAPTCHA_EXPIRY_SECONDS, "captcha-purge"
+        )),
+        asyncio.create_task(run_periodically(
+            account_stats.reconcile, settings.ACCOUNT_STATS_RECONCILE_SECONDS, "account-stats-reconcile", run_first=True
+        )),
+    ]
+    if rate_limiter.get_two_tier_storage() is not None:
+        app.state.background_tasks.append(asyncio.create_task(run_periodically(
+            rate_limiter.sync_with_redis, settings.RATE_LIMIT_SYNC_INTERVAL_SECONDS, "rate-limit-sync"
+        )))
+    if settings.ACCOUNT_SEARCH_ENABLED:
+        # Built in the background so startup isn't delayed; admin search scans the DB until it's ready
+        app.state.background_tasks.append(asyncio.create_task(run_periodically(
+            account_search.rebuild, settings.ACCOUNT_SEARCH_REBUILD_SECONDS, "account-search-rebuild", run_first=True
+        )))
+    if settings.SMTP_HOST and settings.SMTP_SENDER_EMAIL:
+        app.state.background_tasks.append(asyncio.create_task(run_periodically(
+            email_service.check_connectivity, settings.SMTP_CONNECTIVITY_CHECK_SECONDS, "smtp-connectivity", run_first=True
+        )))
+        app.state.background_tasks.append(asyncio.create_task(email_outbox.run_outbox_workers()))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    logger.info("Shutting down application and closing database connections...")
+    for task in getattr(app.state, "background_tasks", []):
+        task.cancel()
+    await asyncio.gather(*getattr(app.state, "background_tasks", []), return_exceptions=True)
+    await asyncio.to_thread(email_service.close_smtp_pool)
+    await rate_limiter.sync_with_redis() # Hand over hits not yet counted in Redis
+    await dispose_engines()
+    await close_async_redis()
+    shutdown_process_pool()
 
 logger.info(f"API Settings Loaded. DB Host: {settings.DB_HOST}, DB Name: {settings.DB_NAME}")
 
@@ -53,15 +115,12 @@ async def health_check():
     # For now, this just confirms the API is running.
     # Example DB check:
     # try:
-    #     db = next(get_db()) # Get a DB session
-    #     db.execute("SELECT 1")
+    #     async with SessionLocal() as db: # Get a DB session
+    #         await db.execute(text("SELECT 1"))
     #     db_status = "healthy"
     # except Exception as e:
     #     logger.error(f"Health check DB connection failed: {e}")
     #     db_status = "unhealthy"
-    # finally:
-    #     if 'db' in locals() and db is not None:
-    #         db.close()
     # return {"status": "healthy", "database_status": db_status, "message": "Welcome to AzerothCore Account Management API"}
     return {"status": "healthy", "message": "Welcome to AzerothCore Account Management API"}
 
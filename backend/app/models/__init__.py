@@ -4,4 +4,7 @@
 # from .account import Account
 from .email_verification_token import EmailVerificationToken
 from .user_totp import UserTOTP
-from .captcha_challenge import CaptchaChallenge
+from .account_token_generation import AccountTokenGeneration
+from .email_outbox import EmailOutboxMessage
+from .refresh_token import RefreshToken, RevokedRefreshTokenFamily
+from .captcha_challenge import StoredCaptchaChallenge
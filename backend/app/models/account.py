@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, SmallInteger, Boolean, TIMESTAMP, text
+from sqlalchemy import Column, Integer, String, SmallInteger, Boolean, TIMESTAMP, LargeBinary, text
 from sqlalchemy.sql import func, expression
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -11,6 +11,9 @@ class Account(Base):
     # AzerothCore typically stores username in uppercase. Application logic should handle this.
     username = Column(String(16), unique=True, index=True, nullable=False)
     sha_pass_hash = Column(String(40), nullable=False, default='') # SHA1 hash is 40 chars. AC default is empty string
+    # SRP6 credentials used by current AzerothCore (binary(32) each); NULL for accounts that only have sha_pass_hash.
+    salt = Column(LargeBinary(32), nullable=True)
+    verifier = Column(LargeBinary(32), nullable=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
 
     # Expansion: 0=Vanilla, 1=TBC, 2=WotLK. Default to WotLK (2).
@@ -0,0 +1,15 @@
+import datetime
+from sqlalchemy import Column, Integer, DateTime
+from backend.app.core.database import AuxBase
+
+class AccountTokenGeneration(AuxBase):
+    """
+    Per-account token generation. Access tokens carry the generation they were
+    minted with; bumping it (on ban or password change) revokes all of them.
+    Accounts without a row are at generation 0.
+    """
+    __tablename__ = "account_token_generation"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False) # Links to main DB's user ID
+    generation = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
@@ -1,20 +1,11 @@
-import uuid
-import datetime
-from sqlalchemy import Column, String, DateTime, Index
+from sqlalchemy import Column, String, Float
 from backend.app.core.database import AuxBase
 
-class CaptchaChallenge(AuxBase):
-    __tablename__ = "captcha_challenges"
+class StoredCaptchaChallenge(AuxBase):
+    """A CAPTCHA challenge in the aux DB, the store shared by all workers when Redis isn't configured."""
+    __tablename__ = "captcha_challenge"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(String(36), primary_key=True)
     question = Column(String(255), nullable=False)
-    answer = Column(String(255), nullable=False) # Store answer as string
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    expires_at = Column(DateTime, nullable=False)
-
-    __table_args__ = (
-        Index('ix_captcha_challenges_expires_at', 'expires_at'),
-    )
-
-    def __repr__(self):
-        return f"<CaptchaChallenge(id={self.id}, question='{self.question}', expires_at='{self.expires_at}')>"
+    answer = Column(String(255), nullable=False)
+    expires_at = Column(Float, nullable=False, index=True) # Unix time
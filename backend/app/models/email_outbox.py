@@ -0,0 +1,24 @@
+import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from backend.app.core.database import AuxBase
+
+class EmailOutboxMessage(AuxBase):
+    """
+    An email waiting to be delivered by the outbox workers. Delivered messages are deleted;
+    messages that keep failing end up with status "dead" and are kept for inspection.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    recipient = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String(16), nullable=False, default="pending") # "pending", "sending" or "dead"
+    attempts = Column(Integer, nullable=False, default=0)
+    # When a pending message is due; for a message being sent, when its claim lapses
+    # (so messages claimed by a worker that died are picked up again).
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean
+from backend.app.core.database import AuxBase
+
+class RefreshToken(AuxBase):
+    """
+    A refresh token, stored by SHA-256 digest, for deployments without Redis (the aux DB is
+    shared by all workers). Consumed tokens stay until they expire, marked used, so a replay
+    is recognised as reuse.
+    """
+    __tablename__ = "refresh_token"
+
+    digest = Column(String(64), primary_key=True)
+    user_id = Column(Integer, nullable=False) # Links to main DB's user ID
+    username = Column(String(32), nullable=False)
+    generation = Column(Integer, nullable=False)
+    family_id = Column(String(32), nullable=False)
+    expires_at = Column(Float, nullable=False, index=True) # Unix time
+    used = Column(Boolean, nullable=False, default=False)
+
+class RevokedRefreshTokenFamily(AuxBase):
+    """A token family revoked after reuse was detected; kept until its tokens have expired."""
+    __tablename__ = "refresh_token_revoked_family"
+
+    family_id = Column(String(32), primary_key=True)
+    expires_at = Column(Float, nullable=False) # Unix time
@@ -1,5 +1,7 @@
-from pydantic import BaseModel, EmailStr, constr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, constr, conlist, root_validator
+from typing import List, Optional
+from datetime import date, datetime
+from ipaddress import IPv4Network
 
 class UserBase(BaseModel):
     username: constr(min_length=3, max_length=16, regex="^[a-zA-Z0-9_]+$")
@@ -33,16 +35,102 @@ class UserInDBBase(UserBase):
 class User(UserInDBBase): # Full user model for responses
     pass
 
+class UserPage(BaseModel):
+    """One page of the admin user listing, ordered by id."""
+    items: List[User]
+    next_after_id: Optional[int] = None # Pass as after_id to get the next page; None on the last page
+    total: Optional[int] = None # Only computed when requested
+
+class UserSearchPage(BaseModel):
+    """Ranked account search results: exact matches, then username prefix/substring, then email."""
+    items: List[User]
+    total: Optional[int] = None # Number of matches (None while the search index is still being built)
+    indexed: bool = True # False: served by a slower database scan, ranking and total unavailable
+
+class DailyRegistrations(BaseModel):
+    day: date
+    count: int
+
+class AccountStats(BaseModel):
+    """Admin dashboard counters, served from memory (see reconciled_at for the last full recount)."""
+    total_accounts: int
+    locked_accounts: int
+    verified_emails: int
+    totp_enabled: int
+    registrations_per_day: List[DailyRegistrations] # Oldest first, including today
+    reconciled_at: Optional[datetime] = None
+
+class BulkAccountFilter(BaseModel):
+    last_ip_network: Optional[IPv4Network] = None # e.g. "203.0.113.0/24"
+    joined_after: Optional[datetime] = None
+    joined_before: Optional[datetime] = None
+
+    @root_validator(skip_on_failure=True)
+    def require_a_criterion(cls, values):
+        if not any(value is not None for value in values.values()):
+            raise ValueError("At least one filter criterion is required.")
+        return values
+
+class BulkAccountAction(BaseModel):
+    """Selects the accounts of a bulk ban/unban: explicit ids or a filter, not both."""
+    user_ids: Optional[conlist(int, min_items=1)] = None
+    filter: Optional[BulkAccountFilter] = None
+
+    @root_validator(skip_on_failure=True)
+    def require_exactly_one_selector(cls, values):
+        if (values.get("user_ids") is None) == (values.get("filter") is None):
+            raise ValueError("Provide either user_ids or filter.")
+        return values
+
+class BulkAccountOutcome(BaseModel):
+    id: int
+    username: Optional[str] = None
+    outcome: str # banned, unbanned, unchanged, not_found, forbidden_self, forbidden_admin
+
+class BulkAccountActionResult(BaseModel):
+    results: List[BulkAccountOutcome]
+    summary: dict # outcome -> number of accounts
+
+class AnnouncementCreate(BaseModel):
+    subject: constr(min_length=1, max_length=255)
+    body: constr(min_length=1)
+
+class AnnouncementQueued(BaseModel):
+    recipients: int # Verified addresses the announcement was queued for
+
 class UserInDB(UserInDBBase): # Representation of user in DB, might include hashed_password
     sha_pass_hash: str
 
 
+class Principal(BaseModel):
+    """The authenticated account as resolved by get_current_active_user (cacheable, no ORM state)."""
+    id: int
+    username: str
+    email: str
+    gmlevel: int
+    locked: bool
+    email_verified: bool
+    # Token generation of the account when this was loaded; a cached principal older than the
+    # account's current generation (bumped by bans and password changes) is stale.
+    token_generation: int = 0
+
+    class Config:
+        orm_mode = True
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    expires_in: Optional[int] = None # Access token lifetime in seconds
+    refresh_token: Optional[str] = None
+
+class TokenRefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[int] = None # 'uid' claim
+    generation: int = 0 # 'gen' claim: account token generation at mint time
 
 class PasswordChange(BaseModel):
     current_password: str
@@ -0,0 +1,142 @@
+"""
+Offline migration: computes SRP6 salt/verifier for accounts that only have the legacy sha_pass_hash.
+
+The verifier is derived from the stored SHA1(USER:PASS) digest, so no passwords are needed.
+Rows are streamed with a server-side cursor (a consistent, non-locking read) and converted in a
+multiprocessing pool. Each batch is written back with one executemany UPDATE in its own short
+transaction, so row locks are only held for milliseconds. Already-converted rows are never
+selected again, so the command can be interrupted and re-run at any time; --start-id skips ahead.
+
+Run from the repository root:
+    python -m backend.app.scripts.migrate_srp6 [--batch-size 1000] [--workers N] [--start-id ID] [--dry-run]
+"""
+import argparse
+import collections
+import logging
+import multiprocessing
+import os
+import re
+import time
+
+from sqlalchemy import bindparam, create_engine, func, select, update
+
+from backend.app.core.config import settings
+from backend.app.models.account import Account
+from backend.app.services import srp6
+
+logger = logging.getLogger(__name__)
+
+_LEGACY_HASH = re.compile(r"^[0-9a-fA-F]{40}$")
+_account = Account.__table__
+
+def _default_database_url() -> str:
+    # Synchronous driver: this is a standalone command, not part of the async app.
+    return f"mysql+mysqldb://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+
+def _pending_rows(start_id: int):
+    return (
+        _account.c.verifier.is_(None),
+        _account.c.sha_pass_hash != "",
+        _account.c.id > start_id,
+    )
+
+def convert_batch(rows: list[tuple[int, str]]) -> tuple[list[dict], int, int]:
+    """Pool worker: returns UPDATE parameters for the convertible rows, the number skipped and the batch's last id."""
+    updates = []
+    skipped = 0
+    for account_id, sha_pass_hash in rows:
+        if not _LEGACY_HASH.match(sha_pass_hash):
+            skipped += 1
+            continue
+        salt = os.urandom(srp6.SALT_LENGTH)
+        updates.append({
+            "b_id": account_id,
+            "b_sha_pass_hash": sha_pass_hash,
+            "b_salt": salt,
+            "b_verifier": srp6.calculate_verifier_from_hash(bytes.fromhex(sha_pass_hash), salt),
+        })
+    return updates, skipped, rows[-1][0] # Rows are read in id order
+
+def _read_batches(engine, start_id: int, batch_size: int):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT", stream_results=True, yield_per=batch_size) as conn:
+        result = conn.execute(
+            select(_account.c.id, _account.c.sha_pass_hash).where(*_pending_rows(start_id)).order_by(_account.c.id)
+        )
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+def _convert_ahead(pool, batches, window: int):
+    """
+    Converts batches in the pool and yields the results in order. At most window batches are read
+    and converted ahead of the one being written, so a slow database doesn't let the reading and
+    converting run arbitrarily far ahead (and memory grow with the table).
+    """
+    in_flight = collections.deque()
+    for batch in batches:
+        in_flight.append(pool.apply_async(convert_batch, (batch,)))
+        if len(in_flight) >= window:
+            yield in_flight.popleft().get()
+    while in_flight:
+        yield in_flight.popleft().get()
+
+def migrate(database_url: str, batch_size: int = 1000, workers: int = 0, start_id: int = 0, dry_run: bool = False) -> dict:
+    """
+    Converts all pending accounts; returns counts. workers=0 converts in this process.
+    The UPDATE only applies if the row is still unconverted and its sha_pass_hash unchanged,
+    so concurrent password changes by the web app are never overwritten.
+    """
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        total = conn.execute(select(func.count()).select_from(_account).where(*_pending_rows(start_id))).scalar_one()
+    logger.info(f"{total} account(s) without an SRP6 verifier (id > {start_id}).")
+
+    write = (
+        update(_account)
+        .where(
+            _account.c.id == bindparam("b_id"),
+            _account.c.verifier.is_(None),
+            _account.c.sha_pass_hash == bindparam("b_sha_pass_hash"),
+        )
+        .values(salt=bindparam("b_salt"), verifier=bindparam("b_verifier"))
+    )
+    stats = {"total": total, "processed": 0, "updated": 0, "skipped": 0, "last_id": start_id}
+    started = time.monotonic()
+    pool = multiprocessing.Pool(workers) if workers > 0 else None
+    try:
+        batches = _read_batches(engine, start_id, batch_size)
+        # The pool keeps converting the next batches while the previous one is being written
+        converted = _convert_ahead(pool, batches, window=2 * workers) if pool else map(convert_batch, batches)
+        for updates, skipped, batch_last_id in converted:
+            if updates and not dry_run:
+                with engine.begin() as conn:
+                    stats["updated"] += conn.execute(write, updates).rowcount
+            stats["processed"] += len(updates) + skipped
+            stats["skipped"] += skipped
+            stats["last_id"] = batch_last_id # Skipped rows count too, so a resumed run doesn't select them again
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"{stats['processed']}/{total} processed ({stats['updated']} updated, {stats['skipped']} skipped), "
+                f"{stats['processed'] / elapsed if elapsed else 0:.0f} rows/s, last id {stats['last_id']}"
+            )
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        engine.dispose()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute SRP6 salt/verifier for accounts that only have sha_pass_hash.")
+    parser.add_argument("--database-url", default=None, help="SQLAlchemy URL of the auth database (default: from settings)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (0: convert in this process)")
+    parser.add_argument("--start-id", type=int, default=0, help="Only convert accounts with a greater id")
+    parser.add_argument("--dry-run", action="store_true", help="Compute verifiers without writing them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stats = migrate(args.database_url or _default_database_url(), args.batch_size, args.workers, args.start_id, args.dry_run)
+    logger.info(f"Done: {stats}")
+
+if __name__ == "__main__":
+    main()
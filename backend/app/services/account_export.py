@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator
+
+from backend.app.core.config import settings
+from backend.app.crud import user as user_crud
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _encode_ndjson(rows: list[dict]) -> str:
+    return "".join(json.dumps(row, default=_json_default, separators=(",", ":")) + "\n" for row in rows)
+
+class _CSVEncoder:
+    """Writes rows through one reused buffer; the header goes out with the first chunk."""
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, fieldnames=user_crud.USER_EXPORT_FIELDS)
+        self._writer.writeheader()
+
+    def __call__(self, rows: list[dict]) -> str:
+        self._writer.writerows(rows)
+        chunk = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return chunk
+
+async def export_accounts(session_factory, export_format: str, compress: bool = False, **filters) -> AsyncIterator[bytes]:
+    """
+    Yields the account export as encoded (and optionally gzipped) chunks, one per database batch.
+    Opens its own session: the response keeps streaming after the endpoint function has returned.
+    """
+    encode = _encode_ndjson if export_format == "ndjson" else _CSVEncoder()
+    compressor = zlib.compressobj(wbits=31) if compress else None # wbits=31: gzip container
+    exported = 0
+    async with session_factory() as db:
+        async for rows in user_crud.stream_users(db, batch_size=settings.ADMIN_EXPORT_BATCH_SIZE, **filters):
+            exported += len(rows)
+            chunk = encode(rows).encode("utf-8")
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+    if export_format == "csv" and exported == 0:
+        # No batches at all: still emit the header line
+        chunk = encode([]).encode("utf-8")
+        yield compressor.compress(chunk) if compressor is not None else chunk
+    if compressor is not None:
+        yield compressor.flush()
+    logger.info(f"Account export finished: {exported} row(s) as {export_format}{' (gzip)' if compress else ''}.")
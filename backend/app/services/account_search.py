@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from array import array
+
+from backend.app.core.cache import register_invalidation_handler, publish_invalidation
+from backend.app.core.config import settings
+from backend.app.core.database import SessionLocal
+from backend.app.core.db_routing import use_primary
+from backend.app.crud import user as user_crud
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "account_search"
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _rank(query: str, username: str, email: str) -> int | None:
+    """Lower is better; None if the account doesn't match."""
+    if username == query or email == query:
+        return 0
+    if username.startswith(query):
+        return 1
+    if query in username:
+        return 2
+    if email.startswith(query):
+        return 3
+    if query in email:
+        return 4
+    return None
+
+class TrigramIndex:
+    """
+    Inverted index from lowercase trigrams of username and email to account ids.
+    Postings are compact arrays of ids (4 bytes per entry) rather than sets, since
+    a typical account contributes ~30 trigrams.
+    """
+
+    def __init__(self):
+        self._docs: dict[int, tuple[str, str]] = {} # id -> (lowercase username, lowercase email)
+        self._postings: dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, account_id: int, username: str, email: str) -> None:
+        # Usernames and emails can't be changed through the app; rebuilds pick up direct DB edits.
+        if account_id in self._docs:
+            return
+        username, email = username.lower(), email.lower()
+        self._docs[account_id] = (username, email)
+        for trigram in _trigrams(username) | _trigrams(email):
+            posting = self._postings.get(trigram)
+            if posting is None:
+                posting = self._postings[trigram] = array("I")
+            posting.append(account_id)
+
+    def search(self, query: str) -> list[int]:
+        """Ids of all accounts whose username or email contains query, best matches first."""
+        query = query.lower()
+        query_trigrams = _trigrams(query)
+        if not query_trigrams:
+            raise ValueError("Search queries need at least 3 characters.")
+        postings = [self._postings.get(trigram) for trigram in query_trigrams]
+        if any(posting is None for posting in postings):
+            return []
+        # Every match contains the rarest trigram; verifying those candidates is cheaper than intersecting.
+        candidates = min(postings, key=len)
+        docs = self._docs
+        ranked = []
+        for account_id in candidates:
+            username, email = docs[account_id]
+            if query in username or query in email:
+                ranked.append((_rank(query, username, email), len(username), account_id))
+        ranked.sort()
+        return [account_id for _, _, account_id in ranked]
+
+    def stats(self) -> dict:
+        return {
+            "accounts": len(self._docs),
+            "trigrams": len(self._postings),
+            "postings": sum(len(posting) for posting in self._postings.values()),
+        }
+
+_index: TrigramIndex | None = None # None until the first build completes
+_pending_additions: list[tuple[int, str, str]] | None = None # Accounts created during a rebuild
+_last_build_seconds: float | None = None
+_refresh_tasks: set[asyncio.Task] = set()
+
+def is_ready() -> bool:
+    return _index is not None
+
+async def rebuild() -> None:
+    """Builds a fresh index from the account table (replica if configured) and swaps it in."""
+    global _index, _pending_additions, _last_build_seconds
+    started = time.monotonic()
+    index = TrigramIndex()
+    _pending_additions = []
+    try:
+        async with SessionLocal() as db:
+            async for rows in user_crud.stream_user_identities(db, batch_size=settings.ACCOUNT_SEARCH_BUILD_BATCH_SIZE):
+                for account_id, username, email in rows:
+                    index.add(account_id, username, email)
+        for account_id, username, email in _pending_additions:
+            index.add(account_id, username, email)
+        _index = index
+    finally:
+        _pending_additions = None
+    _last_build_seconds = time.monotonic() - started
+    logger.info(f"Account search index built: {len(index)} account(s) in {_last_build_seconds:.2f}s.")
+
+def _add_local(account_id: int, username: str, email: str) -> None:
+    if _pending_additions is not None:
+        _pending_additions.append((account_id, username, email))
+    if _index is not None:
+        _index.add(account_id, username, email)
+
+async def add_account(account) -> None:
+    """Indexes a newly created account here and on the other workers."""
+    _add_local(account.id, account.username, account.email)
+    await publish_invalidation(NAMESPACE, account.id)
+
+async def _load_account(account_id: int) -> None:
+    async with SessionLocal() as db:
+        rows = await user_crud.get_users_by_ids(use_primary(db), [account_id]) # Just created: replicas may lag
+    for row in rows:
+        _add_local(row["id"], row["username"], row["email"])
+
+def _apply_remote_addition(key: str) -> None:
+    # Another worker created the account; fetch it in the background.
+    if key.isdigit():
+        task = asyncio.get_running_loop().create_task(_load_account(int(key)))
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
+
+register_invalidation_handler(NAMESPACE, _apply_remote_addition)
+
+async def search(query: str) -> list[int] | None:
+    """
+    Ranked matching account ids, or None if the index isn't built yet.
+    Runs in a thread: very common substrings (e.g. "gmail") match a large share of all accounts.
+    """
+    if _index is None:
+        return None
+    return await asyncio.to_thread(_index.search, query)
+
+def get_stats() -> dict:
+    stats = _index.stats() if _index is not None else {}
+    return {"ready": _index is not None, "last_build_seconds": _last_build_seconds, **stats}
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from backend.app.core.cache import register_invalidation_handler, publish_invalidation
+from backend.app.core.config import settings
+from backend.app.core.database import SessionLocal, AuxSessionLocal
+from backend.app.crud import user as user_crud
+from backend.app.crud import user_totp as user_totp_crud
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "account_stats"
+
+# Deltas are broadcast to every worker, including the sender's own listener; the sender skips its own.
+_WORKER_ID = uuid.uuid4().hex[:12]
+
+COUNTERS = ("total_accounts", "locked_accounts", "verified_emails", "totp_enabled")
+
+# Admin dashboard counters, kept up to date by the CRUD write paths and periodically
+# reconciled against both databases, so serving the dashboard needs no queries.
+_counters: dict[str, int] = dict.fromkeys(COUNTERS, 0)
+_registrations: dict[date, int] = {} # Registrations per day (days within ACCOUNT_STATS_DAYS)
+_reconciled_at: datetime | None = None
+_last_reconcile_seconds: float | None = None
+_reconcile_lock = asyncio.Lock()
+
+def _apply(changes: dict[str, int]) -> None:
+    for field, delta in changes.items():
+        if field in _counters:
+            _counters[field] += delta
+        else:
+            day = date.fromisoformat(field)
+            _registrations[day] = _registrations.get(day, 0) + delta
+
+async def _record(changes: dict[str, int]) -> None:
+    """Applies counter deltas here and on the other workers."""
+    _apply(changes)
+    encoded = ",".join(f"{field}={delta}" for field, delta in changes.items())
+    await publish_invalidation(NAMESPACE, f"{_WORKER_ID}|{encoded}")
+
+def _apply_remote_changes(key: str) -> None:
+    # Published as "<worker id>|<field>=<delta>,..." by the worker that performed the write.
+    worker_id, _, encoded = key.partition("|")
+    if worker_id == _WORKER_ID:
+        return
+    try:
+        changes = {field: int(delta) for field, _, delta in (item.partition("=") for item in encoded.split(","))}
+        _apply(changes)
+    except ValueError:
+        logger.warning(f"Ignoring malformed account stats update: {key}")
+
+register_invalidation_handler(NAMESPACE, _apply_remote_changes)
+
+async def record_registration(joined: datetime | None) -> None:
+    day = (joined or datetime.now()).date()
+    await _record({"total_accounts": 1, day.isoformat(): 1})
+
+async def record_locked_change(delta: int) -> None:
+    """delta accounts were locked (positive) or unlocked (negative)."""
+    if delta:
+        await _record({"locked_accounts": delta})
+
+async def record_email_verified() -> None:
+    await _record({"verified_emails": 1})
+
+async def record_totp_change(delta: int) -> None:
+    """2FA was activated (+1) or deactivated (-1) for an account."""
+    await _record({"totp_enabled": delta})
+
+async def reconcile() -> None:
+    """
+    Replaces the counters with fresh COUNT queries. Run at startup and periodically, which also
+    corrects drift from writes made outside the app or missed while Redis was unreachable.
+    """
+    global _reconciled_at, _last_reconcile_seconds
+    async with _reconcile_lock:
+        started = time.monotonic()
+        since = date.today() - timedelta(days=settings.ACCOUNT_STATS_DAYS - 1)
+        async with SessionLocal() as db:
+            account_counts = await user_crud.get_account_counts(db)
+            registrations = await user_crud.count_registrations_per_day(db, since=since)
+        async with AuxSessionLocal() as aux_db:
+            totp_enabled = await user_totp_crud.count_active_totp(aux_db)
+        _counters.update(account_counts, totp_enabled=totp_enabled)
+        _registrations.clear()
+        _registrations.update(registrations)
+        _reconciled_at = datetime.utcnow()
+        _last_reconcile_seconds = time.monotonic() - started
+    logger.info(f"Account stats reconciled in {_last_reconcile_seconds:.3f}s: {_counters}")
+
+def is_ready() -> bool:
+    return _reconciled_at is not None
+
+def get_account_stats() -> dict:
+    """The dashboard snapshot, built from memory."""
+    today = date.today()
+    days = [today - timedelta(days=offset) for offset in range(settings.ACCOUNT_STATS_DAYS - 1, -1, -1)]
+    return {
+        **_counters,
+        "registrations_per_day": [{"day": day, "count": _registrations.get(day, 0)} for day in days],
+        "reconciled_at": _reconciled_at,
+    }
+
+def get_stats() -> dict:
+    return {"ready": is_ready(), "last_reconcile_seconds": _last_reconcile_seconds}
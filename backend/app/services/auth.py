@@ -1,10 +1,20 @@
 import hashlib
+import logging
+import time
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+from backend.app.core.cache import TTLCache, MISSING
+from backend.app.core.metrics import Histogram, StageTimer
+from backend.app.core.process_pool import run_cpu_bound
+from backend.app.services import srp6
 from backend.app.core.config import settings
 from backend.app.models.user import TokenData # Assuming TokenData is in user.py
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 # For AzerothCore's specific SHA1 hash: SHA1(UPPER(USERNAME) + ':' + UPPER(PASSWORD))
 def verify_ac_password(plain_password: str, username: str, hashed_password_from_db: str) -> bool:
     salt_and_pass = f"{username.upper()}:{plain_password.upper()}"
@@ -15,6 +25,52 @@ def get_ac_password_hash(password: str, username: str) -> str:
     salt_and_pass = f"{username.upper()}:{password.upper()}"
     return hashlib.sha1(salt_and_pass.encode('utf-8')).hexdigest()
 
+async def check_srp6_columns() -> None:
+    """
+    Raises RuntimeError if the account table lacks the SRP6 salt/verifier columns. They are
+    required even with SRP6 disabled: the Account model maps them, and password changes clear
+    them so that a verifier of the old password can't be used.
+    """
+    from backend.app.core.database import engine
+    if engine is None:
+        return
+    try:
+        async with engine.connect() as conn:
+            columns = await conn.run_sync(lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns("account")})
+    except SQLAlchemyError as e:
+        logger.error(f"Could not check the account table for the SRP6 columns: {e}")
+        return
+    if not {"salt", "verifier"} <= columns:
+        raise RuntimeError(
+            "The account table has no SRP6 salt/verifier columns. Add them first: "
+            "ALTER TABLE account ADD COLUMN salt BINARY(32) NULL, ADD COLUMN verifier BINARY(32) NULL;"
+        )
+
+async def hash_new_password(username: str, password: str) -> dict:
+    """
+    Account column values for a new password: SRP6 salt/verifier (computed in the
+    CPU worker pool) and/or the legacy sha_pass_hash, depending on settings.
+    """
+    columns = {}
+    if settings.SRP6_ENABLED:
+        salt, verifier = await run_cpu_bound(srp6.make_registration_data, username, password)
+        columns.update(salt=salt, verifier=verifier)
+    else:
+        # Cleared, not kept: a verifier of the previous password would keep accepting it in the
+        # auth server, and here once SRP6 is enabled again.
+        columns.update(salt=None, verifier=None)
+    keep_legacy_hash = not settings.SRP6_ENABLED or settings.SRP6_KEEP_LEGACY_HASH
+    columns["sha_pass_hash"] = get_ac_password_hash(password=password, username=username) if keep_legacy_hash else ""
+    return columns
+
+async def verify_account_password(account, password: str) -> bool:
+    """Checks a password against the account's SRP6 verifier if it has one, else against sha_pass_hash."""
+    if settings.SRP6_ENABLED and account.salt and account.verifier:
+        return await run_cpu_bound(srp6.verify_password, account.username, password, account.salt, account.verifier)
+    if not account.sha_pass_hash:
+        return False
+    return verify_ac_password(plain_password=password, username=account.username, hashed_password_from_db=account.sha_pass_hash)
+
 # JWT Handling
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -26,12 +82,48 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+# Verified-token cache: SHA-256 digest of the token -> TokenData, kept until the token's 'exp'.
+# Clients reuse the same token for many requests; this skips the signature check and the
+# Pydantic construction for all but the first. The raw token is never stored.
+_verified_tokens = TTLCache(maxsize=settings.TOKEN_CACHE_MAX_ENTRIES, ttl_seconds=0)
+
+def _token_cache_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
 def verify_token(token: str, credentials_exception) -> TokenData:
+    cache_key = _token_cache_key(token)
+    cached = _verified_tokens.get(cache_key)
+    if cached is not MISSING:
+        return cached
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: Optional[str] = payload.get("sub")
         if username is None:
             raise credentials_exception
-        return TokenData(username=username)
+        token_data = TokenData(username=username, user_id=payload.get("uid"), generation=payload.get("gen", 0))
     except JWTError:
         raise credentials_exception
+
+    exp = payload.get("exp")
+    if exp is not None:
+        # 'exp' is wall-clock; the cache works on the monotonic clock.
+        remaining = float(exp) - time.time()
+        if remaining > 0:
+            _verified_tokens.set(cache_key, token_data, expires_at=time.monotonic() + remaining)
+    return token_data
+
+def get_token_cache_stats() -> dict:
+    return _verified_tokens.stats()
+
+# Login latency per stage, aggregated over all login attempts of this worker.
+LOGIN_STAGES = ("lookup", "hash_verify", "totp_verify", "token_mint", "total")
+_login_stage_histograms = {stage: Histogram() for stage in LOGIN_STAGES}
+
+def record_login_timings(timer: StageTimer) -> None:
+    for stage, duration_ms in timer.durations_ms.items():
+        histogram = _login_stage_histograms.get(stage)
+        if histogram is not None:
+            histogram.observe(duration_ms)
+
+def get_login_timing_stats() -> dict:
+    return {stage: histogram.snapshot() for stage, histogram in _login_stage_histograms.items()}
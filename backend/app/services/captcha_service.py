@@ -1,4 +1,19 @@
+import base64
+import functools
+import hashlib
+import hmac
+import logging
+import math
+import os
 import random
+import struct
+import time
+from collections import deque
+
+from backend.app.core.config import settings
+from backend.app.core.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
 
 CAPTCHA_EXPIRY_SECONDS: int = 300  # 5 minutes
 
@@ -22,3 +37,201 @@ def generate_math_challenge() -> tuple[str, str]:
         raise ValueError("Invalid operator selected")
 
     return question, answer
+
+# --- Stateless (signed) challenges ---
+# The challenge id is a token carrying its own expiry, a random nonce and a keyed digest of the
+# answer, signed with a key derived from SECRET_KEY. Issuing and checking one needs no storage;
+# only spent nonces are remembered (until the token would have expired anyway), to keep tokens single-use.
+
+_TOKEN_PAYLOAD = struct.Struct(">I12s16s") # expires_at (unix time), nonce, answer digest
+_SIGNATURE_LENGTH = 16
+
+class CaptchaError(Exception):
+    """Raised when a signed challenge is malformed, forged, expired or already used."""
+
+@functools.lru_cache(maxsize=8)
+def _derive_key(secret_key: str, purpose: bytes) -> bytes:
+    return hmac.new(secret_key.encode("utf-8"), b"captcha:" + purpose, hashlib.sha256).digest()
+
+def _key(purpose: bytes) -> bytes:
+    return _derive_key(settings.SECRET_KEY, purpose)
+
+def _answer_digest(nonce: bytes, answer: str) -> bytes:
+    # Keyed, since a plain salted hash of a number below 101 is trivially brute-forced from the token.
+    return hmac.new(_key(b"answer"), nonce + answer.strip().lower().encode("utf-8"), hashlib.sha256).digest()[:16]
+
+def _sign(payload: bytes, purpose: bytes = b"sign") -> bytes:
+    return hmac.new(_key(purpose), payload, hashlib.sha256).digest()[:_SIGNATURE_LENGTH]
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def issue_signed_challenge(answer: str, expires_in_seconds: int) -> str:
+    """Returns the token for a challenge with the given answer (pure CPU, no I/O)."""
+    nonce = os.urandom(12)
+    payload = _TOKEN_PAYLOAD.pack(int(time.time()) + expires_in_seconds, nonce, _answer_digest(nonce, answer))
+    return _b64encode(payload + _sign(payload))
+
+def _open_token(token: str, layout: struct.Struct, purpose: bytes = b"sign") -> tuple:
+    """Checks a token's signature and expiry (always its first field) and returns its fields."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError):
+        raise CaptchaError("Malformed CAPTCHA token.")
+    if len(raw) != layout.size + _SIGNATURE_LENGTH:
+        raise CaptchaError("Malformed CAPTCHA token.")
+    payload, signature = raw[:layout.size], raw[layout.size:]
+    if not hmac.compare_digest(signature, _sign(payload, purpose)):
+        raise CaptchaError("Invalid CAPTCHA token signature.")
+    fields = layout.unpack(payload)
+    if fields[0] <= time.time():
+        raise CaptchaError("CAPTCHA token has expired.")
+    return fields
+
+class SpentTokenFilter:
+    """
+    Bloom filters of spent token nonces, one per expiry time bucket. Tokens can only be spent
+    before they expire, so whole buckets are dropped once their tokens have expired: memory is
+    bounded by the tokens issued within one challenge lifetime, never by uptime.
+    A false positive rejects an unused token (the client requests a new challenge).
+    """
+
+    def __init__(self, capacity_per_bucket: int, bucket_seconds: int = 60, false_positive_rate: float = 1e-4):
+        self.bucket_seconds = bucket_seconds
+        self._bit_count = max(8, math.ceil(-capacity_per_bucket * math.log(false_positive_rate) / math.log(2) ** 2))
+        self._hash_count = max(1, round(self._bit_count / max(capacity_per_bucket, 1) * math.log(2)))
+        self._buckets: dict[int, bytearray] = {} # bucket id -> bit array
+        self._counts: dict[int, int] = {}
+
+    def _positions(self, nonce: bytes) -> list[int]:
+        digest = hashlib.blake2b(nonce, digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self._bit_count for i in range(self._hash_count)]
+
+    def _drop_expired(self, now: float) -> None:
+        for bucket_id in [b for b in self._buckets if (b + 1) * self.bucket_seconds <= now]:
+            del self._buckets[bucket_id]
+            del self._counts[bucket_id]
+
+    def add(self, nonce: bytes, expires_at: int) -> bool:
+        """Marks a nonce as spent; returns False if it already was."""
+        self._drop_expired(time.time())
+        bucket_id = expires_at // self.bucket_seconds
+        bits = self._buckets.get(bucket_id)
+        if bits is None:
+            bits = self._buckets[bucket_id] = bytearray((self._bit_count + 7) // 8)
+            self._counts[bucket_id] = 0
+        positions = self._positions(nonce)
+        if all(bits[p >> 3] & (1 << (p & 7)) for p in positions):
+            return False
+        for p in positions:
+            bits[p >> 3] |= 1 << (p & 7)
+        self._counts[bucket_id] += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "buckets": len(self._buckets),
+            "spent_tokens": sum(self._counts.values()),
+            "bytes": sum(len(bits) for bits in self._buckets.values()),
+        }
+
+_spent_filter = SpentTokenFilter(capacity_per_bucket=settings.CAPTCHA_SPENT_FILTER_CAPACITY)
+
+async def _mark_spent(nonce: bytes, expires_at: int) -> bool:
+    """Shared through Redis (exact, across workers) when configured, else the per-worker filter."""
+    redis_client = get_async_redis()
+    if redis_client is not None:
+        try:
+            ttl = max(1, expires_at - int(time.time()))
+            return bool(await redis_client.set(f"acweb:captcha-spent:{nonce.hex()}", 1, nx=True, ex=ttl))
+        except Exception as e:
+            logger.warning(f"Redis unavailable for CAPTCHA spent tokens, using the in-process filter: {e}")
+    return _spent_filter.add(nonce, expires_at)
+
+async def redeem_signed_challenge(token: str, solution: str) -> bool:
+    """
+    Spends a signed challenge and returns whether solution is its answer. Every attempt spends the
+    token, right or wrong. Raises CaptchaError if the token is malformed, forged, expired or spent.
+    """
+    expires_at, nonce, answer_digest = _open_token(token, _TOKEN_PAYLOAD)
+    if not await _mark_spent(nonce, expires_at):
+        raise CaptchaError("CAPTCHA token was already used.")
+    return hmac.compare_digest(answer_digest, _answer_digest(nonce, solution))
+
+# --- Proof-of-work challenges ---
+# Hashcash-style: the client must find a solution such that SHA-256("<challenge id>:<solution>")
+# starts with `difficulty` zero bits, i.e. ~2**difficulty hashes on average, while checking one costs
+# the server a single hash (plus the HMAC on the token). The id is a signed token as above, so
+# issuing needs no storage either. Difficulty grows with the registration rate, so floods pay more.
+
+_POW_PAYLOAD = struct.Struct(">I12sB") # expires_at (unix time), nonce, difficulty
+_POW_MAX_SOLUTION_LENGTH = 32
+
+class _EventRate:
+    """Events over the last window_seconds, counted in one-second buckets."""
+
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self._buckets: deque[list[int]] = deque() # [second, count], oldest first
+
+    def _trim(self, now: int) -> None:
+        while self._buckets and self._buckets[0][0] <= now - self.window_seconds:
+            self._buckets.popleft()
+
+    def record(self) -> None:
+        now = int(time.monotonic())
+        self._trim(now)
+        if self._buckets and self._buckets[-1][0] == now:
+            self._buckets[-1][1] += 1
+        else:
+            self._buckets.append([now, 1])
+
+    def count(self) -> int:
+        self._trim(int(time.monotonic()))
+        return sum(count for _, count in self._buckets)
+
+_registration_rate = _EventRate(window_seconds=60)
+
+def record_registration_attempt() -> None:
+    """Counts a registration that passed its challenge; drives the proof-of-work difficulty."""
+    _registration_rate.record()
+
+def current_pow_difficulty() -> int:
+    """POW_BASE_DIFFICULTY, plus one bit (twice the work) per doubling of the rate above the threshold."""
+    rate = _registration_rate.count()
+    threshold = max(settings.POW_RATE_THRESHOLD_PER_MINUTE, 1)
+    extra = math.ceil(math.log2(rate / threshold)) if rate > threshold else 0
+    return min(settings.POW_BASE_DIFFICULTY + extra, settings.POW_MAX_DIFFICULTY)
+
+def issue_pow_challenge(expires_in_seconds: int) -> tuple[str, int]:
+    """Returns (challenge id, difficulty) for a new proof-of-work challenge."""
+    difficulty = current_pow_difficulty()
+    payload = _POW_PAYLOAD.pack(int(time.time()) + expires_in_seconds, os.urandom(12), difficulty)
+    return _b64encode(payload + _sign(payload, b"pow")), difficulty
+
+def pow_hash_meets_difficulty(challenge_id: str, solution: str, difficulty: int) -> bool:
+    digest = hashlib.sha256(f"{challenge_id}:{solution}".encode("utf-8")).digest()
+    return int.from_bytes(digest, "big") >> (256 - difficulty) == 0
+
+async def redeem_pow_challenge(challenge_id: str, solution: str) -> bool:
+    """
+    Returns whether solution solves the challenge. Only a valid solution spends the challenge (so
+    garbage submissions cost one hash and no storage I/O). Raises CaptchaError if the challenge
+    is malformed, forged, expired or already used.
+    """
+    expires_at, nonce, difficulty = _open_token(challenge_id, _POW_PAYLOAD, b"pow")
+    if len(solution) > _POW_MAX_SOLUTION_LENGTH or not pow_hash_meets_difficulty(challenge_id, solution, difficulty):
+        return False
+    if not await _mark_spent(nonce, expires_at):
+        raise CaptchaError("CAPTCHA token was already used.")
+    return True
+
+def get_stats() -> dict:
+    return {
+        "mode": settings.CAPTCHA_MODE,
+        "type": settings.CAPTCHA_TYPE,
+        "spent_filter": _spent_filter.stats(),
+        "registrations_last_minute": _registration_rate.count(),
+        "pow_difficulty": current_pow_difficulty(),
+    }
@@ -0,0 +1,132 @@
+import asyncio
+import datetime
+import logging
+import random
+
+from backend.app.core.config import settings
+from backend.app.core.database import SessionLocal, AuxSessionLocal
+from backend.app.crud import email_outbox as email_outbox_crud
+from backend.app.crud import user as user_crud
+from backend.app.services import email_service
+
+logger = logging.getLogger(__name__)
+
+# Emails are queued in the aux DB and delivered by background workers, so requests never wait
+# on the SMTP relay and a relay outage only delays mail. Each worker claims a batch of due
+# messages, sends it in a thread over a pooled SMTP session, and deletes the messages once sent.
+# Failed messages are retried with exponential backoff and dead-lettered after EMAIL_OUTBOX_MAX_ATTEMPTS.
+
+# Set on enqueue so this process's idle workers start at once; messages queued by other
+# processes are picked up within EMAIL_OUTBOX_POLL_SECONDS.
+_wakeup: asyncio.Event | None = None
+
+# Delivery outcomes in this process since startup
+_counters = {"delivered": 0, "failed_attempts": 0, "dead_lettered": 0}
+
+async def enqueue_email(recipient: str, subject: str, body: str) -> int:
+    """Stores an email for background delivery and returns its outbox id."""
+    async with AuxSessionLocal() as aux_db:
+        message = await email_outbox_crud.enqueue_email(aux_db, recipient, subject, body)
+    if _wakeup is not None:
+        _wakeup.set()
+    return message.id
+
+async def enqueue_verification_email(user_email: str, username: str, verification_token: str) -> int:
+    subject, body = email_service.build_verification_email(username, verification_token)
+    return await enqueue_email(user_email, subject, body)
+
+async def enqueue_announcement(subject: str, body: str) -> int:
+    """Queues an email to every verified address in the account table; returns how many were queued."""
+    queued = 0
+    async with SessionLocal() as db, AuxSessionLocal() as aux_db:
+        async for recipients in user_crud.stream_verified_emails(db, batch_size=settings.EMAIL_ANNOUNCEMENT_BATCH_SIZE):
+            await email_outbox_crud.enqueue_emails(aux_db, recipients, subject, body)
+            queued += len(recipients)
+            if _wakeup is not None:
+                _wakeup.set() # Delivery starts while the rest is still being queued
+    logger.info(f"Announcement '{subject}' queued for {queued} verified address(es).")
+    return queued
+
+def retry_delay_seconds(attempts: int) -> float:
+    """Backoff after the given number of failed attempts, with jitter so retries after a relay outage spread out."""
+    delay = min(settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+async def _record_failure(message, error: Exception) -> None:
+    attempts = message.attempts + 1
+    _counters["failed_attempts"] += 1
+    if attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        retry_at = None
+        _counters["dead_lettered"] += 1
+        logger.error(f"Email {message.id} to {message.recipient} failed {attempts} times, giving up: {error}")
+    else:
+        retry_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=retry_delay_seconds(attempts))
+        logger.warning(f"Email {message.id} to {message.recipient} failed (attempt {attempts}), retrying at {retry_at}: {error}")
+    async with AuxSessionLocal() as aux_db:
+        await email_outbox_crud.record_failure(aux_db, message.id, f"{type(error).__name__}: {error}", retry_at)
+
+async def process_due_messages() -> int:
+    """Claims one batch of due messages and sends it over a pooled SMTP session; returns how many were claimed."""
+    async with AuxSessionLocal() as aux_db:
+        dead_lettered = await email_outbox_crud.dead_letter_lapsed_claims(aux_db, settings.EMAIL_OUTBOX_MAX_ATTEMPTS)
+        messages = await email_outbox_crud.claim_due_messages(
+            aux_db,
+            limit=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            lease_seconds=settings.EMAIL_OUTBOX_CLAIM_SECONDS,
+            max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        )
+    if dead_lettered:
+        _counters["dead_lettered"] += dead_lettered
+        logger.error(f"{dead_lettered} email(s) dead-lettered: their claim lapsed on every attempt.")
+    if not messages:
+        return 0
+    errors = await asyncio.to_thread(
+        email_service.send_batch, [(message.recipient, message.subject, message.body) for message in messages]
+    )
+    delivered_ids = [message.id for message, error in zip(messages, errors) if error is None]
+    if delivered_ids:
+        async with AuxSessionLocal() as aux_db:
+            await email_outbox_crud.delete_messages(aux_db, delivered_ids)
+        _counters["delivered"] += len(delivered_ids)
+        logger.info(f"Sent {len(delivered_ids)} queued email(s).")
+    for message, error in zip(messages, errors):
+        if error is not None:
+            await _record_failure(message, error)
+    return len(messages)
+
+async def _run_worker(index: int) -> None:
+    while True:
+        _wakeup.clear()
+        try:
+            # While the relay is unreachable, messages wait without using up their attempts
+            claimed = await process_due_messages() if email_service.is_online() else 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Email outbox worker {index} failed: {e}")
+            claimed = 0
+        if not claimed:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+async def run_outbox_workers() -> None:
+    """Background task: runs EMAIL_OUTBOX_WORKERS delivery workers until cancelled."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    await asyncio.gather(*(_run_worker(index) for index in range(settings.EMAIL_OUTBOX_WORKERS)))
+
+async def get_stats() -> dict:
+    """Queue depth (shared by all processes) and this process's delivery counters."""
+    async with AuxSessionLocal() as aux_db:
+        counts = await email_outbox_crud.count_by_status(aux_db)
+        oldest_created_at = await email_outbox_crud.get_oldest_pending_created_at(aux_db)
+    oldest_age = (datetime.datetime.utcnow() - oldest_created_at).total_seconds() if oldest_created_at else None
+    return {
+        "pending": counts.get("pending", 0),
+        "sending": counts.get("sending", 0),
+        "dead": counts.get("dead", 0),
+        "oldest_queued_seconds": oldest_age,
+        **_counters,
+    }
@@ -1,5 +1,9 @@
+import asyncio
 import smtplib
 import socket
+import threading
+import time
+from dataclasses import dataclass
 from email.mime.text import MIMEText
 from pydantic import EmailStr
 import logging
@@ -8,28 +12,41 @@ from backend.app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-def is_online(host="8.8.8.8", port=53, timeout=3) -> bool:
-    """
-    Check internet connectivity by trying to connect to a known host.
-    Default is Google's public DNS server.
-    """
-    try:
-        socket.setdefaulttimeout(timeout)
-        socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect((host, port))
-        return True
-    except socket.error as ex:
-        logger.warning(f"Internet connectivity check failed: {ex}")
-        return False
+# Reachability of the SMTP host, kept up to date by check_connectivity() (a periodic background
+# task), so senders check a flag instead of probing the network themselves.
+_smtp_reachable: bool | None = None # None until the first probe
+_connectivity_checked_at: float | None = None
 
-def send_verification_email(user_email: EmailStr, username: str, verification_token: str):
-    if not settings.SMTP_HOST or not settings.SMTP_SENDER_EMAIL:
-        logger.warning("SMTP settings not configured. Skipping email verification.")
-        return False
+def is_online() -> bool:
+    """Whether the SMTP host was reachable at the last check. Never blocks; True until the first check."""
+    return _smtp_reachable is not False
 
-    if not is_online():
-        logger.warning("No internet connection. Skipping email verification.")
+def probe_host(host: str, port: int, timeout: float) -> bool:
+    """Opens (and closes) a TCP connection to host:port. Blocking."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError as e:
+        logger.debug(f"Connectivity probe of {host}:{port} failed: {e}")
         return False
 
+async def check_connectivity() -> bool:
+    """Probes the configured SMTP host (in a thread) and updates the cached state."""
+    global _smtp_reachable, _connectivity_checked_at
+    reachable = await asyncio.to_thread(
+        probe_host, settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_CONNECTIVITY_TIMEOUT_SECONDS
+    )
+    if reachable != _smtp_reachable:
+        if reachable:
+            logger.info(f"SMTP host {settings.SMTP_HOST}:{settings.SMTP_PORT} is reachable.")
+        else:
+            logger.warning(f"SMTP host {settings.SMTP_HOST}:{settings.SMTP_PORT} is unreachable; emails will wait in the outbox.")
+    _smtp_reachable = reachable
+    _connectivity_checked_at = time.monotonic()
+    return reachable
+
+def build_verification_email(username: str, verification_token: str) -> tuple[str, str]:
+    """Returns the subject and body of the email verification message."""
     verification_link = f"{settings.FRONTEND_URL}/verify-email?token={verification_token}"
 
     subject = "Verify your email address"
@@ -44,20 +61,219 @@ def send_verification_email(user_email: EmailStr, username: str, verification_to
     Thanks,
     The Team
     """
+    return subject, body
 
+def _build_message(recipient: str, subject: str, body: str) -> str:
     msg = MIMEText(body)
     msg['Subject'] = subject
     msg['From'] = settings.SMTP_SENDER_EMAIL
-    msg['To'] = user_email
+    msg['To'] = recipient
+    return msg.as_string()
 
-    try:
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
+class _RateShaper:
+    """Token bucket pacing sends to at most rate messages per second (bursts of up to rate). Blocks the calling thread."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+
+@dataclass
+class _Session:
+    server: smtplib.SMTP
+    messages_sent: int = 0
+    last_used: float = 0.0
+
+class SMTPConnectionPool:
+    """
+    Authenticated SMTP sessions kept open between sends, so a message costs one MAIL/RCPT/DATA
+    exchange instead of TCP connect, EHLO, STARTTLS and AUTH. Thread-safe (sends run in threads).
+
+    At most max_connections sessions are open at once, each is replaced after
+    max_messages_per_connection messages, idle sessions are closed after idle_seconds, and all
+    sends are paced to max_messages_per_second: the limits relays usually enforce per client.
+    """
+
+    def __init__(self, max_connections: int, max_messages_per_connection: int, idle_seconds: float, max_messages_per_second: float):
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_seconds = idle_seconds
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle: list[_Session] = []
+        self._lock = threading.Lock()
+        self._rate = _RateShaper(max_messages_per_second)
+        self.connections_opened = 0
+        self.sessions_reused = 0
+        self.messages_sent = 0
+        self.messages_failed = 0
+
+    def _connect(self) -> _Session:
+        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        try:
             if settings.SMTP_USER and settings.SMTP_PASSWORD:
                 server.starttls() # Upgrade the connection to encrypted TLS
                 server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.sendmail(settings.SMTP_SENDER_EMAIL, [user_email], msg.as_string())
-            logger.info(f"Verification email sent to {user_email}")
-            return True
+        except Exception:
+            _close(server)
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return _Session(server)
+
+    def _checkout(self) -> _Session:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                return self._connect()
+            if now - session.last_used > self.idle_seconds:
+                _close(session.server)
+                continue
+            try:
+                session.server.noop() # The relay may have dropped the session while it was idle
+            except Exception:
+                _close(session.server)
+                continue
+            with self._lock:
+                self.sessions_reused += 1
+            return session
+
+    def _checkin(self, session: _Session) -> None:
+        if session.messages_sent >= self.max_messages_per_connection:
+            _close(session.server)
+            return
+        session.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(session)
+
+    def send_batch(self, messages: list[tuple[str, str, str]]) -> list[Exception | None]:
+        """
+        Sends (recipient, subject, body) messages one after another over a pooled session.
+        Returns one entry per message: None if it was accepted, else the exception. A message
+        rejected by the relay doesn't affect the others; a lost connection is replaced.
+        """
+        results: list[Exception | None] = []
+        with self._slots:
+            session = None
+            for index, (recipient, subject, body) in enumerate(messages):
+                if session is None:
+                    try:
+                        session = self._checkout()
+                    except Exception as e: # Relay unreachable: the rest of the batch fails too
+                        results.extend([e] * (len(messages) - index))
+                        break
+                self._rate.wait()
+                try:
+                    session.server.sendmail(settings.SMTP_SENDER_EMAIL, [recipient], _build_message(recipient, subject, body))
+                    session.messages_sent += 1
+                    results.append(None)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                    results.append(e) # Rejected message; the session is still usable
+                except Exception as e:
+                    results.append(e)
+                    _close(session.server)
+                    session = None
+                    continue
+                if session.messages_sent >= self.max_messages_per_connection:
+                    self._checkin(session) # Closes it
+                    session = None
+            if session is not None:
+                self._checkin(session)
+        with self._lock:
+            failed = sum(result is not None for result in results)
+            self.messages_sent += len(results) - failed
+            self.messages_failed += failed
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            _close(session.server)
+
+    def stats(self) -> dict:
+        return {
+            "idle_connections": len(self._idle),
+            "connections_opened": self.connections_opened,
+            "sessions_reused": self.sessions_reused,
+            "messages_sent": self.messages_sent,
+            "messages_failed": self.messages_failed,
+        }
+
+def _close(server: smtplib.SMTP) -> None:
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+_pool: SMTPConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPConnectionPool(
+                max_connections=settings.SMTP_POOL_MAX_CONNECTIONS,
+                max_messages_per_connection=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+                idle_seconds=settings.SMTP_POOL_IDLE_SECONDS,
+                max_messages_per_second=settings.SMTP_MAX_MESSAGES_PER_SECOND,
+            )
+        return _pool
+
+def close_smtp_pool() -> None:
+    """Closes the pooled sessions (called on application shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+def send_batch(messages: list[tuple[str, str, str]]) -> list[Exception | None]:
+    """Sends many (recipient, subject, body) messages over pooled SMTP sessions; blocking. See SMTPConnectionPool.send_batch."""
+    return get_smtp_pool().send_batch(messages)
+
+def deliver_email(recipient: str, subject: str, body: str) -> None:
+    """Sends one email over a pooled SMTP session. Blocking; raises on any failure."""
+    error = send_batch([(recipient, subject, body)])[0]
+    if error is not None:
+        raise error
+
+def get_stats() -> dict:
+    checked_ago = time.monotonic() - _connectivity_checked_at if _connectivity_checked_at is not None else None
+    return {**get_smtp_pool().stats(), "reachable": _smtp_reachable, "reachability_checked_seconds_ago": checked_ago}
+
+def send_verification_email(user_email: EmailStr, username: str, verification_token: str):
+    """
+    Sends the verification email immediately, blocking until done. Registration queues it
+    in the email outbox instead (see email_outbox.enqueue_verification_email).
+    """
+    if not settings.SMTP_HOST or not settings.SMTP_SENDER_EMAIL:
+        logger.warning("SMTP settings not configured. Skipping email verification.")
+        return False
+
+    if not is_online():
+        logger.warning("SMTP host unreachable. Skipping email verification.")
+        return False
+
+    subject, body = build_verification_email(username, verification_token)
+    try:
+        deliver_email(user_email, subject, body)
+        logger.info(f"Verification email sent to {user_email}")
+        return True
     except smtplib.SMTPAuthenticationError as e:
         logger.error(f"SMTP Authentication Error: Failed to send email to {user_email}. Error: {e}")
     except smtplib.SMTPServerDisconnected as e:
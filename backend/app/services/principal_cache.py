@@ -0,0 +1,52 @@
+import logging
+
+from backend.app.core.cache import TwoTierCache, MISSING
+from backend.app.core.config import settings
+from backend.app.models.user import Principal
+
+logger = logging.getLogger(__name__)
+
+# Keyed by username (the JWT 'sub'), which is what get_current_active_user looks up.
+_cache = TwoTierCache(
+    namespace="principal",
+    maxsize=settings.PRINCIPAL_CACHE_MAX_ENTRIES if settings.PRINCIPAL_CACHE_ENABLED else 0,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    serialize=lambda principal: principal.json(),
+    deserialize=Principal.parse_raw,
+    use_redis=settings.PRINCIPAL_CACHE_ENABLED and settings.PRINCIPAL_CACHE_USE_REDIS,
+)
+
+async def get_principal(username: str, generation: int = 0) -> Principal | None:
+    """
+    Returns the cached principal for a username, or None on a cache miss or if it was cached before
+    the account's token generation reached `generation`. That catches bans and password changes on
+    other workers even without Redis, where their invalidations don't reach this worker.
+    """
+    if not settings.PRINCIPAL_CACHE_ENABLED:
+        return None
+    principal = await _cache.get(username)
+    return None if principal is MISSING or principal.token_generation < generation else principal
+
+async def cache_principal(account, generation: int) -> Principal:
+    """Builds a Principal from an Account row read at token generation `generation` and caches it."""
+    principal = Principal.from_orm(account)
+    principal.token_generation = generation
+    if settings.PRINCIPAL_CACHE_ENABLED:
+        await _cache.set(principal.username, principal)
+    return principal
+
+async def invalidate_principal(username: str) -> None:
+    """Drops a cached principal on every worker; call after any write to security-relevant columns."""
+    await _cache.invalidate(username)
+    logger.debug(f"Principal cache invalidated for {username}")
+
+async def invalidate_principals(usernames: list[str]) -> None:
+    """invalidate_principal() for many accounts at once (bulk admin actions)."""
+    await _cache.invalidate_many(usernames)
+
+def needs_primary_read(username: str) -> bool:
+    """True if the principal changed recently, so a refill must not come from a possibly lagging replica."""
+    return _cache.was_recently_invalidated(username)
+
+def get_stats() -> dict:
+    return _cache.stats()
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import secrets
+import time
+from dataclasses import dataclass, asdict
+
+import redis
+from backend.app.core.config import settings
+from backend.app.core.database import AuxSessionLocal
+from backend.app.crud import refresh_token as refresh_token_crud
+from backend.app.core.redis_client import get_async_redis
+from backend.app.services import token_revocation
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RefreshTokenRecord:
+    user_id: int
+    username: str
+    generation: int # Account token generation at issue time; a bump revokes the refresh token too
+    family_id: str # Shared by all tokens produced by rotating the same login
+    expires_at: float # Unix time
+
+class RefreshTokenError(Exception):
+    """Raised when a refresh token is unknown, expired, reused or revoked."""
+
+def _digest(token: str) -> str:
+    # Only digests are stored, never the tokens themselves.
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _ttl_seconds() -> int:
+    return settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60
+
+# --- Stores ---
+# Each token is single-use: refreshing consumes it and issues a new one (rotation).
+# A consumed token is remembered as "used"; presenting it again means it leaked,
+# so its whole family (every token descended from the same login) is revoked.
+
+class _DatabaseRefreshTokenStore:
+    """
+    Store for deployments without Redis, in the aux DB: shared by all workers (a refresh may land
+    on any of them) and kept across restarts. Expired rows are removed by purge_expired().
+    """
+
+    async def put(self, digest: str, record: RefreshTokenRecord) -> None:
+        async with AuxSessionLocal() as aux_db:
+            await refresh_token_crud.create_refresh_token(aux_db, digest, **asdict(record))
+
+    async def consume(self, digest: str) -> RefreshTokenRecord | None:
+        async with AuxSessionLocal() as aux_db:
+            # Atomic, and leaves the row marked used: concurrent refreshes can't both win
+            row = await refresh_token_crud.consume_refresh_token(aux_db, digest)
+        if row is None:
+            return None
+        return RefreshTokenRecord(
+            user_id=row.user_id, username=row.username, generation=row.generation, family_id=row.family_id, expires_at=row.expires_at
+        )
+
+    async def get_used_family(self, digest: str) -> str | None:
+        async with AuxSessionLocal() as aux_db:
+            return await refresh_token_crud.get_used_family(aux_db, digest)
+
+    async def revoke_family(self, family_id: str) -> None:
+        async with AuxSessionLocal() as aux_db:
+            await refresh_token_crud.revoke_family(aux_db, family_id, time.time() + _ttl_seconds())
+
+    async def is_family_revoked(self, family_id: str) -> bool:
+        async with AuxSessionLocal() as aux_db:
+            return await refresh_token_crud.is_family_revoked(aux_db, family_id)
+
+    def stats(self) -> dict:
+        return {"backend": "aux_db"}
+
+class _RedisRefreshTokenStore:
+    """Shared store; every key carries the refresh-token lifetime as its Redis TTL."""
+
+    def __init__(self, redis_client):
+        self._redis = redis_client
+
+    async def put(self, digest: str, record: RefreshTokenRecord) -> None:
+        await self._redis.set(f"acweb:refresh:{digest}", json.dumps(asdict(record)), ex=_ttl_seconds())
+
+    async def consume(self, digest: str) -> RefreshTokenRecord | None:
+        # Deleting the token and writing its used marker is one transaction (WATCH/MULTI), so a
+        # concurrent replay either loses the race and finds the marker, or wins it: it is never
+        # mistaken for an unknown token.
+        key = f"acweb:refresh:{digest}"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    raw = await pipe.get(key)
+                    if raw is None:
+                        return None
+                    record = RefreshTokenRecord(**json.loads(raw))
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.set(f"acweb:refresh-used:{digest}", record.family_id, ex=_ttl_seconds())
+                    await pipe.execute()
+                    return record
+                except redis.WatchError:
+                    continue # Consumed concurrently: look again
+
+    async def get_used_family(self, digest: str) -> str | None:
+        family_id = await self._redis.get(f"acweb:refresh-used:{digest}")
+        return family_id.decode("utf-8") if isinstance(family_id, bytes) else family_id
+
+    async def revoke_family(self, family_id: str) -> None:
+        await self._redis.set(f"acweb:refresh-revoked-family:{family_id}", 1, ex=_ttl_seconds())
+
+    async def is_family_revoked(self, family_id: str) -> bool:
+        return bool(await self._redis.exists(f"acweb:refresh-revoked-family:{family_id}"))
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+_database_store = _DatabaseRefreshTokenStore()
+
+def _get_store():
+    redis_client = get_async_redis()
+    return _RedisRefreshTokenStore(redis_client) if redis_client is not None else _database_store
+
+# --- Public API ---
+
+async def issue_refresh_token(user_id: int, username: str, generation: int, family_id: str | None = None) -> str:
+    """Creates a refresh token for a login (new family) or a rotation (existing family)."""
+    token = secrets.token_urlsafe(32)
+    record = RefreshTokenRecord(
+        user_id=user_id,
+        username=username,
+        generation=generation,
+        family_id=family_id or secrets.token_hex(8),
+        expires_at=time.time() + _ttl_seconds(),
+    )
+    await _get_store().put(_digest(token), record)
+    return token
+
+async def rotate_refresh_token(token: str) -> tuple[RefreshTokenRecord, str]:
+    """
+    Consumes a refresh token and returns its record together with its replacement.
+    Raises RefreshTokenError if the token is invalid, reused or revoked.
+    """
+    store = _get_store()
+    digest = _digest(token)
+    record = await store.consume(digest)
+    if record is None:
+        reused_family = await store.get_used_family(digest)
+        if reused_family is not None:
+            # A rotated-out token came back: either the client or an attacker holds a stolen copy.
+            await store.revoke_family(reused_family)
+            logger.warning(f"Refresh token reuse detected; revoked token family {reused_family}.")
+        raise RefreshTokenError("Invalid or expired refresh token.")
+
+    if record.expires_at <= time.time():
+        raise RefreshTokenError("Invalid or expired refresh token.")
+    if await store.is_family_revoked(record.family_id):
+        raise RefreshTokenError("Refresh token has been revoked.")
+    if record.generation < await token_revocation.get_generation(record.user_id):
+        # Banned or password changed since this login
+        raise RefreshTokenError("Refresh token has been revoked.")
+
+    new_token = await issue_refresh_token(record.user_id, record.username, record.generation, record.family_id)
+    return record, new_token
+
+async def purge_expired() -> None:
+    """Background task body: removes expired refresh tokens from the aux DB (no-op with Redis, where keys expire)."""
+    if isinstance(_get_store(), _DatabaseRefreshTokenStore):
+        async with AuxSessionLocal() as aux_db:
+            purged = await refresh_token_crud.purge_expired(aux_db)
+        if purged:
+            logger.info(f"Purged {purged} expired refresh token(s).")
+
+def get_stats() -> dict:
+    return _get_store().stats()
@@ -0,0 +1,38 @@
+"""
+SRP6 verifiers as stored by current AzerothCore (account.salt / account.verifier).
+
+    x = SHA1(salt || SHA1(UPPER(username) ":" UPPER(password))), read little-endian
+    verifier = g^x mod N, stored as 32 little-endian bytes
+
+The modular exponentiation is CPU-bound; async callers should run these functions
+through core.process_pool.run_cpu_bound(). Kept free of app imports so that pool
+workers can import this module cheaply.
+"""
+import hashlib
+import hmac
+import os
+
+N = int("894B645E89E1535BBDAD5B8B290650530801B18EBFBF5E8FAB3C82872A3E9BB7", 16)
+G = 7
+SALT_LENGTH = 32
+VERIFIER_LENGTH = 32
+
+def calculate_verifier(username: str, password: str, salt: bytes) -> bytes:
+    credentials_hash = hashlib.sha1(f"{username.upper()}:{password.upper()}".encode("utf-8")).digest()
+    return calculate_verifier_from_hash(credentials_hash, salt)
+
+def calculate_verifier_from_hash(credentials_hash: bytes, salt: bytes) -> bytes:
+    """
+    The verifier only depends on SHA1(UPPER(username) ":" UPPER(password)), i.e. the raw
+    legacy sha_pass_hash, so legacy accounts can be converted without their passwords.
+    """
+    x = int.from_bytes(hashlib.sha1(salt + credentials_hash).digest(), "little")
+    return pow(G, x, N).to_bytes(VERIFIER_LENGTH, "little")
+
+def make_registration_data(username: str, password: str) -> tuple[bytes, bytes]:
+    """Returns a fresh random (salt, verifier) pair for the credentials."""
+    salt = os.urandom(SALT_LENGTH)
+    return salt, calculate_verifier(username, password, salt)
+
+def verify_password(username: str, password: str, salt: bytes, verifier: bytes) -> bool:
+    return hmac.compare_digest(calculate_verifier(username, password, salt), verifier)
@@ -0,0 +1,85 @@
+import logging
+
+from backend.app.core.cache import register_invalidation_handler, publish_invalidation, publish_invalidations
+from backend.app.core.database import AuxSessionLocal
+from backend.app.core.redis_client import get_async_redis
+from backend.app.crud import token_generation as token_generation_crud
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "token_generation"
+
+# user_id -> current token generation. Only accounts whose tokens were ever revoked
+# have an entry (everyone else is at generation 0), so this stays small.
+# With Redis, bumps reach every worker instantly and checking a token is a single dict lookup.
+_generations: dict[int, int] = {}
+
+def current_generation(user_id: int) -> int:
+    """The generation as last seen by this worker."""
+    return _generations.get(user_id, 0)
+
+def is_token_current(user_id: int, token_generation: int) -> bool:
+    """False if the token was minted before the account's last revocation seen by this worker."""
+    return token_generation >= _generations.get(user_id, 0)
+
+async def get_generation(user_id: int) -> int:
+    """
+    The account's current generation, to check tokens against and embed in new ones. Without Redis,
+    a bump on another worker only arrives with the next load_generations(), so the stored value is
+    read from the aux DB (one primary-key lookup): bans and password changes apply immediately.
+    """
+    if get_async_redis() is None:
+        async with AuxSessionLocal() as aux_db:
+            _set_generation(user_id, await token_generation_crud.get_generation(aux_db, user_id))
+    return _generations.get(user_id, 0)
+
+def _apply_remote_bump(key: str) -> None:
+    # Published as "<user_id>:<generation>" by the worker that performed the bump.
+    user_id, _, generation = key.partition(":")
+    if user_id.isdigit() and generation.isdigit():
+        _set_generation(int(user_id), int(generation))
+
+def _set_generation(user_id: int, generation: int) -> None:
+    # Generations only move forward, whatever order updates arrive in.
+    if generation > _generations.get(user_id, 0):
+        _generations[user_id] = generation
+
+register_invalidation_handler(NAMESPACE, _apply_remote_bump)
+
+async def revoke_all_tokens(user_id: int) -> int:
+    """
+    Bumps the account's token generation, invalidating every outstanding access
+    token. The new generation is persisted in the aux DB, applied locally and
+    broadcast to the other workers (via Redis, if configured).
+    """
+    async with AuxSessionLocal() as aux_db:
+        generation = await token_generation_crud.increment_generation(aux_db, user_id)
+    _set_generation(user_id, generation)
+    await publish_invalidation(NAMESPACE, f"{user_id}:{generation}")
+    logger.info(f"Revoked all tokens of user ID {user_id} (token generation is now {generation}).")
+    return generation
+
+async def revoke_all_tokens_bulk(user_ids: list[int]) -> dict[int, int]:
+    """revoke_all_tokens() for many accounts: one aux-DB transaction and one Redis round trip."""
+    if not user_ids:
+        return {}
+    async with AuxSessionLocal() as aux_db:
+        generations = await token_generation_crud.increment_generations(aux_db, user_ids)
+    for user_id, generation in generations.items():
+        _set_generation(user_id, generation)
+    await publish_invalidations(NAMESPACE, [f"{user_id}:{generation}" for user_id, generation in generations.items()])
+    logger.info(f"Revoked all tokens of {len(generations)} account(s).")
+    return generations
+
+async def load_generations() -> None:
+    """
+    (Re)loads all generations from the aux DB. Run at startup and periodically, which
+    also catches up on bumps whose Redis message was missed while disconnected.
+    """
+    async with AuxSessionLocal() as aux_db:
+        stored = await token_generation_crud.get_all_generations(aux_db)
+    for user_id, generation in stored.items():
+        _set_generation(user_id, generation)
+
+def get_stats() -> dict:
+    return {"accounts_with_revocations": len(_generations)}
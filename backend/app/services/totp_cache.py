@@ -0,0 +1,54 @@
+import logging
+from dataclasses import dataclass, field
+
+import pyotp
+
+from backend.app.core.cache import TwoTierCache, MISSING, publish_invalidation
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "totp_state"
+
+@dataclass
+class TOTPState:
+    """A user's 2FA settings, with a ready-to-use verifier for their secret."""
+    secret_key: str
+    is_active: bool
+    verifier: pyotp.TOTP = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.verifier = pyotp.TOTP(self.secret_key)
+
+    def verify(self, code: str) -> bool:
+        return self.verifier.verify(code)
+
+# Keyed by user id. None is cached too: most accounts never enable 2FA, and for them a login
+# then needs no aux-DB query at all. Kept in-process only, so TOTP secrets are never copied
+# into Redis; invalidations still reach every worker over the Redis channel when configured.
+_cache = TwoTierCache(
+    namespace=NAMESPACE,
+    maxsize=settings.TOTP_STATE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.TOTP_STATE_CACHE_TTL_SECONDS,
+    serialize=str, # Unused: no Redis tier
+    deserialize=str,
+    use_redis=False,
+)
+
+def get_totp_state(user_id: int):
+    """Returns the cached TOTPState or None (no 2FA), or MISSING if the user isn't cached."""
+    return _cache.local.get(user_id)
+
+def cache_totp_state(user_id: int, state: TOTPState | None) -> None:
+    """Caches state loaded from the aux DB, unless it changed while it was being loaded."""
+    if not _cache.was_recently_invalidated(user_id):
+        _cache.local.set(user_id, state)
+
+async def invalidate_totp_state(user_id: int) -> None:
+    """Drops a user's 2FA state on every worker; call after any write to their user_totp row."""
+    _cache.drop_local(user_id)
+    await publish_invalidation(NAMESPACE, user_id)
+    logger.debug(f"2FA state cache invalidated for user ID {user_id}")
+
+def get_stats() -> dict:
+    return _cache.local.stats()
@@ -3,6 +3,7 @@ import qrcode
 import qrcode.image.pil
 import io
 import base64
+from urllib.parse import quote
 
 def generate_totp_secret() -> str:
     """Generates a new base32 TOTP secret."""
@@ -29,3 +30,56 @@ def generate_qr_code_data_uri(otp_uri: str) -> str:
     img.save(buffered, format="PNG")
     img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
     return f"data:image/png;base64,{img_str}"
+
+# QR rendering is CPU-bound: most of it is qrcode's mask selection, which lays out the symbol with
+# all 8 mask patterns. render_qr_code_data_uri() is top-level so it can run in the CPU process pool.
+
+QR_BORDER_MODULES = 4
+QR_MODULE_PIXELS = 10 # Intrinsic SVG size, matching qrcode's default PNG box size
+
+def _qr_matrix(otp_uri: str) -> list[list[bool]]:
+    qr = qrcode.QRCode(border=QR_BORDER_MODULES)
+    qr.add_data(otp_uri)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+def generate_qr_code_svg(otp_uri: str) -> str:
+    """
+    Renders the QR code as a compact SVG: one stroked path with a horizontal segment per run of dark
+    modules. Skips PIL drawing and PNG compression, and scales to any size.
+    """
+    matrix = _qr_matrix(otp_uri)
+    segments = []
+    for y, row in enumerate(matrix):
+        x = last_end = 0
+        width = len(row)
+        while x < width:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < width and row[x]:
+                x += 1
+            if last_end == 0:
+                segments.append(f"M{start} {y}.5") # First run of the row: absolute move to its centre line
+            else:
+                segments.append(f"m{start - last_end} 0")
+            segments.append(f"h{x - start}")
+            last_end = x
+    size = len(matrix)
+    # Single-quoted attributes: they need no percent-encoding in a data URI.
+    return (
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{size * QR_MODULE_PIXELS}' height='{size * QR_MODULE_PIXELS}' "
+        f"viewBox='0 0 {size} {size}' shape-rendering='crispEdges'>"
+        f"<rect width='{size}' height='{size}' fill='white'/><path stroke='black' d='{''.join(segments)}'/></svg>"
+    )
+
+def generate_qr_code_svg_data_uri(otp_uri: str) -> str:
+    """The SVG QR code as a data URI (percent-encoded rather than base64, so it stays gzip-friendly)."""
+    return "data:image/svg+xml;utf8," + quote(generate_qr_code_svg(otp_uri), safe="='.:/;,")
+
+def render_qr_code_data_uri(otp_uri: str, image_format: str = "svg") -> str:
+    """QR code data URI in the given format ("svg" or "png")."""
+    if image_format == "png":
+        return generate_qr_code_data_uri(otp_uri)
+    return generate_qr_code_svg_data_uri(otp_uri)
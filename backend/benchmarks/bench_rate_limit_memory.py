@@ -0,0 +1,56 @@
+"""
+Benchmark: memory of the in-process rate limit storage under a scan from many addresses.
+
+Sends hits from distinct client addresses to limits' memory:// storage (moving window, used
+before) and to bounded-memory:// (sliding window counter with a memory cap), and reports the
+memory actually allocated (tracemalloc), the bytes the bounded storage reports, and the time
+per check.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_rate_limit_memory [addresses] [hits_per_address] [max_bytes]
+"""
+import sys
+import time
+import tracemalloc
+
+from limits import parse
+from limits.storage import MemoryStorage
+from limits.strategies import MovingWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+from backend.app.core.rate_limit_storage import BoundedMemoryStorage
+
+LIMIT = parse("100/minute")
+
+def _address(i: int) -> str:
+    return f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+
+def bench(label: str, limiter, addresses: int, hits_per_address: int) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(addresses):
+        for _ in range(hits_per_address):
+            limiter.hit(LIMIT, _address(i), "backend.app.api.endpoints.auth.login")
+    elapsed = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    storage = limiter.storage
+    reported = f"{storage.bytes_used / 1e6:9.2f} MB" if isinstance(storage, BoundedMemoryStorage) else f"{'-':>12}"
+    keys = len(storage._entries) if isinstance(storage, BoundedMemoryStorage) else len(storage.events)
+    print(f"{label:<34} {keys:9d} {allocated / 1e6:9.2f} MB {reported} {elapsed / (addresses * hits_per_address) * 1e6:9.2f}")
+
+def main(addresses: int, hits_per_address: int, max_bytes: int) -> None:
+    print(f"Addresses: {addresses}, hits per address: {hits_per_address}, limit: {LIMIT}")
+    print(f"{'storage':<34} {'keys':>9} {'allocated':>12} {'reported':>12} {'us/check':>9}")
+    memory = MemoryStorage()
+    try:
+        bench("memory:// (moving window)", MovingWindowRateLimiter(memory), addresses, hits_per_address)
+    finally:
+        memory.timer.cancel()
+    bench("bounded-memory:// (no cap)", SlidingWindowCounterRateLimiter(BoundedMemoryStorage(max_bytes=10**12)), addresses, hits_per_address)
+    bench(f"bounded-memory:// ({max_bytes / 1e6:g} MB cap)", SlidingWindowCounterRateLimiter(BoundedMemoryStorage(max_bytes=max_bytes)), addresses, hits_per_address)
+
+if __name__ == "__main__":
+    addresses = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    hits_per_address = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    max_bytes = int(sys.argv[3]) if len(sys.argv) > 3 else 16_000_000
+    main(addresses, hits_per_address, max_bytes)
@@ -0,0 +1,98 @@
+"""
+Benchmark: Redis traffic of the rate limiter, direct moving window vs two-tier.
+
+Simulates several worker processes sharing one Redis (one limiter storage each) and reports
+Redis round trips and commands per request, the time per rate limit check, and how far a tight
+limit is overshot when all workers hit it at once.
+
+Uses the Redis at REDIS_HOST:REDIS_PORT if configured, else an in-process fakeredis server (op
+counts are the same; timings then exclude the network). Run from the repository root:
+    python -m backend.benchmarks.bench_rate_limiter [requests] [workers] [max_pending]
+"""
+import sys
+import time
+
+import redis
+from redis.connection import AbstractConnection
+from limits import parse
+from limits.storage import RedisStorage
+from limits.strategies import MovingWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+from backend.app.core.config import settings
+from backend.app.core.rate_limit_storage import TwoTierRedisStorage
+
+CLIENTS = 50 # Distinct client addresses
+_ops = {"round_trips": 0, "commands": 0}
+
+def _count_ops() -> None:
+    send_packed_command, send_command, pack_commands = (
+        AbstractConnection.send_packed_command, AbstractConnection.send_command, AbstractConnection.pack_commands
+    )
+    def counting_send_packed_command(self, *args, **kwargs):
+        _ops["round_trips"] += 1 # A single command or a whole pipeline
+        return send_packed_command(self, *args, **kwargs)
+    def counting_send_command(self, *args, **kwargs):
+        _ops["commands"] += 1
+        return send_command(self, *args, **kwargs)
+    def counting_pack_commands(self, commands):
+        commands = list(commands)
+        _ops["commands"] += len(commands)
+        return pack_commands(self, commands)
+    AbstractConnection.send_packed_command = counting_send_packed_command
+    AbstractConnection.send_command = counting_send_command
+    AbstractConnection.pack_commands = counting_pack_commands
+
+def _connection_pool() -> redis.ConnectionPool:
+    if settings.REDIS_HOST:
+        return redis.ConnectionPool(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    import fakeredis
+    if not hasattr(_connection_pool, "server"):
+        _connection_pool.server = fakeredis.FakeServer()
+    return redis.ConnectionPool(connection_class=fakeredis.FakeRedisConnection, server=_connection_pool.server)
+
+def _limiters(mode: str, workers: int, max_pending: int) -> list:
+    if mode == "direct":
+        return [MovingWindowRateLimiter(RedisStorage("redis://", connection_pool=_connection_pool())) for _ in range(workers)]
+    storages = [TwoTierRedisStorage("twotier+redis://", max_pending=max_pending, connection_pool=_connection_pool()) for _ in range(workers)]
+    return [SlidingWindowCounterRateLimiter(storage) for storage in storages]
+
+def _flush(limiters: list) -> None:
+    for limiter in limiters:
+        if isinstance(limiter.storage, TwoTierRedisStorage):
+            limiter.storage.sync() # What the periodic sync would send
+
+def bench_traffic(mode: str, requests: int, workers: int, max_pending: int) -> None:
+    limiters = _limiters(mode, workers, max_pending)
+    item = parse(f"{requests}/hour") # Never reached: measures the cost of admitted requests
+    limiters[0].hit(item, "warm-up")
+    _ops.update(round_trips=0, commands=0)
+    start = time.perf_counter()
+    for i in range(requests):
+        limiters[i % workers].hit(item, f"10.0.{i % CLIENTS // 256}.{i % CLIENTS % 256}")
+    elapsed = time.perf_counter() - start
+    _flush(limiters)
+    print(f"{mode:<10} {_ops['round_trips'] / requests:12.3f} {_ops['commands'] / requests:14.3f} {elapsed / requests * 1e6:12.1f}")
+
+def bench_overshoot(mode: str, limit: int, workers: int, max_pending: int) -> None:
+    limiters = _limiters(mode, workers, max_pending)
+    item = parse(f"{limit}/hour")
+    client = f"overshoot-{mode}-{time.time()}"
+    admitted = sum(limiters[i % workers].hit(item, client) for i in range(limit * 4))
+    print(f"{mode:<10} limit {limit}: {admitted} admitted (bound {limit if mode == 'direct' else limit + workers * max_pending})")
+
+def main(requests: int, workers: int, max_pending: int) -> None:
+    _count_ops()
+    print(f"Redis: {f'{settings.REDIS_HOST}:{settings.REDIS_PORT}' if settings.REDIS_HOST else 'fakeredis (in-process)'}, "
+          f"requests: {requests}, workers: {workers}, clients: {CLIENTS}, max pending: {max_pending}")
+    print(f"{'mode':<10} {'round trips':>12} {'commands':>14} {'us/check':>12}   (per request)")
+    for mode in ("direct", "two-tier"):
+        bench_traffic(mode, requests, workers, max_pending)
+    print()
+    for mode in ("direct", "two-tier"):
+        bench_overshoot(mode, 100, workers, max_pending)
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    max_pending = int(sys.argv[3]) if len(sys.argv) > 3 else settings.RATE_LIMIT_SYNC_MAX_PENDING
+    main(requests, workers, max_pending)
@@ -0,0 +1,69 @@
+"""
+Benchmark: password-verification throughput at login, legacy SHA1 vs SRP6.
+
+Reports logins per second for concurrent verifications, per worker core, and the
+longest event-loop stall seen meanwhile (what every other request on the worker
+waits). SRP6 is timed inline on the event loop and through the CPU process pool.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_srp6_login [logins] [pool_workers]
+"""
+import asyncio
+import os
+import sys
+import time
+
+from backend.app.core import process_pool
+from backend.app.core.config import settings
+from backend.app.services import auth as auth_service
+from backend.app.services import srp6
+
+class _Account:
+    def __init__(self, username: str, password: str, with_srp6: bool):
+        self.username = username.upper()
+        self.sha_pass_hash = auth_service.get_ac_password_hash(password, username)
+        self.salt, self.verifier = srp6.make_registration_data(username, password) if with_srp6 else (None, None)
+
+async def _max_loop_stall_ms(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0)
+        worst = max(worst, (time.perf_counter() - start) * 1000)
+    return worst
+
+async def run(label: str, account: _Account, logins: int, cores: int) -> None:
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_max_loop_stall_ms(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(auth_service.verify_account_password(account, "benchpass") for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    stall_ms = await monitor
+    assert all(results)
+    rate = logins / elapsed
+    print(f"{label:<32} {rate:10.0f} logins/s {rate / cores:10.0f} logins/s/core   max loop stall {stall_ms:8.2f} ms")
+
+async def main(logins: int, pool_workers: int) -> None:
+    print(f"Logins: {logins}, CPUs: {os.cpu_count()}")
+    legacy = _Account("benchuser", "benchpass", with_srp6=False)
+    modern = _Account("benchuser", "benchpass", with_srp6=True)
+
+    settings.CPU_POOL_WORKERS = 0
+    settings.SRP6_ENABLED = False
+    await run("legacy SHA1, inline", legacy, logins, 1)
+    settings.SRP6_ENABLED = True
+    await run("SRP6, inline", modern, logins, 1)
+
+    settings.CPU_POOL_WORKERS = pool_workers
+    await process_pool.run_cpu_bound(srp6.calculate_verifier, "warm", "up", bytes(32)) # Spawn the workers
+    try:
+        await run(f"SRP6, process pool ({pool_workers})", modern, logins, pool_workers)
+    finally:
+        process_pool.shutdown_process_pool()
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    pool_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    asyncio.run(main(logins, pool_workers))
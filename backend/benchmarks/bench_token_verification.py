@@ -0,0 +1,81 @@
+"""
+Microbenchmark: per-request authentication cost with and without the verified-token cache.
+
+Measures get_current_active_user() for a steady-state request, i.e. the principal is
+already cached, so the remaining cost is JWT verification plus the cache lookups. Without
+REDIS_HOST it also includes reading the account's token generation from the aux DB.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_token_verification [iterations]
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import StaticPool
+
+from backend.app.api.endpoints import auth as _auth_router # Loads the router before dependencies (circular import)
+from backend.app.api.dependencies import get_current_active_user
+from backend.app.core.cache import TTLCache
+from backend.app.core.database import AuxBase
+from backend.app import models # Registers the aux tables
+from backend.app.models.user import Principal
+from backend.app.services import auth as auth_service
+from backend.app.services import principal_cache
+from backend.app.services import token_revocation
+
+def bench(label: str, iterations: int, func) -> float:
+    func() # Warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    per_call_us = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<45} {per_call_us:10.2f} us/op")
+    return per_call_us
+
+async def main(iterations: int):
+    # Token generations live in the aux DB (read on every request without Redis); an in-memory
+    # one keeps the benchmark away from app_data.sqlite.
+    aux_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with aux_engine.begin() as conn:
+        await conn.run_sync(AuxBase.metadata.create_all)
+    token_revocation.AuxSessionLocal = async_sessionmaker(bind=aux_engine, class_=AsyncSession, expire_on_commit=False)
+
+    # Tokens carry the account id and token generation, which get_current_active_user checks.
+    generation = await token_revocation.revoke_all_tokens(1)
+    token = auth_service.create_access_token(data={"sub": "BENCHUSER", "uid": 1, "gen": generation})
+    # Warm the principal cache so no DB session is needed (db=None is never touched on a hit).
+    await principal_cache._cache.set("BENCHUSER", Principal(
+        id=1, username="BENCHUSER", email="bench@example.com", gmlevel=0, locked=False, email_verified=True,
+        token_generation=generation,
+    ))
+
+    async def one_request():
+        return await get_current_active_user(token=token, db=None)
+
+    async def run_requests():
+        for _ in range(iterations):
+            await one_request()
+
+    print(f"Iterations: {iterations}")
+    results = {}
+    for label, cache in (
+        ("verify_token, cache disabled (before)", TTLCache(maxsize=0, ttl_seconds=0)),
+        ("verify_token, cache enabled (after)", TTLCache(maxsize=1000, ttl_seconds=0)),
+    ):
+        auth_service._verified_tokens = cache
+        results[label] = bench(label, iterations, lambda: auth_service.verify_token(token, Exception()))
+
+        await one_request() # Warm-up
+        start = time.perf_counter()
+        await run_requests()
+        per_request_us = (time.perf_counter() - start) / iterations * 1e6
+        print(f"{'  get_current_active_user, same cache':<45} {per_request_us:10.2f} us/op")
+
+    before, after = results.values()
+    print(f"verify_token speed-up: {before / after:.1f}x")
+    await aux_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
@@ -0,0 +1,76 @@
+"""
+Benchmark: 2FA setup QR codes, PNG vs SVG.
+
+Reports render time per QR code and the payload size of its data URI (raw and gzipped, as
+sent with HTTP compression), then the longest event-loop stall while a burst of setups
+renders inline on the event loop versus in the CPU process pool.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_totp_qr [renders] [pool_workers]
+"""
+import asyncio
+import gzip
+import os
+import sys
+import time
+
+from backend.app.core import process_pool
+from backend.app.core.config import settings
+from backend.app.services import totp_service
+
+FORMATS = ("png", "svg")
+
+def _otp_uri(i: int) -> str:
+    return totp_service.get_totp_uri(totp_service.generate_totp_secret(), f"BENCHUSER{i:06d}", issuer_name=settings.APP_NAME)
+
+def bench_render(renders: int) -> None:
+    print(f"{'format':<8} {'ms/render':>10} {'data URI bytes':>15} {'gzipped':>10}")
+    uris = [_otp_uri(i) for i in range(renders)]
+    for image_format in FORMATS:
+        totp_service.render_qr_code_data_uri(uris[0], image_format) # Warm-up (imports, PIL plugins)
+        start = time.perf_counter()
+        for uri in uris:
+            data_uri = totp_service.render_qr_code_data_uri(uri, image_format)
+        per_render_ms = (time.perf_counter() - start) * 1000 / renders
+        size = len(data_uri.encode("utf-8"))
+        print(f"{image_format:<8} {per_render_ms:10.2f} {size:15d} {len(gzip.compress(data_uri.encode('utf-8'))):10d}")
+
+async def _max_loop_stall_ms(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0)
+        worst = max(worst, (time.perf_counter() - start) * 1000)
+    return worst
+
+async def run_burst(label: str, image_format: str, renders: int) -> None:
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_max_loop_stall_ms(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        process_pool.run_cpu_bound(totp_service.render_qr_code_data_uri, _otp_uri(i), image_format) for i in range(renders)
+    ))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    stall_ms = await monitor
+    print(f"{label:<28} {renders / elapsed:8.0f} setups/s   max loop stall {stall_ms:8.2f} ms")
+
+async def main(renders: int, pool_workers: int) -> None:
+    print(f"Renders: {renders}, CPUs: {os.cpu_count()}")
+    bench_render(renders)
+    print()
+    for image_format in FORMATS:
+        settings.CPU_POOL_WORKERS = 0
+        await run_burst(f"{image_format}, inline", image_format, renders)
+        settings.CPU_POOL_WORKERS = pool_workers
+        await process_pool.run_cpu_bound(totp_service.render_qr_code_data_uri, _otp_uri(0), image_format) # Spawn and warm the workers
+        try:
+            await run_burst(f"{image_format}, process pool ({pool_workers})", image_format, renders)
+        finally:
+            process_pool.shutdown_process_pool()
+
+if __name__ == "__main__":
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    pool_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    asyncio.run(main(renders, pool_workers))
@@ -1,11 +1,51 @@
 # Pytest conftest.py for shared fixtures
-# Example:
-# import pytest
-# from backend.app.core.config import settings
-
-# @pytest.fixture(scope="session", autouse=True)
-# def override_settings_for_testing():
-#     # Override settings for testing if necessary
-#     # For example, to use a test database or disable external calls
-#     # settings.SOME_SETTING = "test_value"
-#     pass
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
+
+from backend.app.core.config import settings
+from backend.app.core.database import AuxBase
+from backend.app import models # Registers all aux tables on AuxBase.metadata
+from backend.app.services import token_revocation
+from backend.app.services import totp_cache
+from backend.app.services import email_outbox
+from backend.app.services import refresh_tokens
+from backend.app.crud import user as user_crud
+from backend.app.crud import captcha as captcha_crud
+
+@pytest.fixture(autouse=True)
+def isolated_aux_db(tmp_path, monkeypatch):
+    """
+    Points services that open their own aux-DB sessions at a throwaway SQLite file,
+    so tests never touch ./app_data.sqlite. NullPool: each test runs its own event loop.
+    """
+    db_path = tmp_path / "aux_test.sqlite"
+    sync_engine = create_engine(f"sqlite:///{db_path}")
+    AuxBase.metadata.create_all(sync_engine)
+    sync_engine.dispose()
+
+    aux_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    session_factory = async_sessionmaker(bind=aux_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(token_revocation, "AuxSessionLocal", session_factory)
+    monkeypatch.setattr(token_revocation, "_generations", {})
+    monkeypatch.setattr(email_outbox, "AuxSessionLocal", session_factory)
+    monkeypatch.setattr(refresh_tokens, "AuxSessionLocal", session_factory)
+    monkeypatch.setattr(captcha_crud, "AuxSessionLocal", session_factory)
+    yield session_factory
+
+@pytest.fixture(autouse=True)
+def inline_cpu_work(monkeypatch):
+    """Runs CPU-bound work (SRP6) inline; tests of the process pool opt back in."""
+    monkeypatch.setattr(settings, "CPU_POOL_WORKERS", 0)
+
+@pytest.fixture(autouse=True)
+def fresh_user_count_cache():
+    """Each test uses its own database, so cached account counts must not carry over."""
+    user_crud._user_count_cache.clear()
+
+@pytest.fixture(autouse=True)
+def fresh_totp_state_cache():
+    """User ids repeat across tests' databases, so cached 2FA state must not carry over."""
+    totp_cache._cache.local.clear()
+    totp_cache._cache._recently_invalidated.clear()
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from backend.app.core.cache import TTLCache, TwoTierCache, MISSING, _apply_invalidation
+
+def test_ttl_cache_hit_miss_and_expiry():
+    cache = TTLCache(maxsize=10, ttl_seconds=60)
+    assert cache.get("a") is MISSING
+    cache.set("a", None) # None is a legitimate cached value
+    assert cache.get("a") is None
+    cache.set("b", 1, expires_at=time.monotonic() - 1) # Already expired
+    assert cache.get("b") is MISSING
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a") # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_disabled_with_zero_maxsize():
+    cache = TTLCache(maxsize=0, ttl_seconds=60)
+    cache.set("a", 1)
+    assert cache.get("a") is MISSING
+
+@patch('backend.app.core.cache.get_async_redis', return_value=None)
+def test_two_tier_cache_local_only(mock_get_redis):
+    cache = TwoTierCache("test-local", maxsize=10, ttl_seconds=60, serialize=str, deserialize=str)
+
+    async def body():
+        assert await cache.get("k") is MISSING
+        await cache.set("k", "v")
+        assert await cache.get("k") == "v"
+        assert not cache.was_recently_invalidated("k")
+        await cache.invalidate("k")
+        assert await cache.get("k") is MISSING
+        assert cache.was_recently_invalidated("k")
+    asyncio.run(body())
+
+@patch('backend.app.core.cache.get_async_redis', return_value=None)
+def test_remote_invalidation_drops_local_entry(mock_get_redis):
+    cache = TwoTierCache("test-remote", maxsize=10, ttl_seconds=60, serialize=str, deserialize=str)
+
+    async def body():
+        await cache.set(42, "v")
+        _apply_invalidation("test-remote:42") # As received from another worker via pub/sub
+        assert await cache.get(42) is MISSING
+        assert cache.was_recently_invalidated(42)
+    asyncio.run(body())
@@ -0,0 +1,48 @@
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend.app.core.db_pool import InstrumentedAsyncQueuePool, get_pool_stats
+from backend.app.core.metrics import Histogram
+
+def test_histogram_buckets_and_summary():
+    histogram = Histogram(buckets_ms=(1, 10, 100))
+    for value in (0.5, 5, 5, 50, 500):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["max_ms"] == 500
+    assert snapshot["buckets"] == {"le_1": 1, "le_10": 2, "le_100": 1, "le_inf": 1}
+
+def test_instrumented_pool_records_checkouts(tmp_path):
+    async def body():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.sqlite'}",
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=2,
+            max_overflow=1,
+            pool_pre_ping=True,
+        )
+        try:
+            for _ in range(3):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            async with engine.connect():
+                during = get_pool_stats(engine)
+            after = get_pool_stats(engine)
+        finally:
+            await engine.dispose()
+        return during, after
+
+    during, after = asyncio.run(body())
+    assert during["checked_out"] == 1
+    assert after["checked_out"] == 0
+    assert after["pool_size"] == 2
+    assert after["max_overflow"] == 1
+    assert after["checkouts"] == 4
+    assert after["timeouts"] == 0
+    assert after["checkout_wait_ms"]["count"] == 4
+
+def test_get_pool_stats_without_engine():
+    assert get_pool_stats(None) is None
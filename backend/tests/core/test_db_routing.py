@@ -0,0 +1,54 @@
+import asyncio
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend.app.core.database import Base
+from backend.app.core.db_routing import make_routing_sessionmaker, use_primary
+from backend.app.models.account import Account
+from backend.app.models import user as user_schema
+from backend.app.crud import user as user_crud
+
+def run_with_primary_and_replica(tmp_path, test_body):
+    async def _runner():
+        primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.sqlite'}")
+        replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.sqlite'}")
+        for engine in (primary, replica):
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        # A row that only exists on the "replica" tells us where a read was served from.
+        async with replica.begin() as conn:
+            await conn.execute(insert(Account).values(id=100, username="REPLICAONLY", email="r@example.com", sha_pass_hash="x"))
+        try:
+            return await test_body(make_routing_sessionmaker(primary, [replica]))
+        finally:
+            await primary.dispose()
+            await replica.dispose()
+    return asyncio.run(_runner())
+
+def test_reads_go_to_replica(tmp_path):
+    async def body(session_factory):
+        async with session_factory() as db:
+            assert await user_crud.get_user_by_username(db, "REPLICAONLY") is not None
+    run_with_primary_and_replica(tmp_path, body)
+
+def test_writes_go_to_primary_and_session_becomes_sticky(tmp_path):
+    async def body(session_factory):
+        async with session_factory() as db:
+            created = await user_crud.create_user(db, user_schema.UserCreate(
+                username="newuser", email="new@example.com", password="secret123",
+                captcha_id="unused", captcha_solution="unused"
+            ))
+            # Read-your-writes: after the write, reads in the same session hit the primary.
+            assert (await user_crud.get_user_by_id(db, created.id)).username == "NEWUSER"
+            assert await user_crud.get_user_by_username(db, "REPLICAONLY") is None
+        async with session_factory() as db:
+            # A fresh session reads from the replica again, which hasn't "replicated" the new row.
+            assert await user_crud.get_user_by_username(db, "NEWUSER") is None
+    run_with_primary_and_replica(tmp_path, body)
+
+def test_use_primary_pins_reads(tmp_path):
+    async def body(session_factory):
+        async with session_factory() as db:
+            use_primary(db)
+            assert await user_crud.get_user_by_username(db, "REPLICAONLY") is None
+    run_with_primary_and_replica(tmp_path, body)
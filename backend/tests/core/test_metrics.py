@@ -0,0 +1,24 @@
+from backend.app.core.metrics import StageTimer
+
+def test_stage_timer_accumulates_and_renders_server_timing():
+    timer = StageTimer()
+    with timer.stage("lookup"):
+        pass
+    with timer.stage("lookup"): # Repeated stages add up
+        pass
+    with timer.stage("token_mint"):
+        pass
+
+    assert list(timer.durations_ms) == ["lookup", "token_mint"]
+    header = timer.server_timing()
+    assert header.startswith("lookup;dur=")
+    assert ", token_mint;dur=" in header
+
+def test_stage_timer_records_failed_stages():
+    timer = StageTimer()
+    try:
+        with timer.stage("hash_verify"):
+            raise ValueError
+    except ValueError:
+        pass
+    assert "hash_verify" in timer.durations_ms
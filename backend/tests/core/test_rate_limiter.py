@@ -104,3 +104,100 @@ def test_get_storage_uri_rate_limit_disabled_with_redis(mock_settings_obj, mock_
     uri = get_storage_uri()
     # get_storage_uri prioritizes Redis if configured and working, regardless of RATE_LIMIT_ENABLED
     assert uri == f"redis://{mock_settings_with_redis_success.REDIS_HOST}:{mock_settings_with_redis_success.REDIS_PORT}"
+
+
+def _two_tier_storages(count, max_pending):
+    fakeredis = pytest.importorskip("fakeredis")
+    import redis
+    from backend.app.core.rate_limit_storage import TwoTierRedisStorage
+    server = fakeredis.FakeServer()
+    # One storage per worker process, sharing one Redis
+    return [
+        TwoTierRedisStorage(
+            "twotier+redis://localhost:6379", max_pending=max_pending,
+            connection_pool=redis.ConnectionPool(connection_class=fakeredis.FakeRedisConnection, server=server),
+        )
+        for _ in range(count)
+    ]
+
+def test_two_tier_storage_bounds_the_overshoot_across_processes():
+    from limits import parse
+    from limits.strategies import SlidingWindowCounterRateLimiter
+    storages = _two_tier_storages(3, max_pending=4)
+    limiters = [SlidingWindowCounterRateLimiter(storage) for storage in storages]
+    item = parse("20/hour")
+
+    admitted = sum(limiters[i % 3].hit(item, "10.0.0.1") for i in range(300))
+    assert 20 <= admitted <= 20 + 3 * 4
+    for storage in storages:
+        storage.sync()
+    # Every process now sees the cluster-wide count and rejects
+    assert not any(limiter.hit(item, "10.0.0.1") for limiter in limiters)
+    assert all(storage.stats()["pending_hits"] == 0 for storage in storages)
+
+def test_two_tier_storage_batches_redis_round_trips():
+    from limits import parse
+    from limits.strategies import SlidingWindowCounterRateLimiter
+    storage, = _two_tier_storages(1, max_pending=10)
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    item = parse("1000/hour")
+    for _ in range(100):
+        assert limiter.hit(item, "10.0.0.2")
+    assert storage.stats()["syncs"] == 10 # One pipeline per 10 hits
+    assert limiter.get_window_stats(item, "10.0.0.2").remaining == 900
+    assert sum(int(storage._redis.get(key)) for key in storage._redis.scan_iter("acweb:ratelimit:*")) == 100
+
+def test_two_tier_storage_keeps_limiting_locally_while_redis_is_down(monkeypatch):
+    import redis
+    from limits import parse
+    from limits.strategies import SlidingWindowCounterRateLimiter
+    storage, = _two_tier_storages(1, max_pending=2)
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    def unreachable(*args, **kwargs):
+        raise redis.ConnectionError("down")
+    monkeypatch.setattr(storage._redis, "pipeline", unreachable)
+
+    admitted = sum(limiter.hit(parse("5/hour"), "10.0.0.3") for _ in range(10))
+    assert admitted == 5 # Enforced per process
+    assert storage.stats()["sync_errors"] == 1 # No inline retries while the outage lasts
+    assert storage.stats()["pending_hits"] == 5
+
+    monkeypatch.undo()
+    storage.sync()
+    assert storage.stats()["pending_hits"] == 0
+    assert not limiter.hit(parse("5/hour"), "10.0.0.3")
+
+def test_bounded_memory_storage_limits_and_evicts_least_recently_used():
+    from limits import parse
+    from limits.strategies import SlidingWindowCounterRateLimiter
+    from backend.app.core.rate_limit_storage import BoundedMemoryStorage
+    item = parse("3/hour")
+    entry_bytes = BoundedMemoryStorage._entry_bytes(item.key_for("10.0.0.1"))
+    storage = BoundedMemoryStorage(max_bytes=entry_bytes * 2)
+    limiter = SlidingWindowCounterRateLimiter(storage)
+
+    assert [limiter.hit(item, "10.0.0.1") for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit(item, "10.0.0.2")
+    assert not limiter.hit(item, "10.0.0.1") # Most recently used, so 10.0.0.2 goes first
+    assert limiter.hit(item, "10.0.0.3")
+    assert storage.stats() == {"keys": 2, "bytes_used": entry_bytes * 2, "max_bytes": entry_bytes * 2, "expired": 0, "evictions": 1}
+    assert limiter.get_window_stats(item, "10.0.0.2").remaining == 3
+
+def test_bounded_memory_storage_drops_idle_keys_before_evicting(monkeypatch):
+    from limits import parse
+    from limits.strategies import SlidingWindowCounterRateLimiter
+    from backend.app.core import rate_limit_storage
+    storage = rate_limit_storage.BoundedMemoryStorage(max_bytes=10**6)
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    item = parse("10/minute")
+    now = 60 * 28_000_000 + 3.0 # 3 s into a window
+    monkeypatch.setattr(rate_limit_storage.time, "time", lambda: now)
+    assert all(limiter.hit(item, "10.0.0.1") for _ in range(10))
+
+    now += 60 # The previous window's 10 hits still count for 95%
+    assert sum(limiter.hit(item, "10.0.0.1") for _ in range(5)) == 1
+    now += 120 # Both windows passed
+    limiter.hit(item, "10.0.0.2")
+    assert storage.stats()["keys"] == 1
+    assert storage.stats()["expired"] == 1
+    assert storage.stats()["bytes_used"] == storage._entry_bytes(item.key_for("10.0.0.2"))
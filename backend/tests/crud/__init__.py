@@ -0,0 +1 @@
+# This file makes the 'crud' subdirectory a Python package.
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from backend.app.core.config import settings
+from backend.app.crud import captcha as captcha_crud
+
+@pytest.mark.parametrize("store", ["database", "memory"])
+@patch('backend.app.crud.captcha.get_async_redis', return_value=None)
+def test_challenge_can_only_be_taken_once(mock_get_redis, store, monkeypatch):
+    monkeypatch.setattr(settings, "CAPTCHA_STORE", store)
+    monkeypatch.setattr(captcha_crud, "_memory_store", captcha_crud._MemoryCaptchaStore(maxsize=10))
+    async def body():
+        challenge = await captcha_crud.create_challenge("What is 2 + 3?", "5", expires_in_seconds=60)
+        taken = await captcha_crud.take_challenge(challenge.id)
+        assert (taken.question, taken.answer) == ("What is 2 + 3?", "5")
+        assert await captcha_crud.take_challenge(challenge.id) is None # Single use
+        assert await captcha_crud.take_challenge("unknown") is None
+
+        expired = await captcha_crud.create_challenge("What is 1 + 1?", "2", expires_in_seconds=-1)
+        assert await captcha_crud.take_challenge(expired.id) is None
+    asyncio.run(body())
+    assert captcha_crud.get_stats()["backend"] == {"database": "aux_db", "memory": "memory"}[store]
+
+@patch('backend.app.crud.captcha.get_async_redis', return_value=None)
+def test_without_redis_challenges_are_shared_by_workers(mock_get_redis, monkeypatch):
+    monkeypatch.setattr(settings, "CAPTCHA_STORE", "auto")
+    async def body():
+        challenge = await captcha_crud.create_challenge("What is 2 + 3?", "5", expires_in_seconds=60)
+        other_worker = captcha_crud._DatabaseCaptchaStore() # Only the aux DB is shared
+        assert (await other_worker.take(challenge.id)).answer == "5"
+
+        await captcha_crud.create_challenge("What is 1 + 1?", "2", expires_in_seconds=-1)
+        assert await captcha_crud.purge_expired() == 1
+    asyncio.run(body())
+
+@patch('backend.app.crud.captcha.get_async_redis', return_value=None)
+def test_memory_store_evicts_oldest_challenges(mock_get_redis, monkeypatch):
+    monkeypatch.setattr(settings, "CAPTCHA_STORE", "memory")
+    monkeypatch.setattr(captcha_crud, "_memory_store", captcha_crud._MemoryCaptchaStore(maxsize=2))
+    async def body():
+        ids = [(await captcha_crud.create_challenge(f"q{i}", str(i), expires_in_seconds=60)).id for i in range(3)]
+        assert await captcha_crud.take_challenge(ids[0]) is None
+        assert (await captcha_crud.take_challenge(ids[2])).answer == "2"
+    asyncio.run(body())
+    assert captcha_crud.get_stats()["evictions"] == 1
+
+def test_redis_store_requires_redis(monkeypatch):
+    monkeypatch.setattr(settings, "CAPTCHA_STORE", "redis")
+    with patch('backend.app.crud.captcha.get_async_redis', return_value=None):
+        with pytest.raises(RuntimeError):
+            captcha_crud._get_store()
@@ -0,0 +1,204 @@
+import asyncio
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from backend.app.core import database
+from backend.app.core.config import settings
+from backend.app.core.database import Base
+from backend.app.models import account # Registers the Account table on Base.metadata
+from backend.app.models import user as user_schema
+from backend.app.crud import user as user_crud
+from backend.app.services import auth as auth_service
+
+def run_with_session(test_body, metadata=Base.metadata):
+    """Runs an async test body against a fresh in-memory SQLite database."""
+    async def _runner():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        try:
+            async with session_factory() as db:
+                return await test_body(db)
+        finally:
+            await engine.dispose()
+    return asyncio.run(_runner())
+
+def make_user_create(username="testuser", email="test@example.com", password="secret123"):
+    return user_schema.UserCreate(
+        username=username,
+        email=email,
+        password=password,
+        captcha_id="unused",
+        captcha_solution="unused"
+    )
+
+def test_create_and_get_user():
+    async def body(db):
+        created = await user_crud.create_user(db, make_user_create())
+        assert created.id is not None
+        assert created.username == "TESTUSER" # Stored uppercase
+
+        assert (await user_crud.get_user_by_username(db, "TESTUSER")).id == created.id
+        assert (await user_crud.get_user_by_email(db, "test@example.com")).id == created.id
+        assert (await user_crud.get_user_by_id(db, created.id)).username == "TESTUSER"
+        assert await user_crud.get_user_by_username(db, "NOBODY") is None
+    run_with_session(body)
+
+def test_authenticate_user():
+    async def body(db):
+        await user_crud.create_user(db, make_user_create(password="hunter22"))
+        assert await user_crud.authenticate_user(db, "testuser", "hunter22") is not None
+        assert await user_crud.authenticate_user(db, "testuser", "wrong") is None
+        assert await user_crud.authenticate_user(db, "nobody", "hunter22") is None
+    run_with_session(body)
+
+def test_create_user_writes_srp6_verifier_and_legacy_hash(monkeypatch):
+    monkeypatch.setattr(settings, "SRP6_ENABLED", True)
+    monkeypatch.setattr(settings, "SRP6_KEEP_LEGACY_HASH", True)
+    async def body(db):
+        created = await user_crud.create_user(db, make_user_create(password="hunter22"))
+        assert len(created.salt) == 32 and len(created.verifier) == 32
+        assert created.sha_pass_hash != ""
+
+        created.sha_pass_hash = "" # Login must now go through the verifier
+        await db.commit()
+        assert await user_crud.authenticate_user(db, "testuser", "hunter22") is not None
+        assert await user_crud.authenticate_user(db, "testuser", "wrong") is None
+
+        old_verifier = created.verifier
+        await user_crud.update_user_password(db, created, "newpass1")
+        assert created.verifier != old_verifier
+        assert await user_crud.authenticate_user(db, "testuser", "newpass1") is not None
+    run_with_session(body)
+
+def test_legacy_only_accounts_still_authenticate(monkeypatch):
+    monkeypatch.setattr(settings, "SRP6_ENABLED", False)
+    async def body(db):
+        created = await user_crud.create_user(db, make_user_create(password="hunter22"))
+        assert created.salt is None and created.verifier is None
+        monkeypatch.setattr(settings, "SRP6_ENABLED", True) # Enabling SRP6 later must not lock these accounts out
+        assert await user_crud.authenticate_user(db, "testuser", "hunter22") is not None
+    run_with_session(body)
+
+def test_password_change_with_srp6_disabled_clears_old_verifier(monkeypatch):
+    monkeypatch.setattr(settings, "SRP6_ENABLED", True)
+    async def body(db):
+        created = await user_crud.create_user(db, make_user_create(password="hunter22"))
+        monkeypatch.setattr(settings, "SRP6_ENABLED", False)
+        await user_crud.update_user_password(db, created, "newpass1")
+        assert created.salt is None and created.verifier is None
+
+        monkeypatch.setattr(settings, "SRP6_ENABLED", True) # The old verifier must not come back to life
+        assert await user_crud.authenticate_user(db, "testuser", "hunter22") is None
+        assert await user_crud.authenticate_user(db, "testuser", "newpass1") is not None
+    run_with_session(body)
+
+def test_startup_check_requires_srp6_columns(monkeypatch):
+    legacy_metadata = MetaData()
+    Table("account", legacy_metadata, Column("id", Integer, primary_key=True), Column("sha_pass_hash", String(40)))
+    async def body(db):
+        monkeypatch.setattr(database, "engine", db.bind)
+        monkeypatch.setattr(settings, "SRP6_ENABLED", False) # Required even then: password changes clear them
+        with pytest.raises(RuntimeError):
+            await auth_service.check_srp6_columns()
+    run_with_session(body, metadata=legacy_metadata)
+
+    async def full_schema(db):
+        monkeypatch.setattr(database, "engine", db.bind)
+        await auth_service.check_srp6_columns()
+    run_with_session(full_schema)
+
+def test_ban_unban_and_verify_email():
+    async def body(db):
+        created = await user_crud.create_user(db, make_user_create())
+        banned = await user_crud.ban_account(db, created)
+        assert banned.locked is True
+        unbanned = await user_crud.unban_account(db, banned)
+        assert unbanned.locked is False
+
+        verified = await user_crud.mark_user_email_as_verified(db, created.id)
+        assert verified.email_verified is True
+        assert await user_crud.mark_user_email_as_verified(db, 9999) is None
+
+        all_users = await user_crud.get_all_users(db)
+        assert [u.id for u in all_users] == [created.id]
+    run_with_session(body)
+
+def test_list_users_page_keyset_pagination_and_filters():
+    async def body(db):
+        for i in range(5):
+            await user_crud.create_user(db, make_user_create(username=f"player_{i}", email=f"p{i}@example.com"))
+        await user_crud.create_user(db, make_user_create(username="playerx", email="x@example.com"))
+        banned = await user_crud.get_user_by_username(db, "PLAYER_3")
+        await user_crud.ban_account(db, banned)
+
+        first, cursor = await user_crud.list_users_page(db, limit=4)
+        assert [row["username"] for row in first] == ["PLAYER_0", "PLAYER_1", "PLAYER_2", "PLAYER_3"]
+        assert set(first[0]) == {"id", "username", "email", "email_verified", "locked", "gmlevel"}
+        second, cursor = await user_crud.list_users_page(db, limit=4, after_id=cursor)
+        assert [row["username"] for row in second] == ["PLAYER_4", "PLAYERX"]
+        assert cursor is None
+
+        # '_' is matched literally, so PLAYERX doesn't match the prefix "player_"
+        prefixed, _ = await user_crud.list_users_page(db, limit=10, username_prefix="player_")
+        assert len(prefixed) == 5
+        locked, _ = await user_crud.list_users_page(db, limit=10, locked=True)
+        assert [row["username"] for row in locked] == ["PLAYER_3"]
+
+        assert await user_crud.count_users(db) == 6
+        assert await user_crud.count_users(db, locked=False, email_prefix="p") == 4
+    run_with_session(body)
+
+def test_bulk_ban_applies_admin_rules_and_revokes_tokens():
+    from ipaddress import IPv4Network
+    from backend.app.services import token_revocation
+    async def body(db):
+        admin = await user_crud.create_user(db, make_user_create(username="admin", email="a@example.com"))
+        other_admin = await user_crud.create_user(db, make_user_create(username="gamemaster", email="gm@example.com"))
+        admin.gmlevel = other_admin.gmlevel = 3
+        bots = [await user_crud.create_user(db, make_user_create(username=f"bot{i}", email=f"bot{i}@example.com")) for i in range(3)]
+        for i, bot in enumerate(bots):
+            bot.last_ip = f"10.1.{i}.7"
+        bots[2].last_ip = "10.2.0.7" # Outside the subnet below
+        await db.commit()
+
+        accounts = await user_crud.find_accounts_for_bulk_action(
+            db, limit=10, user_ids=[admin.id, other_admin.id, bots[0].id, 9999]
+        )
+        outcomes = await user_crud.bulk_set_locked(db, accounts, locked=True, acting_admin_id=admin.id)
+        assert outcomes == {admin.id: "forbidden_self", other_admin.id: "forbidden_admin", bots[0].id: "banned"}
+        assert not token_revocation.is_token_current(bots[0].id, 0)
+
+        by_subnet = await user_crud.find_accounts_for_bulk_action(db, limit=10, last_ip_network=IPv4Network("10.1.0.0/20"))
+        assert sorted(row.id for row in by_subnet) == [bots[0].id, bots[1].id]
+        outcomes = await user_crud.bulk_set_locked(db, by_subnet, locked=True, acting_admin_id=admin.id)
+        assert outcomes == {bots[0].id: "unchanged", bots[1].id: "banned"}
+
+        admin_id, bot_ids = admin.id, [bot.id for bot in bots]
+        db.expire_all() # The bulk UPDATE bypasses the identity map
+        assert [(await user_crud.get_user_by_id(db, bot_id)).locked for bot_id in bot_ids] == [True, True, False]
+
+        assert len(await user_crud.find_accounts_for_bulk_action(db, limit=2, last_ip_network=IPv4Network("10.0.0.0/8"))) == 3 # limit + 1
+        by_subnet = await user_crud.find_accounts_for_bulk_action(db, limit=10, last_ip_network=IPv4Network("10.1.0.0/20"))
+        unbanned = await user_crud.bulk_set_locked(db, by_subnet, locked=False, acting_admin_id=admin_id)
+        assert set(unbanned.values()) == {"unbanned"}
+    run_with_session(body)
+
+def test_bulk_ban_only_reports_and_revokes_rows_it_changed():
+    from backend.app.services import token_revocation
+    async def body(db):
+        users = [await user_crud.create_user(db, make_user_create(username=f"stale{i}", email=f"stale{i}@example.com")) for i in range(3)]
+        accounts = await user_crud.find_accounts_for_bulk_action(db, limit=10, user_ids=[user.id for user in users])
+        # Changed after the accounts were read: one banned by someone else, one promoted
+        users[0].locked = 1
+        users[1].gmlevel = 3
+        await db.commit()
+
+        outcomes = await user_crud.bulk_set_locked(db, accounts, locked=True, acting_admin_id=0)
+        assert outcomes == {users[0].id: "unchanged", users[1].id: "forbidden_admin", users[2].id: "banned"}
+        assert token_revocation.is_token_current(users[0].id, 0)
+        assert token_revocation.is_token_current(users[1].id, 0)
+        assert not token_revocation.is_token_current(users[2].id, 0)
+    run_with_session(body)
@@ -0,0 +1,50 @@
+import asyncio
+
+import pyotp
+import pytest
+
+from backend.app.crud import user_totp as user_totp_crud
+from backend.app.services import totp_cache
+
+@pytest.fixture(autouse=True)
+def refill_right_after_writes(monkeypatch):
+    monkeypatch.setattr(totp_cache._cache._recently_invalidated, "ttl_seconds", 0)
+
+def test_totp_state_is_cached_including_no_2fa(isolated_aux_db, monkeypatch):
+    async def body():
+        queries = []
+        original = user_totp_crud.get_user_totp_secret
+        async def counting_get_user_totp_secret(db, user_id):
+            queries.append(user_id)
+            return await original(db, user_id)
+        monkeypatch.setattr(user_totp_crud, "get_user_totp_secret", counting_get_user_totp_secret)
+
+        async with isolated_aux_db() as aux_db:
+            assert await user_totp_crud.get_totp_state(aux_db, 1) is None
+            assert await user_totp_crud.get_totp_state(aux_db, 1) is None
+            assert queries == [1] # "No 2FA" was cached
+
+            secret = pyotp.random_base32()
+            await user_totp_crud.create_user_totp_secret(aux_db, 1, secret)
+            pending = await user_totp_crud.get_totp_state(aux_db, 1)
+            assert (pending.secret_key, pending.is_active) == (secret, False)
+
+            await user_totp_crud.activate_user_totp(aux_db, 1)
+            active = await user_totp_crud.get_totp_state(aux_db, 1)
+            assert active.is_active
+            assert active.verify(pyotp.TOTP(secret).now())
+            assert await user_totp_crud.get_totp_state(aux_db, 1) is active
+
+            await user_totp_crud.deactivate_user_totp(aux_db, 1)
+            assert not (await user_totp_crud.get_totp_state(aux_db, 1)).is_active
+            assert queries == [1, 1, 1, 1] # One reload after each write, none otherwise
+    asyncio.run(body())
+
+def test_state_loaded_during_a_write_is_not_cached(isolated_aux_db, monkeypatch):
+    monkeypatch.setattr(totp_cache._cache._recently_invalidated, "ttl_seconds", 30)
+    async def body():
+        async with isolated_aux_db() as aux_db:
+            await user_totp_crud.create_user_totp_secret(aux_db, 2, pyotp.random_base32())
+            await user_totp_crud.get_totp_state(aux_db, 2)
+        assert totp_cache.get_totp_state(2) is totp_cache.MISSING
+    asyncio.run(body())
@@ -0,0 +1,81 @@
+import multiprocessing
+
+from sqlalchemy import create_engine, insert, select
+
+from backend.app.models.account import Account
+from backend.app.scripts import migrate_srp6
+from backend.app.services import auth as auth_service
+from backend.app.services import srp6
+
+def make_database(tmp_path, accounts):
+    url = f"sqlite:///{tmp_path / 'auth.sqlite'}"
+    engine = create_engine(url)
+    Account.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Account), accounts)
+    engine.dispose()
+    return url
+
+def legacy_account(account_id, username, password):
+    return {
+        "id": account_id, "username": username.upper(), "email": f"{username}@example.com",
+        "sha_pass_hash": auth_service.get_ac_password_hash(password, username),
+    }
+
+def read_accounts(url):
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        rows = {row.id: row for row in conn.execute(select(Account.__table__))}
+    engine.dispose()
+    return rows
+
+def test_migration_derives_verifiers_from_legacy_hashes(tmp_path):
+    url = make_database(tmp_path, [
+        legacy_account(1, "alice", "secret1"),
+        legacy_account(2, "bob", "hunter22"),
+        {"id": 3, "username": "EMPTY", "email": "empty@example.com", "sha_pass_hash": ""},
+        {"id": 4, "username": "BROKEN", "email": "broken@example.com", "sha_pass_hash": "not-a-hash"},
+    ])
+    stats = migrate_srp6.migrate(url, batch_size=1, workers=2)
+    assert stats["updated"] == 2 and stats["skipped"] == 1 # The empty hash isn't selected at all
+
+    rows = read_accounts(url)
+    assert srp6.verify_password("alice", "secret1", rows[1].salt, rows[1].verifier)
+    assert srp6.verify_password("bob", "hunter22", rows[2].salt, rows[2].verifier)
+    assert rows[3].verifier is None and rows[4].verifier is None
+
+def test_migration_is_resumable_and_never_overwrites(tmp_path):
+    url = make_database(tmp_path, [legacy_account(i, f"user{i}", "pw") for i in range(1, 6)])
+    assert migrate_srp6.migrate(url, start_id=3)["updated"] == 2 # Only ids 4 and 5
+    first_run = read_accounts(url)
+    assert first_run[3].verifier is None and first_run[4].verifier is not None
+
+    assert migrate_srp6.migrate(url)["updated"] == 3 # Picks up the rest
+    second_run = read_accounts(url)
+    assert second_run[4].verifier == first_run[4].verifier # Converted rows are left alone
+    assert migrate_srp6.migrate(url)["total"] == 0
+
+def test_dry_run_writes_nothing(tmp_path):
+    url = make_database(tmp_path, [legacy_account(1, "alice", "secret1")])
+    assert migrate_srp6.migrate(url, dry_run=True)["processed"] == 1
+    assert read_accounts(url)[1].verifier is None
+
+def test_last_id_covers_skipped_rows(tmp_path):
+    url = make_database(tmp_path, [
+        legacy_account(1, "alice", "secret1"),
+        {"id": 2, "username": "BROKEN", "email": "broken@example.com", "sha_pass_hash": "not-a-hash"},
+        {"id": 3, "username": "BROKEN2", "email": "broken2@example.com", "sha_pass_hash": "also-not-a-hash"},
+    ])
+    assert migrate_srp6.migrate(url, batch_size=2, workers=2)["last_id"] == 3 # Resuming from here re-reads nothing
+    assert migrate_srp6.migrate(url, start_id=3)["total"] == 0
+
+def test_conversion_runs_at_most_a_window_ahead():
+    read = []
+    def batches():
+        for i in range(1, 21):
+            read.append(i)
+            yield [(i, "0" * 40)]
+    with multiprocessing.Pool(2) as pool:
+        for written, (_, _, last_id) in enumerate(migrate_srp6._convert_ahead(pool, batches(), window=3), start=1):
+            assert last_id == written # In order
+            assert len(read) - written <= 3
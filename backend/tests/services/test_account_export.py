@@ -0,0 +1,52 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from backend.app.core.config import settings
+from backend.app.core.database import Base
+from backend.app.models.account import Account
+from backend.app.services import account_export
+
+def run_export(export_format, accounts, compress=False, **filters) -> bytes:
+    async def _runner():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            db.add_all(accounts)
+            await db.commit()
+        try:
+            chunks = [chunk async for chunk in account_export.export_accounts(session_factory, export_format, compress, **filters)]
+        finally:
+            await engine.dispose()
+        return b"".join(chunks)
+    return asyncio.run(_runner())
+
+def make_accounts(count):
+    return [
+        Account(id=i, username=f"USER{i}", email=f"user{i}@example.com", sha_pass_hash="x", locked=(i % 2 == 0))
+        for i in range(1, count + 1)
+    ]
+
+def test_ndjson_export_streams_all_rows_in_batches(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_EXPORT_BATCH_SIZE", 2)
+    lines = run_export("ndjson", make_accounts(5)).decode().splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert [row["id"] for row in rows] == [1, 2, 3, 4, 5]
+    assert "sha_pass_hash" not in rows[0] and "verifier" not in rows[0]
+    assert rows[0]["joindate"] # Timestamps are ISO strings
+
+def test_csv_export_with_gzip_and_filter(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_EXPORT_BATCH_SIZE", 2)
+    data = gzip.decompress(run_export("csv", make_accounts(5), compress=True, locked=True))
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert [row["username"] for row in rows] == ["USER2", "USER4"]
+
+def test_empty_csv_export_has_header():
+    data = run_export("csv", [])
+    assert data.decode().strip() == ",".join(account_export.user_crud.USER_EXPORT_FIELDS)
@@ -0,0 +1,63 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from backend.app.core.database import Base
+from backend.app.models.account import Account
+from backend.app.services import account_search
+from backend.app.services.account_search import TrigramIndex
+
+def make_index():
+    index = TrigramIndex()
+    index.add(1, "ARTHAS", "arthas@lordaeron.com")
+    index.add(2, "THRALL", "thrall@orgrimmar.com")
+    index.add(3, "ARTHASFAN", "fan@example.com")
+    index.add(4, "JAINA", "jaina.arthas@theramore.com")
+    return index
+
+def test_search_ranks_exact_then_username_then_email():
+    assert make_index().search("arthas") == [1, 3, 4]
+    assert make_index().search("ARTH") == [1, 3, 4] # Case-insensitive
+
+def test_search_matches_email_substrings_and_rejects_misses():
+    index = make_index()
+    assert index.search("orgrim") == [2]
+    assert index.search("example.c") == [3]
+    assert index.search("zzz") == []
+    assert index.search("arthasx") == [] # All trigrams present, but not as one substring
+
+def test_short_queries_are_rejected():
+    import pytest
+    with pytest.raises(ValueError):
+        make_index().search("ja")
+
+def test_readding_an_account_is_a_noop():
+    index = make_index()
+    before = index.stats()
+    index.add(1, "ARTHAS", "arthas@lordaeron.com")
+    assert index.stats() == before
+    assert before["accounts"] == 4
+
+def test_rebuild_loads_accounts_and_keeps_concurrent_additions(monkeypatch):
+    async def body():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            db.add_all([Account(id=i, username=f"USER{i}", email=f"user{i}@example.com", sha_pass_hash="x") for i in (1, 2)])
+            await db.commit()
+        monkeypatch.setattr(account_search, "SessionLocal", session_factory)
+        monkeypatch.setattr(account_search, "_index", None)
+        assert await account_search.search("user") is None # Not built yet
+
+        rebuilding = asyncio.create_task(account_search.rebuild())
+        await asyncio.sleep(0) # Rebuild is under way
+        account_search._add_local(3, "LATECOMER", "late@example.com")
+        await rebuilding
+        await engine.dispose()
+
+        assert await account_search.search("user") == [1, 2]
+        assert await account_search.search("latecomer") == [3]
+        assert account_search.get_stats()["ready"] is True
+    asyncio.run(body())
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import date
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from backend.app.core.database import Base
+from backend.app.models.account import Account
+from backend.app.models import user as user_schema
+from backend.app.crud import user as user_crud
+from backend.app.crud import user_totp as user_totp_crud
+from backend.app.services import account_stats
+
+def make_user_create(username, email):
+    return user_schema.UserCreate(
+        username=username, email=email, password="secret123", captcha_id="unused", captcha_solution="unused"
+    )
+
+def test_write_paths_keep_counters_equal_to_a_recount(monkeypatch, isolated_aux_db):
+    async def body():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        monkeypatch.setattr(account_stats, "SessionLocal", session_factory)
+        monkeypatch.setattr(account_stats, "AuxSessionLocal", isolated_aux_db)
+        monkeypatch.setattr(account_stats, "_counters", dict.fromkeys(account_stats.COUNTERS, 0))
+        monkeypatch.setattr(account_stats, "_registrations", {})
+        monkeypatch.setattr(account_stats, "_reconciled_at", None)
+
+        async with session_factory() as db:
+            db.add(Account(username="VETERAN", email="veteran@example.com", sha_pass_hash="x", locked=True))
+            await db.commit()
+        await account_stats.reconcile()
+        assert account_stats.is_ready()
+        stats = account_stats.get_account_stats()
+        assert (stats["total_accounts"], stats["locked_accounts"], stats["verified_emails"], stats["totp_enabled"]) == (1, 1, 0, 0)
+
+        async with session_factory() as db, isolated_aux_db() as aux_db:
+            first = await user_crud.create_user(db, make_user_create("first", "first@example.com"))
+            second = await user_crud.create_user(db, make_user_create("second", "second@example.com"))
+            await user_crud.ban_account(db, first)
+            await user_crud.ban_account(db, first) # Already banned: no change
+            await user_crud.mark_user_email_as_verified(db, second.id)
+            await user_crud.mark_user_email_as_verified(db, second.id)
+            await user_totp_crud.create_user_totp_secret(aux_db, second.id, "SECRET")
+            await user_totp_crud.activate_user_totp(aux_db, second.id)
+            veteran = await user_crud.get_user_by_username(db, "VETERAN")
+            await user_crud.bulk_set_locked(db, [veteran], locked=False, acting_admin_id=0)
+
+        incremental = account_stats.get_account_stats()
+        assert (incremental["total_accounts"], incremental["locked_accounts"]) == (3, 1)
+        assert (incremental["verified_emails"], incremental["totp_enabled"]) == (1, 1)
+        assert incremental["registrations_per_day"][-1]["day"] == date.today()
+
+        await account_stats.reconcile()
+        recounted = account_stats.get_account_stats()
+        await engine.dispose()
+        return incremental, recounted
+    incremental, recounted = asyncio.run(body())
+    incremental.pop("reconciled_at"), recounted.pop("reconciled_at")
+    assert incremental == recounted
+
+def test_remote_changes_apply_but_own_echoes_are_skipped(monkeypatch):
+    monkeypatch.setattr(account_stats, "_counters", dict.fromkeys(account_stats.COUNTERS, 0))
+    monkeypatch.setattr(account_stats, "_registrations", {})
+    account_stats._apply_remote_changes("otherworker|total_accounts=1,2026-01-02=1")
+    account_stats._apply_remote_changes(f"{account_stats._WORKER_ID}|locked_accounts=5")
+    account_stats._apply_remote_changes("otherworker|locked_accounts=oops") # Malformed: ignored
+    assert account_stats._counters["total_accounts"] == 1
+    assert account_stats._counters["locked_accounts"] == 0
+    assert account_stats._registrations == {date(2026, 1, 2): 1}
@@ -0,0 +1,50 @@
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from jose import jwt
+
+from backend.app.services import auth as auth_service
+from backend.app.core.cache import TTLCache
+
+class CredentialsError(Exception):
+    pass
+
+@pytest.fixture(autouse=True)
+def fresh_token_cache(monkeypatch):
+    monkeypatch.setattr(auth_service, "_verified_tokens", TTLCache(maxsize=100, ttl_seconds=0))
+
+def test_ac_password_hash_roundtrip():
+    hashed = auth_service.get_ac_password_hash("secret", "alice")
+    assert hashed == auth_service.get_ac_password_hash("SECRET", "ALICE") # AC hashes are case-insensitive
+    assert auth_service.verify_ac_password("secret", "Alice", hashed.upper())
+    assert not auth_service.verify_ac_password("wrong", "alice", hashed)
+
+def test_verify_token_caches_decoded_claims():
+    token = auth_service.create_access_token(data={"sub": "ALICE"})
+    with patch.object(auth_service.jwt, "decode", wraps=jwt.decode) as decode_spy:
+        first = auth_service.verify_token(token, CredentialsError())
+        second = auth_service.verify_token(token, CredentialsError())
+    assert first.username == second.username == "ALICE"
+    assert decode_spy.call_count == 1
+    stats = auth_service.get_token_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["entries"] == 1
+
+def test_verify_token_rejects_invalid_and_expired_tokens():
+    with pytest.raises(CredentialsError):
+        auth_service.verify_token("not-a-jwt", CredentialsError())
+    expired = auth_service.create_access_token(data={"sub": "ALICE"}, expires_delta=timedelta(seconds=-10))
+    with pytest.raises(CredentialsError):
+        auth_service.verify_token(expired, CredentialsError())
+    assert auth_service.get_token_cache_stats()["entries"] == 0
+
+def test_verify_token_requires_subject():
+    token = auth_service.create_access_token(data={"foo": "bar"})
+    with pytest.raises(CredentialsError):
+        auth_service.verify_token(token, CredentialsError())
+
+def test_verify_token_reads_generation_claims():
+    token = auth_service.create_access_token(data={"sub": "ALICE", "uid": 5, "gen": 2})
+    token_data = auth_service.verify_token(token, CredentialsError())
+    assert token_data.user_id == 5
+    assert token_data.generation == 2
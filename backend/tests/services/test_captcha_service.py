@@ -1,4 +1,8 @@
+import asyncio
+import time
 import pytest
+from unittest.mock import patch
+from backend.app.core.config import settings
 from backend.app.services import captcha_service
 
 def test_generate_math_challenge_returns_strings():
@@ -56,3 +60,77 @@ def test_generate_math_challenge_randomness():
 def test_captcha_expiry_constant():
     assert captcha_service.CAPTCHA_EXPIRY_SECONDS == 300 # 5 minutes
     assert isinstance(captcha_service.CAPTCHA_EXPIRY_SECONDS, int)
+
+def test_signed_challenge_checks_answer_and_is_single_use():
+    async def body():
+        token = captcha_service.issue_signed_challenge("42", expires_in_seconds=60)
+        assert await captcha_service.redeem_signed_challenge(token, " 42 ") is True
+        with pytest.raises(captcha_service.CaptchaError):
+            await captcha_service.redeem_signed_challenge(token, "42") # Replay
+
+        wrong = captcha_service.issue_signed_challenge("42", expires_in_seconds=60)
+        assert await captcha_service.redeem_signed_challenge(wrong, "41") is False
+        with pytest.raises(captcha_service.CaptchaError):
+            await captcha_service.redeem_signed_challenge(wrong, "42") # Spent by the wrong attempt
+    with patch('backend.app.services.captcha_service.get_async_redis', return_value=None):
+        asyncio.run(body())
+
+def test_signed_challenge_rejects_forged_malformed_and_expired_tokens():
+    async def body():
+        token = captcha_service.issue_signed_challenge("7", expires_in_seconds=60)
+        tampered = token[:-2] + ("AA" if token[-2:] != "AA" else "BB")
+        expired = captcha_service.issue_signed_challenge("7", expires_in_seconds=-1)
+        for bad in (tampered, expired, "not-a-token", ""):
+            with pytest.raises(captcha_service.CaptchaError):
+                await captcha_service.redeem_signed_challenge(bad, "7")
+    with patch('backend.app.services.captcha_service.get_async_redis', return_value=None):
+        asyncio.run(body())
+
+def test_spent_filter_drops_expired_buckets():
+    spent = captcha_service.SpentTokenFilter(capacity_per_bucket=1000, bucket_seconds=60)
+    now = int(time.time())
+    assert spent.add(b"nonce-1", now + 120)
+    assert not spent.add(b"nonce-1", now + 120)
+    assert spent.add(b"nonce-2", now + 120)
+    spent.add(b"old", now - 120) # Bucket already in the past: dropped on the next add
+    spent.add(b"nonce-3", now + 120)
+    assert spent.stats()["buckets"] == 1
+    assert spent.stats()["spent_tokens"] == 3
+
+def solve_pow(challenge_id, difficulty):
+    solution = 0
+    while not captcha_service.pow_hash_meets_difficulty(challenge_id, str(solution), difficulty):
+        solution += 1
+    return str(solution)
+
+def test_pow_challenge_solution_is_checked_and_single_use(monkeypatch):
+    monkeypatch.setattr(settings, "POW_BASE_DIFFICULTY", 8)
+    monkeypatch.setattr(captcha_service, "_registration_rate", captcha_service._EventRate())
+    async def body():
+        challenge_id, difficulty = captcha_service.issue_pow_challenge(expires_in_seconds=60)
+        assert difficulty == 8
+        solution = solve_pow(challenge_id, difficulty)
+        wrong = next(str(n) for n in range(1000) if not captcha_service.pow_hash_meets_difficulty(challenge_id, str(n), difficulty))
+        assert await captcha_service.redeem_pow_challenge(challenge_id, wrong) is False # Doesn't spend the challenge
+        assert await captcha_service.redeem_pow_challenge(challenge_id, solution) is True
+        with pytest.raises(captcha_service.CaptchaError):
+            await captcha_service.redeem_pow_challenge(challenge_id, solution) # Replay
+        with pytest.raises(captcha_service.CaptchaError):
+            await captcha_service.redeem_pow_challenge(captcha_service.issue_signed_challenge("5", 60), solution) # Not a PoW token
+    with patch('backend.app.services.captcha_service.get_async_redis', return_value=None):
+        asyncio.run(body())
+
+def test_pow_difficulty_rises_with_registration_rate(monkeypatch):
+    monkeypatch.setattr(settings, "POW_BASE_DIFFICULTY", 16)
+    monkeypatch.setattr(settings, "POW_MAX_DIFFICULTY", 20)
+    monkeypatch.setattr(settings, "POW_RATE_THRESHOLD_PER_MINUTE", 10)
+    monkeypatch.setattr(captcha_service, "_registration_rate", captcha_service._EventRate())
+    for _ in range(10):
+        captcha_service.record_registration_attempt()
+    assert captcha_service.current_pow_difficulty() == 16
+    for _ in range(30):
+        captcha_service.record_registration_attempt()
+    assert captcha_service.current_pow_difficulty() == 18 # 4x the threshold: two more bits
+    for _ in range(1000):
+        captcha_service.record_registration_attempt()
+    assert captcha_service.current_pow_difficulty() == 20 # Capped
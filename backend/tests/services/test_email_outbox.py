@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from backend.app.core.config import settings
+from backend.app.core.database import Base
+from backend.app.models.account import Account
+from backend.app.crud import email_outbox as email_outbox_crud
+from backend.app.models.email_outbox import EmailOutboxMessage
+from backend.app.services import email_outbox
+
+def test_delivered_messages_leave_the_outbox(isolated_aux_db, monkeypatch):
+    sent = []
+    def send_batch(messages):
+        sent.extend(messages)
+        return [None] * len(messages)
+    monkeypatch.setattr(email_outbox.email_service, "send_batch", send_batch)
+    async def body():
+        await email_outbox.enqueue_verification_email("a@example.com", "ALICE", "token123")
+        await email_outbox.enqueue_email("b@example.com", "Hello", "Hi")
+        assert (await email_outbox.get_stats())["pending"] == 2
+        assert await email_outbox.process_due_messages() == 2
+        assert await email_outbox.process_due_messages() == 0
+        return await email_outbox.get_stats()
+    stats = asyncio.run(body())
+    assert [args[0] for args in sent] == ["a@example.com", "b@example.com"]
+    assert sent[0][1] == "Verify your email address" and "token=token123" in sent[0][2]
+    assert (stats["pending"], stats["sending"], stats["dead"]) == (0, 0, 0)
+
+def test_failures_back_off_then_dead_letter(isolated_aux_db, monkeypatch):
+    monkeypatch.setattr(email_outbox.email_service, "send_batch", lambda messages: [ConnectionRefusedError("relay down")] * len(messages))
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 3)
+    async def body():
+        message_id = await email_outbox.enqueue_email("a@example.com", "Hello", "Hi")
+        delays = []
+        for _ in range(3):
+            assert await email_outbox.process_due_messages() == 1
+            assert await email_outbox.process_due_messages() == 0 # Not due again yet
+            async with isolated_aux_db() as aux_db:
+                message = await aux_db.get(EmailOutboxMessage, message_id)
+                if message.status == "pending":
+                    delays.append((message.next_attempt_at - datetime.datetime.utcnow()).total_seconds())
+                    message.next_attempt_at = datetime.datetime.utcnow() # Skip the wait
+                    await aux_db.commit()
+        return message, delays
+    message, delays = asyncio.run(body())
+    assert (message.status, message.attempts) == ("dead", 3)
+    assert "relay down" in message.last_error
+    base = settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS
+    assert base / 2 - 1 <= delays[0] <= base
+    assert base - 1 <= delays[1] <= base * 2
+
+def test_concurrent_claims_never_share_a_message(isolated_aux_db):
+    async def body():
+        for i in range(20):
+            await email_outbox.enqueue_email(f"user{i}@example.com", "Hello", "Hi")
+        async def claim():
+            async with isolated_aux_db() as aux_db:
+                return await email_outbox_crud.claim_due_messages(aux_db, limit=15, lease_seconds=300, max_attempts=8)
+        first, second = await asyncio.gather(claim(), claim())
+        return first, second, await claim()
+    first, second, rest = asyncio.run(body())
+    first_ids, second_ids, rest_ids = {m.id for m in first}, {m.id for m in second}, {m.id for m in rest}
+    assert not first_ids & second_ids
+    assert not (first_ids | second_ids) & rest_ids
+    assert len(first_ids | second_ids | rest_ids) == 20
+
+def test_messages_whose_claim_keeps_lapsing_are_dead_lettered(isolated_aux_db, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 3)
+    async def body():
+        message_id = await email_outbox.enqueue_email("a@example.com", "Hello", "Hi")
+        claims = 0
+        for _ in range(5):
+            async with isolated_aux_db() as aux_db:
+                await email_outbox_crud.dead_letter_lapsed_claims(aux_db, max_attempts=3)
+                claims += len(await email_outbox_crud.claim_due_messages(aux_db, limit=10, lease_seconds=300, max_attempts=3))
+                # The worker dies mid-send: nothing is recorded and the claim lapses
+                message = await aux_db.get(EmailOutboxMessage, message_id)
+                message.next_attempt_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+                await aux_db.commit()
+        async with isolated_aux_db() as aux_db:
+            return claims, await aux_db.get(EmailOutboxMessage, message_id)
+    claims, message = asyncio.run(body())
+    assert claims == 3 # The first claim and two reclaims, then no more
+    assert (message.status, message.attempts) == ("dead", 3)
+    assert message.last_error == email_outbox_crud.LAPSED_CLAIM_ERROR
+
+def test_announcements_go_to_verified_addresses_only(isolated_aux_db, monkeypatch):
+    sent = []
+    def send_batch(messages):
+        sent.extend(messages)
+        return [None] * len(messages)
+    monkeypatch.setattr(email_outbox.email_service, "send_batch", send_batch)
+    monkeypatch.setattr(settings, "EMAIL_ANNOUNCEMENT_BATCH_SIZE", 2)
+    async def body():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        monkeypatch.setattr(email_outbox, "SessionLocal", session_factory)
+        async with session_factory() as db:
+            for i in range(5):
+                db.add(Account(username=f"USER{i}", email=f"user{i}@example.com", sha_pass_hash="x", email_verified=i != 2))
+            await db.commit()
+        queued = await email_outbox.enqueue_announcement("Maintenance", "Down at 10")
+        while await email_outbox.process_due_messages():
+            pass
+        await engine.dispose()
+        return queued
+    assert asyncio.run(body()) == 4
+    assert sorted(recipient for recipient, _, _ in sent) == [f"user{i}@example.com" for i in (0, 1, 3, 4)]
+    assert {(subject, text) for _, subject, text in sent} == {("Maintenance", "Down at 10")}
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from unittest.mock import patch, MagicMock
 from backend.app.services import email_service
@@ -20,6 +22,13 @@ def mock_settings_configured():
     yield test_settings
     email_service.settings = original_settings # Restore original
 
+@pytest.fixture(autouse=True)
+def fresh_smtp_pool():
+    """Pooled sessions must not outlive a test's mocked smtplib."""
+    email_service.close_smtp_pool()
+    yield
+    email_service.close_smtp_pool()
+
 @pytest.fixture
 def mock_settings_unconfigured():
     original_settings = email_service.settings
@@ -32,31 +41,40 @@ def mock_settings_unconfigured():
     yield test_settings
     email_service.settings = original_settings
 
-@patch('socket.socket')
-def test_is_online_success(mock_socket_constructor):
-    mock_socket_instance = MagicMock()
-    mock_socket_constructor.return_value = mock_socket_instance
-    mock_socket_instance.connect.return_value = None # Simulate successful connection
+@patch('socket.create_connection')
+def test_probe_host_success(mock_create_connection):
+    assert email_service.probe_host("smtp.test.com", 587, timeout=3) is True
+    mock_create_connection.assert_called_once_with(("smtp.test.com", 587), timeout=3)
+    mock_create_connection.return_value.__exit__.assert_called_once() # The probe connection is closed
 
-    assert email_service.is_online() is True
-    mock_socket_instance.connect.assert_called_once_with(("8.8.8.8", 53))
+@patch('socket.create_connection')
+def test_probe_host_failure(mock_create_connection):
+    mock_create_connection.side_effect = socket.error("Connection failed")
 
-@patch('socket.socket')
-def test_is_online_failure(mock_socket_constructor):
-    mock_socket_instance = MagicMock()
-    mock_socket_constructor.return_value = mock_socket_instance
-    mock_socket_instance.connect.side_effect = socket.error("Connection failed")
+    assert email_service.probe_host("smtp.test.com", 587, timeout=3) is False
 
+def test_is_online_reads_the_state_cached_by_the_monitor(mock_settings_configured, monkeypatch):
+    default_timeout = socket.getdefaulttimeout()
+    monkeypatch.setattr(email_service, "_smtp_reachable", None)
+    assert email_service.is_online() is True # Not probed yet
+
+    monkeypatch.setattr(email_service, "probe_host", lambda host, port, timeout: False)
+    assert asyncio.run(email_service.check_connectivity()) is False
     assert email_service.is_online() is False
 
+    monkeypatch.setattr(email_service, "probe_host", lambda host, port, timeout: (host, port) == ("smtp.test.com", 587))
+    asyncio.run(email_service.check_connectivity())
+    assert email_service.is_online() is True
+    assert email_service.get_stats()["reachable"] is True
+    assert socket.getdefaulttimeout() == default_timeout # No process-wide side effects
+
 # Need to import socket for the side_effect above
 import socket
 
 @patch('smtplib.SMTP')
 @patch('backend.app.services.email_service.is_online', return_value=True)
 def test_send_verification_email_success(mock_is_online, mock_smtp_constructor, mock_settings_configured):
-    mock_smtp_instance = MagicMock()
-    mock_smtp_constructor.return_value.__enter__.return_value = mock_smtp_instance # For 'with' statement
+    mock_smtp_instance = mock_smtp_constructor.return_value # The pool keeps the session open (no 'with')
 
     user_email = "recipient@example.com"
     username = "test_user"
@@ -65,7 +83,9 @@ def test_send_verification_email_success(mock_is_online, mock_smtp_constructor,
     result = email_service.send_verification_email(user_email, username, verification_token)
 
     assert result is True
-    mock_smtp_constructor.assert_called_once_with(mock_settings_configured.SMTP_HOST, mock_settings_configured.SMTP_PORT)
+    mock_smtp_constructor.assert_called_once_with(
+        mock_settings_configured.SMTP_HOST, mock_settings_configured.SMTP_PORT, timeout=mock_settings_configured.SMTP_TIMEOUT_SECONDS
+    )
     mock_smtp_instance.starttls.assert_called_once()
     mock_smtp_instance.login.assert_called_once_with(mock_settings_configured.SMTP_USER, mock_settings_configured.SMTP_PASSWORD)
 
@@ -83,8 +103,7 @@ def test_send_verification_email_success(mock_is_online, mock_smtp_constructor,
 @patch('smtplib.SMTP')
 @patch('backend.app.services.email_service.is_online', return_value=True)
 def test_send_verification_email_smtp_auth_error(mock_is_online, mock_smtp_constructor, mock_settings_configured):
-    mock_smtp_instance = MagicMock()
-    mock_smtp_constructor.return_value.__enter__.return_value = mock_smtp_instance
+    mock_smtp_instance = mock_smtp_constructor.return_value
     mock_smtp_instance.login.side_effect = smtplib.SMTPAuthenticationError(535, b"Authentication credentials invalid")
 
     result = email_service.send_verification_email("r@ex.com", "u", "t")
@@ -107,3 +126,89 @@ def test_send_verification_email_smtp_not_configured(mock_is_online, mock_smtp_c
 
 # Need to import smtplib for SMTPAuthenticationError
 import smtplib
+
+def make_pool(**overrides):
+    options = {"max_connections": 2, "max_messages_per_connection": 100, "idle_seconds": 60, "max_messages_per_second": 0}
+    options.update(overrides)
+    return email_service.SMTPConnectionPool(**options)
+
+@patch('smtplib.SMTP')
+def test_pool_reuses_authenticated_sessions(mock_smtp_constructor, mock_settings_configured):
+    pool = make_pool()
+    assert pool.send_batch([("a@ex.com", "s", "b"), ("b@ex.com", "s", "b")]) == [None, None]
+    assert pool.send_batch([("c@ex.com", "s", "b")]) == [None]
+
+    mock_smtp_constructor.assert_called_once() # One connect, STARTTLS and login for all three messages
+    session = mock_smtp_constructor.return_value
+    session.login.assert_called_once()
+    session.noop.assert_called_once() # Liveness check before reusing the idle session
+    assert [c.args[1] for c in session.sendmail.call_args_list] == [["a@ex.com"], ["b@ex.com"], ["c@ex.com"]]
+    assert pool.stats()["connections_opened"] == 1 and pool.stats()["sessions_reused"] == 1
+
+@patch('smtplib.SMTP')
+def test_pool_survives_rejected_messages_and_lost_connections(mock_smtp_constructor, mock_settings_configured):
+    first, second = MagicMock(), MagicMock()
+    mock_smtp_constructor.side_effect = [first, second]
+    rejected = smtplib.SMTPRecipientsRefused({"bad@ex.com": (550, b"No such user")})
+    first.sendmail.side_effect = [None, rejected, None, smtplib.SMTPServerDisconnected("gone")]
+
+    pool = make_pool()
+    results = pool.send_batch([(f"u{i}@ex.com", "s", "b") for i in range(5)])
+
+    assert [type(result) if result else None for result in results] == [
+        None, smtplib.SMTPRecipientsRefused, None, smtplib.SMTPServerDisconnected, None
+    ]
+    assert mock_smtp_constructor.call_count == 2 # Reconnected only after the connection was lost
+    assert second.sendmail.call_args.args[1] == ["u4@ex.com"]
+
+@patch('smtplib.SMTP')
+def test_pool_rotates_sessions_after_the_per_connection_limit(mock_smtp_constructor, mock_settings_configured):
+    pool = make_pool(max_messages_per_connection=2)
+    assert pool.send_batch([(f"u{i}@ex.com", "s", "b") for i in range(5)]) == [None] * 5
+    assert mock_smtp_constructor.call_count == 3
+
+@patch('smtplib.SMTP')
+def test_unreachable_relay_fails_the_whole_batch(mock_smtp_constructor, mock_settings_configured):
+    mock_smtp_constructor.side_effect = ConnectionRefusedError("refused")
+    results = make_pool().send_batch([("a@ex.com", "s", "b"), ("b@ex.com", "s", "b")])
+    assert all(isinstance(result, ConnectionRefusedError) for result in results)
+
+def test_rate_shaper_paces_sends_after_a_burst(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(email_service.time, "sleep", sleeps.append)
+    shaper = email_service._RateShaper(rate=10)
+    for _ in range(15):
+        shaper.wait()
+    assert len(sleeps) == 5 # A burst of 10, then one message per 0.1 s
+    assert sleeps[-1] == pytest.approx(0.5, abs=0.05)
+
+def test_batch_send_against_a_local_smtp_server(mock_settings_configured, monkeypatch):
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+
+    class CollectingHandler:
+        def __init__(self):
+            self.envelopes = []
+        async def handle_DATA(self, server, session, envelope):
+            self.envelopes.append(envelope)
+            return "250 OK"
+
+    with socket.socket() as probe: # A free port (the controller checks its own port, so 0 won't do)
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = CollectingHandler()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        monkeypatch.setattr(mock_settings_configured, "SMTP_HOST", "127.0.0.1")
+        monkeypatch.setattr(mock_settings_configured, "SMTP_PORT", port)
+        monkeypatch.setattr(mock_settings_configured, "SMTP_USER", None) # No STARTTLS/AUTH on the stand-in
+        pool = make_pool(max_messages_per_connection=3)
+        results = pool.send_batch([(f"user{i}@example.com", "Announcement", f"Message {i}") for i in range(5)])
+        pool.close()
+    finally:
+        controller.stop()
+
+    assert results == [None] * 5
+    assert [envelope.rcpt_tos for envelope in handler.envelopes] == [[f"user{i}@example.com"] for i in range(5)]
+    assert b"Message 4" in handler.envelopes[4].content
+    assert pool.stats()["connections_opened"] == 2
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from backend.app.services import refresh_tokens, token_revocation
+
+@pytest.fixture(autouse=True)
+def database_store(monkeypatch):
+    store = refresh_tokens._DatabaseRefreshTokenStore()
+    monkeypatch.setattr(refresh_tokens, "_get_store", lambda: store)
+    return store
+
+def test_rotation_returns_new_token_and_consumes_old():
+    async def body():
+        token = await refresh_tokens.issue_refresh_token(1, "ALICE", 0)
+        record, new_token = await refresh_tokens.rotate_refresh_token(token)
+        assert (record.user_id, record.username, record.generation) == (1, "ALICE", 0)
+        assert new_token != token
+        with pytest.raises(refresh_tokens.RefreshTokenError):
+            await refresh_tokens.rotate_refresh_token(token)
+    asyncio.run(body())
+
+def test_reuse_revokes_whole_family():
+    async def body():
+        token = await refresh_tokens.issue_refresh_token(1, "ALICE", 0)
+        _, second = await refresh_tokens.rotate_refresh_token(token)
+        with pytest.raises(refresh_tokens.RefreshTokenError):
+            await refresh_tokens.rotate_refresh_token(token) # Replay of the stolen first token
+        with pytest.raises(refresh_tokens.RefreshTokenError):
+            await refresh_tokens.rotate_refresh_token(second) # Legitimate holder is logged out too
+    asyncio.run(body())
+
+def test_unknown_token_is_rejected():
+    with pytest.raises(refresh_tokens.RefreshTokenError):
+        asyncio.run(refresh_tokens.rotate_refresh_token("not-a-token"))
+
+def test_revoked_generation_rejects_refresh():
+    async def body():
+        token = await refresh_tokens.issue_refresh_token(2, "BOB", token_revocation.current_generation(2))
+        await token_revocation.revoke_all_tokens(2) # e.g. password change
+        with pytest.raises(refresh_tokens.RefreshTokenError):
+            await refresh_tokens.rotate_refresh_token(token)
+    asyncio.run(body())
+
+def test_rotation_works_on_any_worker(monkeypatch):
+    async def body():
+        token = await refresh_tokens.issue_refresh_token(3, "CAROL", 0)
+        # Another worker has its own store object but the same aux DB
+        monkeypatch.setattr(refresh_tokens, "_get_store", lambda: refresh_tokens._DatabaseRefreshTokenStore())
+        record, new_token = await refresh_tokens.rotate_refresh_token(token)
+        assert record.user_id == 3
+        await refresh_tokens.rotate_refresh_token(new_token)
+    asyncio.run(body())
+
+def test_purge_removes_expired_tokens(isolated_aux_db):
+    from sqlalchemy import select, update
+    from backend.app.models.refresh_token import RefreshToken
+    async def body():
+        expired = await refresh_tokens.issue_refresh_token(4, "DAVE", 0)
+        live = await refresh_tokens.issue_refresh_token(4, "DAVE", 0)
+        async with isolated_aux_db() as aux_db:
+            await aux_db.execute(update(RefreshToken).where(RefreshToken.digest == refresh_tokens._digest(expired)).values(expires_at=0))
+            await aux_db.commit()
+        await refresh_tokens.purge_expired()
+        async with isolated_aux_db() as aux_db:
+            remaining = (await aux_db.execute(select(RefreshToken.digest))).scalars().all()
+        assert remaining == [refresh_tokens._digest(live)]
+    asyncio.run(body())
+
+def test_redis_store_marks_token_used_in_the_same_step(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    store = refresh_tokens._RedisRefreshTokenStore(fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(refresh_tokens, "_get_store", lambda: store)
+    async def body():
+        token = await refresh_tokens.issue_refresh_token(5, "ERIN", 0)
+        digest = refresh_tokens._digest(token)
+        results = await asyncio.gather(store.consume(digest), store.consume(digest))
+        winners = [record for record in results if record is not None]
+        assert len(winners) == 1 # Concurrent refreshes: exactly one wins
+        family_id = winners[0].family_id
+        # The used marker exists as soon as the token is gone, so a replay is always seen as reuse
+        assert await store.get_used_family(digest) == family_id
+        with pytest.raises(refresh_tokens.RefreshTokenError):
+            await refresh_tokens.rotate_refresh_token(token)
+        assert await store.is_family_revoked(family_id)
+    asyncio.run(body())
@@ -0,0 +1,31 @@
+import asyncio
+from backend.app.core import process_pool
+from backend.app.core.config import settings
+from backend.app.services import srp6
+
+def test_verifier_roundtrip_is_case_insensitive():
+    salt, verifier = srp6.make_registration_data("alice", "Secret1")
+    assert len(salt) == srp6.SALT_LENGTH and len(verifier) == srp6.VERIFIER_LENGTH
+    assert srp6.verify_password("ALICE", "SECRET1", salt, verifier) # AC upper-cases credentials
+    assert not srp6.verify_password("alice", "wrong", salt, verifier)
+
+def test_verifier_matches_known_vector():
+    # Salt/verifier for ALICE / SECRET1 as generated by wow_srp 0.5.1, an independent implementation
+    # of the WoW 1.x-3.3.5 SRP6 login (the same N, g and little-endian byte order AzerothCore uses);
+    # a verifier from calculate_verifier() also completed a full wow_srp client/server handshake.
+    salt = bytes.fromhex("6cb966be698c28027bb40dc2963a87dcd163b060187a7067a8bab7a16cc83f9d")
+    verifier = bytes.fromhex("64e5cbed9e16a2492d21561b15466375b2dd1783dd080944f8f58154ffad2584")
+    assert srp6.calculate_verifier("alice", "secret1", salt) == verifier
+    assert srp6.verify_password("ALICE", "SECRET1", salt, verifier)
+
+def test_salts_are_random():
+    assert srp6.make_registration_data("alice", "x")[0] != srp6.make_registration_data("alice", "x")[0]
+
+def test_run_cpu_bound_uses_worker_processes(monkeypatch):
+    monkeypatch.setattr(settings, "CPU_POOL_WORKERS", 1)
+    salt = bytes(32)
+    try:
+        result = asyncio.run(process_pool.run_cpu_bound(srp6.calculate_verifier, "alice", "secret1", salt))
+    finally:
+        process_pool.shutdown_process_pool()
+    assert result == srp6.calculate_verifier("alice", "secret1", salt)
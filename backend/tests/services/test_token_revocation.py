@@ -0,0 +1,54 @@
+import asyncio
+from backend.app.crud import token_generation as token_generation_crud
+from backend.app.models.user import Principal
+from backend.app.services import principal_cache
+from backend.app.services import token_revocation
+from backend.app.core.cache import _apply_invalidation
+
+def test_new_accounts_are_at_generation_zero():
+    assert token_revocation.current_generation(1) == 0
+    assert token_revocation.is_token_current(1, 0)
+
+def test_revoke_all_tokens_invalidates_older_generations():
+    async def body():
+        assert await token_revocation.revoke_all_tokens(7) == 1
+        assert await token_revocation.revoke_all_tokens(7) == 2
+    asyncio.run(body())
+
+    assert token_revocation.current_generation(7) == 2
+    assert not token_revocation.is_token_current(7, 0)
+    assert not token_revocation.is_token_current(7, 1)
+    assert token_revocation.is_token_current(7, 2)
+    assert token_revocation.is_token_current(8, 0) # Other accounts unaffected
+
+def test_load_generations_restores_persisted_state(monkeypatch):
+    asyncio.run(token_revocation.revoke_all_tokens(3))
+    monkeypatch.setattr(token_revocation, "_generations", {}) # Simulate a fresh worker
+    assert token_revocation.is_token_current(3, 0)
+    asyncio.run(token_revocation.load_generations())
+    assert not token_revocation.is_token_current(3, 0)
+
+def test_remote_bumps_only_move_forward():
+    _apply_invalidation("token_generation:5:3")
+    _apply_invalidation("token_generation:5:2") # Late, out-of-order message
+    assert token_revocation.current_generation(5) == 3
+
+def test_without_redis_bumps_on_other_workers_apply_immediately(isolated_aux_db):
+    async def body():
+        async with isolated_aux_db() as aux_db: # A ban on another worker: stored, never seen here
+            await token_generation_crud.increment_generation(aux_db, 9)
+        assert token_revocation.is_token_current(9, 0) # This worker's in-process view is behind...
+        assert await token_revocation.get_generation(9) == 1 # ...but checks read the stored generation
+    asyncio.run(body())
+
+def test_principals_cached_before_a_bump_are_stale(monkeypatch):
+    principal = Principal(id=9, username="CACHED", email="c@example.com", gmlevel=0, locked=False, email_verified=True)
+    monkeypatch.setattr(principal_cache, "_cache", principal_cache.TwoTierCache(
+        namespace="principal-test", maxsize=10, ttl_seconds=60,
+        serialize=lambda p: p.json(), deserialize=Principal.parse_raw, use_redis=False,
+    ))
+    async def body():
+        await principal_cache.cache_principal(principal, 1)
+        assert (await principal_cache.get_principal("CACHED", 1)).id == 9
+        assert await principal_cache.get_principal("CACHED", 2) is None # e.g. banned on another worker
+    asyncio.run(body())
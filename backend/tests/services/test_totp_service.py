@@ -105,3 +105,31 @@ def test_get_totp_uri_with_special_chars_in_username():
     uri_space = totp_service.get_totp_uri(secret, username_space, issuer_name)
     assert f"My%20Cool%20App:test%20user" in uri_space or \
            f"My+Cool+App:test%20user" in uri_space
+
+def _dark_modules_from_svg_path(svg: str) -> set[tuple[int, int]]:
+    """Replays the path commands emitted by generate_qr_code_svg into the set of dark (x, y) modules."""
+    import re
+    path = re.search(r"d='([^']*)'", svg).group(1)
+    dark, x, y = set(), 0, 0
+    for command, a, b in re.findall(r"([Mmh])([\d.]+)(?: ([\d.]+))?", path):
+        if command == "M":
+            x, y = int(a), int(float(b))
+        elif command == "m":
+            x += int(a)
+        else:
+            dark.update((x + i, y) for i in range(int(a)))
+            x += int(a)
+    return dark
+
+def test_svg_qr_code_matches_qr_matrix():
+    otp_uri = totp_service.get_totp_uri("JBSWY3DPEHPK3PXP", "TESTUSER", "TestApp")
+    matrix = totp_service._qr_matrix(otp_uri)
+    expected = {(x, y) for y, row in enumerate(matrix) for x, cell in enumerate(row) if cell}
+    svg = totp_service.generate_qr_code_svg(otp_uri)
+    assert f"viewBox='0 0 {len(matrix)} {len(matrix)}'" in svg
+    assert _dark_modules_from_svg_path(svg) == expected
+
+def test_render_qr_code_data_uri_formats():
+    otp_uri = totp_service.get_totp_uri("JBSWY3DPEHPK3PXP", "TESTUSER", "TestApp")
+    assert totp_service.render_qr_code_data_uri(otp_uri, "svg").startswith("data:image/svg+xml;utf8,%3Csvg")
+    assert totp_service.render_qr_code_data_uri(otp_uri, "png").startswith("data:image/png;base64,")
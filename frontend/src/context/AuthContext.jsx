@@ -1,34 +1,121 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useCallback } from 'react';
 import { apiClient } from '../services/api'; // Assuming apiClient is set up for GET requests too
 import { jwtDecode } from 'jwt-decode'; // Install jwt-decode: npm install jwt-decode
 
 const AuthContext = createContext(null);
 
+// Milliseconds until the JWT's exp claim (0 if expired or undecodable)
+const msUntilExpiry = (jwt) => {
+  try {
+    return Math.max(jwtDecode(jwt).exp * 1000 - Date.now(), 0);
+  } catch (error) {
+    return 0;
+  }
+};
+
+// All tabs share one single-use refresh token in localStorage. Refreshes run one tab at a time, so
+// a tab never presents a token another tab has just rotated (the server treats that as reuse and
+// revokes the login). Browsers without the Web Locks API rely on the re-check in refreshAccessToken.
+const withRefreshLock = (callback) => (
+  navigator.locks ? navigator.locks.request('acweb-token-refresh', callback) : callback()
+);
+
 export const AuthProvider = ({ children }) => {
   const [user, setUser] = useState(null); // User object or null
   const [token, setToken] = useState(localStorage.getItem('authToken'));
   const [isLoading, setIsLoading] = useState(true); // For initial auth check
 
+  // Access tokens are short-lived; they are renewed shortly before expiry using the refresh token.
+  const storeTokens = (tokenResponse) => {
+    localStorage.setItem('authToken', tokenResponse.access_token);
+    if (tokenResponse.refresh_token) {
+      localStorage.setItem('refreshToken', tokenResponse.refresh_token);
+    }
+    setToken(tokenResponse.access_token);
+    return tokenResponse.access_token;
+  };
+
+  const clearTokens = () => {
+    localStorage.removeItem('authToken');
+    localStorage.removeItem('refreshToken');
+    setToken(null);
+    setUser(null);
+  };
+
+  // staleToken is the access token this tab wants to replace
+  const refreshAccessToken = useCallback((staleToken) => withRefreshLock(async () => {
+    // Another tab may have renewed the tokens already (e.g. while this one waited for the lock)
+    const storedToken = localStorage.getItem('authToken');
+    if (storedToken && storedToken !== staleToken && msUntilExpiry(storedToken) > 0) {
+      setToken(storedToken);
+      return storedToken;
+    }
+    const storedRefreshToken = localStorage.getItem('refreshToken');
+    if (!storedRefreshToken) {
+      throw new Error('No refresh token available.');
+    }
+    return storeTokens(await apiClient.refreshToken(storedRefreshToken));
+  }), []);
+
+  // Follow token changes made by other tabs: a renewal reschedules this tab's refresh timer,
+  // a logout logs this tab out too
+  useEffect(() => {
+    const onStorage = (event) => {
+      if (event.key !== 'authToken' && event.key !== null) {
+        return;
+      }
+      const storedToken = localStorage.getItem('authToken');
+      setToken(storedToken);
+      if (!storedToken) {
+        setUser(null);
+      }
+    };
+    window.addEventListener('storage', onStorage);
+    return () => window.removeEventListener('storage', onStorage);
+  }, []);
+
   useEffect(() => {
     const storedToken = localStorage.getItem('authToken');
     if (storedToken) {
-      setToken(storedToken);
-      // apiClient should automatically use the token from localStorage or its interceptors
-      apiClient.get('/auth/users/me')
-        .then(response => { // Assuming response.data contains the user object
-          setUser(response.data);
-        })
+      const restoreSession = async () => {
+        let accessToken = storedToken;
+        if (msUntilExpiry(accessToken) <= 0) {
+          accessToken = await refreshAccessToken(storedToken);
+        } else {
+          setToken(accessToken);
+        }
+        setUser(await apiClient.getCurrentUser(accessToken));
+      };
+      restoreSession()
         .catch(error => {
-          console.error("Failed to fetch user with stored token", error);
-          localStorage.removeItem('authToken'); // Invalid token
-          setToken(null);
-          setUser(null);
+          console.error("Failed to restore session from stored tokens", error);
+          clearTokens(); // Invalid or revoked tokens
         })
         .finally(() => setIsLoading(false));
     } else {
       setIsLoading(false);
     }
-  }, []);
+  }, [refreshAccessToken]);
+
+  // Schedule a refresh one minute before the current access token expires
+  useEffect(() => {
+    if (!token) {
+      return undefined;
+    }
+    const delay = Math.max(msUntilExpiry(token) - 60 * 1000, 0);
+    const timer = setTimeout(() => {
+      refreshAccessToken(token).catch(error => {
+        const storedToken = localStorage.getItem('authToken');
+        if (storedToken && storedToken !== token && msUntilExpiry(storedToken) > 0) {
+          setToken(storedToken); // Another tab renewed the tokens meanwhile
+          return;
+        }
+        console.error("Failed to refresh access token", error);
+        clearTokens(); // Refresh token expired or revoked: log in again
+      });
+    }, delay);
+    return () => clearTimeout(timer);
+  }, [token, refreshAccessToken]);
 
   // Login function updated to take credentials and totpCode
   const login = async (username, password, totpCode = null) => {
@@ -36,10 +123,7 @@ export const AuthProvider = ({ children }) => {
     try {
       // apiClient.login now makes the actual API call
       const loginResponse = await apiClient.login(username, password, totpCode);
-      const newToken = loginResponse.access_token;
-
-      localStorage.setItem('authToken', newToken);
-      setToken(newToken);
+      const newToken = storeTokens(loginResponse);
 
       // Fetch user details using the new token
       // apiClient.getCurrentUser now takes the token explicitly as per api.js design
@@ -49,9 +133,7 @@ export const AuthProvider = ({ children }) => {
       return userDataResponse; // Return user data on successful login
     } catch (error) {
       // Log out or clear token if any step fails to prevent inconsistent state
-      localStorage.removeItem('authToken');
-      setToken(null);
-      setUser(null);
+      clearTokens();
       setIsLoading(false);
       console.error("Login process failed", error);
       throw error; // Rethrow error to be caught by LoginPage
@@ -59,9 +141,7 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
-    localStorage.removeItem('authToken');
-    setToken(null);
-    setUser(null);
+    clearTokens();
   };
 
   const getTokenPayload = () => {
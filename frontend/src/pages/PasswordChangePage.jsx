@@ -10,7 +10,7 @@ const PasswordChangePage = () => {
   const [successMessage, setSuccessMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
 
-  const { token, user } = useAuth(); // Get token for the API call and user for username context
+  const { token, user, logout } = useAuth(); // Get token for the API call and user for username context
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -36,11 +36,13 @@ const PasswordChangePage = () => {
       // and requires authentication (token).
       const response = await apiClient.post('/auth/users/me/change-password', payload, token);
 
-      setSuccessMessage('Password changed successfully!');
+      setSuccessMessage('Password changed successfully! All sessions have been signed out; please log in again.');
       // Clear form
       setCurrentPassword('');
       setNewPassword('');
       setConfirmNewPassword('');
+      // A password change revokes every token of the account, including this one.
+      setTimeout(logout, 2000);
 
     } catch (err) {
       setError(err.data?.detail || err.message || 'Password change failed. Please try again.');
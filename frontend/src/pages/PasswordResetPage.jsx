@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { apiClient } from '../services/api'; // Ensure this path is correct
+import { solveProofOfWork } from '../services/pow';
 
 const PasswordResetPage = () => {
   // States for the request part
@@ -26,7 +27,14 @@ const PasswordResetPage = () => {
     setCaptchaLoadingError('');
     try {
       const response = await apiClient.generateCaptcha();
-      setCaptchaChallenge({ id: response.id, question: response.question });
+      if (response.type === 'pow') {
+        // Proof of work: solved by the browser, nothing for the user to type
+        setCaptchaChallenge({ id: '', question: 'Verifying your browser...' });
+        setCaptchaSolution(await solveProofOfWork(response.id, response.difficulty));
+        setCaptchaChallenge({ id: response.id, question: 'Browser verified.', type: 'pow' });
+      } else {
+        setCaptchaChallenge({ id: response.id, question: response.question });
+      }
     } catch (err) {
       setCaptchaLoadingError('Failed to load CAPTCHA. Please try refreshing.');
       setCaptchaChallenge({ id: '', question: '' });
@@ -123,7 +131,7 @@ const PasswordResetPage = () => {
                 value={captchaSolution}
                 onChange={(e) => setCaptchaSolution(e.target.value)}
                 required
-                disabled={isCaptchaLoading || !captchaChallenge.id || isRequestLoading}
+                disabled={isCaptchaLoading || !captchaChallenge.id || captchaChallenge.type === 'pow' || isRequestLoading}
               />
               <button
                 type="button"
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
 import { apiClient } from '../services/api';
+import { solveProofOfWork } from '../services/pow';
 
 const RegisterPage = () => {
   const [username, setUsername] = useState('');
@@ -21,7 +22,14 @@ const RegisterPage = () => {
     setCaptchaLoadingError('');
     try {
       const response = await apiClient.generateCaptcha();
-      setCaptchaChallenge({ id: response.id, question: response.question });
+      if (response.type === 'pow') {
+        // Proof of work: solved by the browser, nothing for the user to type
+        setCaptchaChallenge({ id: '', question: 'Verifying your browser...' });
+        setCaptchaSolution(await solveProofOfWork(response.id, response.difficulty));
+        setCaptchaChallenge({ id: response.id, question: 'Browser verified.', type: 'pow' });
+      } else {
+        setCaptchaChallenge({ id: response.id, question: response.question });
+      }
     } catch (err) {
       setCaptchaLoadingError('Failed to load CAPTCHA. Please try refreshing.');
       setCaptchaChallenge({ id: '', question: '' }); // Clear previous challenge
@@ -171,7 +179,7 @@ const RegisterPage = () => {
                 value={captchaSolution}
                 onChange={(e) => setCaptchaSolution(e.target.value)}
                 required
-                disabled={isCaptchaLoading || !captchaChallenge.id}
+                disabled={isCaptchaLoading || !captchaChallenge.id || captchaChallenge.type === 'pow'}
               />
               <button
                 type="button"
@@ -2,26 +2,49 @@ import React, { useState, useEffect, useCallback } from 'react';
 import { apiClient } from '../../services/api';
 import { useAuth } from '../../context/AuthContext';
 
+const PAGE_SIZE = 100;
+
 const UserListPage = () => {
   const [users, setUsers] = useState([]);
+  const [nextAfterId, setNextAfterId] = useState(null); // Cursor for the next page; null on the last page
+  const [total, setTotal] = useState(null);
+  const [stats, setStats] = useState(null); // Dashboard counters (served from memory by the backend)
+  const [filters, setFilters] = useState({ username_prefix: '', email_prefix: '', locked: '' });
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [actionMessage, setActionMessage] = useState({ text: '', type: '' }); // type: 'success' or 'error'
   const { token, user: adminUser } = useAuth(); // Get token and current admin user
 
+  // Loads the first page for the current filters (with the total count)
   const fetchUsers = useCallback(async () => {
     setLoading(true);
     setError('');
     setActionMessage({ text: '', type: '' });
     try {
-      const data = await apiClient.adminListUsers(token);
-      setUsers(data);
+      const data = await apiClient.adminListUsers(token, { ...filters, limit: PAGE_SIZE, include_total: true });
+      setUsers(data.items);
+      setNextAfterId(data.next_after_id);
+      setTotal(data.total);
     } catch (err) {
       setError(err.data?.detail || err.message || 'Failed to fetch users.');
     } finally {
       setLoading(false);
     }
-  }, [token]);
+  }, [token, filters]);
+
+  const fetchMoreUsers = async () => {
+    setLoadingMore(true);
+    try {
+      const data = await apiClient.adminListUsers(token, { ...filters, limit: PAGE_SIZE, after_id: nextAfterId });
+      setUsers(prevUsers => [...prevUsers, ...data.items]);
+      setNextAfterId(data.next_after_id);
+    } catch (err) {
+      setActionMessage({ text: `Failed to load more users: ${err.data?.detail || err.message}`, type: 'error' });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   useEffect(() => {
     if (token) {
@@ -29,12 +52,29 @@ const UserListPage = () => {
     }
   }, [fetchUsers, token]);
 
+  useEffect(() => {
+    if (token) {
+      apiClient.adminGetStats(token).then(setStats).catch(() => setStats(null)); // The table works without it
+    }
+  }, [token]);
+
+  const handleFilterSubmit = (e) => {
+    e.preventDefault();
+    const formData = new FormData(e.target);
+    setFilters({
+      username_prefix: formData.get('username_prefix').trim(),
+      email_prefix: formData.get('email_prefix').trim(),
+      locked: formData.get('locked'),
+    });
+  };
+
   const handleUserAction = async (actionFunc, userId, successMessage, failureMessage) => {
     setActionMessage({ text: '', type: '' });
     try {
-      await actionFunc(userId, token);
+      const updatedUser = await actionFunc(userId, token);
+      // Update the row in place instead of reloading every page
+      setUsers(prevUsers => prevUsers.map(u => (u.id === updatedUser.id ? updatedUser : u)));
       setActionMessage({ text: successMessage, type: 'success' });
-      fetchUsers(); // Refresh list
     } catch (err) {
       setActionMessage({ text: `${failureMessage}: ${err.data?.detail || err.message}`, type: 'error' });
     }
@@ -58,6 +98,31 @@ const UserListPage = () => {
     <div className="panel-parchment overflow-x-auto">
       <h1 className="text-3xl font-cinzel text-wotlk-gold mb-6 text-center">Admin - User Management</h1>
 
+      {stats && (
+        <div className="grid grid-cols-2 md:grid-cols-5 gap-2 mb-4 text-center text-wotlk-text-light">
+          <div><div className="text-2xl text-wotlk-gold">{stats.total_accounts}</div><div className="text-xs">Accounts</div></div>
+          <div><div className="text-2xl text-wotlk-gold">{stats.locked_accounts}</div><div className="text-xs">Banned</div></div>
+          <div><div className="text-2xl text-wotlk-gold">{stats.verified_emails}</div><div className="text-xs">Verified emails</div></div>
+          <div><div className="text-2xl text-wotlk-gold">{stats.totp_enabled}</div><div className="text-xs">2FA enabled</div></div>
+          <div>
+            <div className="text-2xl text-wotlk-gold">{stats.registrations_per_day.slice(-7).reduce((sum, day) => sum + day.count, 0)}</div>
+            <div className="text-xs">Registrations (7 days)</div>
+          </div>
+        </div>
+      )}
+
+      <form onSubmit={handleFilterSubmit} className="flex flex-wrap items-end gap-2 mb-4">
+        <input name="username_prefix" type="text" placeholder="Username starts with" className="input-themed" defaultValue={filters.username_prefix} />
+        <input name="email_prefix" type="text" placeholder="Email starts with" className="input-themed" defaultValue={filters.email_prefix} />
+        <select name="locked" className="input-themed" defaultValue={filters.locked}>
+          <option value="">All accounts</option>
+          <option value="true">Banned only</option>
+          <option value="false">Not banned</option>
+        </select>
+        <button type="submit" className="btn-primary">Filter</button>
+        {total !== null && <span className="text-sm text-wotlk-text-light ml-2">{total} matching account(s)</span>}
+      </form>
+
       {actionMessage.text && (
         <div className={`p-3 rounded mb-4 text-sm ${actionMessage.type === 'success' ? 'bg-green-700 text-white' : 'bg-red-700 text-white'}`}>
           {actionMessage.text}
@@ -118,6 +183,13 @@ const UserListPage = () => {
           </tbody>
         </table>
       </div>
+      {nextAfterId !== null && (
+        <div className="text-center mt-4">
+          <button onClick={fetchMoreUsers} className="btn-secondary" disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -78,6 +78,11 @@ export const apiClient = {
     return apiClient.post('/auth/login/token', { username, password, totp_code: totpCode });
   },
 
+  refreshToken: async (refreshToken) => {
+    // Exchanges a refresh token for a new access/refresh token pair (the old refresh token stops working)
+    return apiClient.post('/auth/token/refresh', { refresh_token: refreshToken });
+  },
+
   register: async (userData) => {
     // userData should include: username, email, password, captcha_id, captcha_solution
     return apiClient.post('/auth/register', userData);
@@ -117,8 +122,15 @@ export const apiClient = {
   },
 
   // --- Admin ---
-  adminListUsers: async (authToken) => {
-    return apiClient.get('/admin/users', authToken);
+  adminListUsers: async (authToken, params = {}) => {
+    // params: limit, after_id, locked, gmlevel, email_verified, username_prefix, email_prefix, include_total
+    const query = new URLSearchParams(
+      Object.entries(params).filter(([, value]) => value !== undefined && value !== null && value !== '')
+    ).toString();
+    return apiClient.get(`/admin/users${query ? `?${query}` : ''}`, authToken);
+  },
+  adminGetStats: async (authToken) => {
+    return apiClient.get('/admin/stats', authToken);
   },
   adminBanUser: async (userId, authToken) => {
     return apiClient.post(`/admin/users/${userId}/ban`, {}, authToken);